@@ -0,0 +1,188 @@
+"""Adaptive MIAT_nonRT sweep that spends its points where the curves bend."""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from task3 import plot_results, print_results_summary, run_sweep_point
+
+
+# (stats key, statistic) pairs the refinement looks at by default.
+DEFAULT_METRICS: Tuple[Tuple[str, str], ...] = (
+    ("rt_stats", "mean"),
+    ("nrt_stats", "mean"),
+    ("nrt_stats", "percentile_95"),
+)
+
+
+def _second_derivative(xs: Sequence[float], ys: Sequence[float], i: int) -> float:
+    """Three-point estimate of f'' at xs[i]; 0 at the ends of the grid."""
+    if i <= 0 or i >= len(xs) - 1:
+        return 0.0
+    left = (ys[i] - ys[i - 1]) / (xs[i] - xs[i - 1])
+    right = (ys[i + 1] - ys[i]) / (xs[i + 1] - xs[i])
+    return 2.0 * (right - left) / (xs[i + 1] - xs[i - 1])
+
+
+def _interval_scores(
+    results: List[dict],
+    metrics: Sequence[Tuple[str, str]],
+    ci_weight: float,
+) -> List[float]:
+    """
+    Refinement score of each interval between neighbouring grid points.
+
+    For every metric, the linear-interpolation error |f''| h^2 / 8 and the
+    mean CI half-width of the interval's end points are taken relative to
+    the metric's largest value on the grid; an interval scores the largest
+    of these. Points marked unstable have no statistics. An interval from a
+    stable to an unstable point holds the saturation boundary and scores
+    its width relative to the grid, so bisection closes in on it; one
+    between two unstable points scores 0.
+    """
+    scores = [0.0] * (len(results) - 1)
+    stable = [i for i, r in enumerate(results) if not r.get("unstable")]
+    xs = [results[i]["miat_nrt"] for i in stable]
+    for stats_key, stat in metrics:
+        ys = [results[i][stats_key][stat] for i in stable]
+        half_widths = [
+            (
+                results[i][stats_key][f"{stat}_ci_upper"]
+                - results[i][stats_key][f"{stat}_ci_lower"]
+            )
+            / 2
+            for i in stable
+        ]
+        scale = max((abs(y) for y in ys), default=0.0) or 1.0
+        curvature = [abs(_second_derivative(xs, ys, j)) for j in range(len(xs))]
+        for j in range(len(xs) - 1):
+            i = stable[j]
+            if stable[j + 1] != i + 1:
+                continue
+            h = xs[j + 1] - xs[j]
+            interp_error = max(curvature[j], curvature[j + 1]) * h * h / 8.0
+            ci = (half_widths[j] + half_widths[j + 1]) / 2.0
+            scores[i] = max(scores[i], interp_error / scale, ci_weight * ci / scale)
+
+    span = results[-1]["miat_nrt"] - results[0]["miat_nrt"]
+    for i in range(len(results) - 1):
+        if bool(results[i].get("unstable")) != bool(results[i + 1].get("unstable")):
+            scores[i] = (results[i + 1]["miat_nrt"] - results[i]["miat_nrt"]) / span
+    return scores
+
+
+def adaptive_sweep(
+    run_point: Callable[[float], dict],
+    start: float,
+    end: float,
+    budget: int,
+    initial_points: int = 5,
+    resolution: float = 0.1,
+    metrics: Sequence[Tuple[str, str]] = DEFAULT_METRICS,
+    ci_weight: float = 0.5,
+    verbose: bool = True,
+) -> List[dict]:
+    """
+    Sweep MIAT_nonRT over [start, end] on a grid refined where it matters.
+
+    The sweep starts from `initial_points` evenly spaced points and then
+    repeatedly bisects the interval with the highest score (see
+    `_interval_scores`): steep bends, which sit near saturation, and
+    intervals whose end points have wide confidence intervals. Points are
+    rounded to `resolution` and intervals narrower than two resolutions are
+    never split. It stops after `budget` points in total (each one a full
+    `run_point` call) or when nothing can be split.
+
+    Args:
+        run_point: Runs one point and returns a result dictionary with
+            "miat_nrt", "lambda_nrt_inv", "rt_stats" and "nrt_stats", or
+            a `task3.unstable_result`
+        start, end: Range of MIAT_nonRT
+        budget: Total number of points to simulate
+        initial_points: Size of the starting uniform grid
+        resolution: Grid rounding, as in `task3.task_3_1`
+        metrics: (stats key, statistic) pairs to refine on
+        ci_weight: Weight of the CI half-width against the curvature term
+
+    Returns:
+        Results for the final non-uniform grid, sorted by MIAT_nonRT
+    """
+    if budget < 2 or initial_points < 2:
+        raise ValueError("need at least 2 initial points and a budget of 2")
+    if end <= start:
+        raise ValueError("end must be greater than start")
+
+    decimals = max(0, -int(np.floor(np.log10(resolution))))
+    grid = sorted(
+        {round(float(x), decimals) for x in np.linspace(start, end, min(initial_points, budget))}
+    )
+
+    results: Dict[float, dict] = {}
+    for x in grid:
+        if verbose:
+            print(f"Running simulation for MIAT_nonRT = {x}...")
+        results[x] = run_point(x)
+
+    while len(results) < budget:
+        ordered = [results[x] for x in sorted(results)]
+        scores = _interval_scores(ordered, metrics, ci_weight)
+        xs = [r["miat_nrt"] for r in ordered]
+        candidates = [
+            (score, i)
+            for i, score in enumerate(scores)
+            if xs[i + 1] - xs[i] >= 2 * resolution - 1e-12
+        ]
+        if not candidates:
+            break
+        score, i = max(candidates)
+        x = round((xs[i] + xs[i + 1]) / 2, decimals)
+        if verbose:
+            print(
+                f"Refining [{xs[i]}, {xs[i + 1]}] (score {score:.4f}): "
+                f"MIAT_nonRT = {x}..."
+            )
+        results[x] = run_point(x)
+
+    return [results[x] for x in sorted(results)]
+
+
+def task3_adaptive_sweep(
+    miat_rt: float,
+    mst_rt: float,
+    mst_nrt: float,
+    miat_nrt_start: float,
+    miat_nrt_end: float,
+    num_batches: int,
+    batch_size: int,
+    budget: int,
+    seed: int = None,
+    **kwargs,
+) -> List[dict]:
+    """`adaptive_sweep` over `task3.run_sweep_point`, in the `task3` result layout."""
+
+    def run_point(miat_nrt: float) -> dict:
+        return run_sweep_point(
+            miat_rt, miat_nrt, mst_rt, mst_nrt, num_batches, batch_size, seed=seed
+        )
+
+    return adaptive_sweep(run_point, miat_nrt_start, miat_nrt_end, budget, **kwargs)
+
+
+if __name__ == "__main__":
+    # Assignment parameters, with the 7-point budget of range(10, 45, 5).
+    sweep = task3_adaptive_sweep(
+        miat_rt=7.0,
+        mst_rt=2.0,
+        mst_nrt=4.0,
+        miat_nrt_start=10.0,
+        miat_nrt_end=40.0,
+        num_batches=51,
+        batch_size=1000,
+        budget=7,
+        initial_points=4,
+    )
+    print("Final grid:", [r["miat_nrt"] for r in sweep])
+    print_results_summary(sweep)
+    plot_results(sweep, "P1T3-Results-adaptive.png")
@@ -3,17 +3,83 @@
 from __future__ import annotations
 
 import math
-from typing import List, Tuple
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from student_t import t_critical_value
+
+
+def _t_quantile(confidence_level: float, dof: int) -> float:
+    """Two-sided Student-t critical value for `confidence_level`."""
+    return t_critical_value(confidence_level, dof)
+
+
+# Variance estimators for the CI of the mean, see `_variance_of_mean`.
+VARIANCE_METHODS = ("batch", "obm", "sts")
+
+
+def _variance_of_mean(
+    data: np.ndarray, num_batches: int, batch_size: int, method: str
+) -> Tuple[float, float]:
+    """
+    Estimated variance of the sample mean of `data` and its degrees of freedom.
+    
+    `data` holds `num_batches` batches of `batch_size` observations.
+    
+    - "batch": non-overlapping batch means, m - 1 degrees of freedom.
+    - "obm": overlapping batch means over all n - b + 1 windows of size b
+      (Meketon-Schmeiser), about 3/2 (n/b - 1) degrees of freedom.
+    - "sts": batched standardized-time-series area estimator (weight
+      sqrt(12)) pooled with the batch-means estimator, 2m - 1 degrees of
+      freedom.
+    
+    Window and partial sums come from prefix sums, so every method is O(n).
+    """
+    n = num_batches * batch_size
+    batches = data.reshape(num_batches, batch_size)
+    mean = float(data.sum()) / n
+    batch_means = batches.sum(axis=1) / batch_size
+    # Variance-parameter (sigma^2) estimate of plain batch means.
+    bm_sigma2 = (
+        batch_size * float(((batch_means - mean) ** 2).sum()) / (num_batches - 1)
+        if num_batches > 1
+        else 0.0
+    )
+    
+    if method == "batch":
+        return bm_sigma2 / n, num_batches - 1
+    
+    if method == "obm":
+        prefix = np.concatenate(([0.0], np.cumsum(data)))
+        window_means = (prefix[batch_size:] - prefix[:-batch_size]) / batch_size
+        sigma2 = (
+            n * batch_size
+            / ((n - batch_size + 1) * (n - batch_size))
+            * float(((window_means - mean) ** 2).sum())
+        )
+        return sigma2 / n, 1.5 * (num_batches - 1)
+    
+    # Area under the standardized time series of each batch:
+    # A_i = 12 / b^3 * (sum_k (k * batch mean - partial sum_k))^2.
+    partial = np.cumsum(batches, axis=1)
+    k = np.arange(1, batch_size + 1, dtype=np.float64)
+    area = (k * batch_means[:, None] - partial).sum(axis=1)
+    area_sigma2 = 12.0 / batch_size**3 * float((area * area).sum()) / num_batches
+    sigma2 = (num_batches * area_sigma2 + (num_batches - 1) * bm_sigma2) / (
+        2 * num_batches - 1
+    )
+    return sigma2 / n, 2 * num_batches - 1
 
 
 def calculate_batch_statistics(
-    response_times: List[float], num_batches: int, batch_size: int
+    response_times: Union[List[float], np.ndarray], num_batches: int, batch_size: int
 ) -> Tuple[List[float], List[float]]:
     """
     Calculate batch means and batch 95th percentiles.
     
     Args:
-        response_times: List of response times
+        response_times: List (or NumPy array) of response times
         num_batches: Number of batches (m)
         batch_size: Size of each batch (b)
     
@@ -29,6 +95,17 @@ def calculate_batch_statistics(
             f"Not enough data: need {total_needed}, have {len(response_times)}"
         )
     
+    if isinstance(response_times, np.ndarray):
+        # Vectorised path for arrays (e.g. shared-memory views): no copy of
+        # the samples except the partition scratch space.
+        batches = response_times[:total_needed].reshape(num_batches, batch_size)
+        percentile_idx = min(int(math.ceil(batch_size * 0.95)) - 1, batch_size - 1)
+        batch_means = (batches.sum(axis=1) / batch_size).tolist()
+        batch_percentiles = np.partition(batches, percentile_idx, axis=1)[
+            :, percentile_idx
+        ].tolist()
+        return batch_means, batch_percentiles
+    
     data = response_times[:total_needed]
     
     for i in range(num_batches):
@@ -50,10 +127,11 @@ def calculate_batch_statistics(
 
 
 def calculate_statistics_with_ci(
-    response_times: List[float],
+    response_times: Union[List[float], np.ndarray],
     num_batches: int,
     batch_size: int,
     confidence_level: float = 0.95,
+    method: str = "batch",
 ) -> dict:
     """
     Calculate mean, 95th percentile, and their confidence intervals using batch means.
@@ -63,12 +141,21 @@ def calculate_statistics_with_ci(
         num_batches: Total number of batches (m)
         batch_size: Size of each batch (b)
         confidence_level: Confidence level (default 0.95)
+        method: Variance estimator for the mean CI, one of `VARIANCE_METHODS`
+            ("batch", overlapping "obm" or standardized time series "sts");
+            the percentile CI always uses the non-overlapping batches
     
     Returns:
         Dictionary with statistics and confidence intervals
     """
     if num_batches < 2:
         raise ValueError("Need at least 2 batches (one to ignore, one to use)")
+    if method not in VARIANCE_METHODS:
+        raise ValueError(
+            f"Unknown variance method {method!r}; expected one of {VARIANCE_METHODS}"
+        )
+    if method == "obm" and num_batches < 3:
+        raise ValueError("Overlapping batch means need at least 2 batches after the first")
     
     batch_means, batch_percentiles = calculate_batch_statistics(
         response_times, num_batches, batch_size
@@ -90,16 +177,20 @@ def calculate_statistics_with_ci(
     se_mean = math.sqrt(var_of_means / n)
     se_percentile = math.sqrt(var_of_percentiles / n)
     
-    try:
-        from scipy import stats
-        
-        alpha = 1 - confidence_level
-        t_value = stats.t.ppf(1 - alpha / 2, n - 1)
-    except ImportError:
-        t_value = 2.0
+    t_value = _t_quantile(confidence_level, n - 1)
+    
+    if method != "batch":
+        used = np.asarray(
+            response_times[batch_size : num_batches * batch_size], dtype=np.float64
+        )
+        var_of_mean, dof = _variance_of_mean(used, n, batch_size, method)
+        mean_t_value = _t_quantile(confidence_level, dof)
+        se_mean = math.sqrt(var_of_mean)
+    else:
+        mean_t_value = t_value
     
-    ci_mean_lower = mean_of_means - t_value * se_mean
-    ci_mean_upper = mean_of_means + t_value * se_mean
+    ci_mean_lower = mean_of_means - mean_t_value * se_mean
+    ci_mean_upper = mean_of_means + mean_t_value * se_mean
     
     ci_percentile_lower = mean_of_percentiles - t_value * se_percentile
     ci_percentile_upper = mean_of_percentiles + t_value * se_percentile
@@ -114,3 +205,296 @@ def calculate_statistics_with_ci(
         "num_batches_used": n,
     }
 
+
+
+def _mean_with_ci(
+    values: List[float], confidence_level: float = 0.95
+) -> Tuple[float, float, float]:
+    """Return (mean, ci_lower, ci_upper) treating `values` as i.i.d. batch values."""
+    n = len(values)
+    mean = sum(values) / n
+    if n < 2:
+        return mean, float("nan"), float("nan")
+    var = sum((x - mean) ** 2 for x in values) / (n - 1)
+    half_width = _t_quantile(confidence_level, n - 1) * math.sqrt(var / n)
+    return mean, mean - half_width, mean + half_width
+
+
+def calculate_window_statistics(
+    arrival_times: List[float],
+    response_times: List[float],
+    period: float,
+    num_windows: int,
+    num_batches: int = 10,
+    confidence_level: float = 0.95,
+) -> List[dict]:
+    """
+    Calculate response-time statistics per time-of-day window.
+    
+    Each message is assigned to the window containing its arrival time
+    modulo `period`. Within a window the messages (in completion order) are
+    split into `num_batches` batches and every batch is used, so warm-up
+    data should already have been removed by the caller.
+    
+    Args:
+        arrival_times: Arrival time of each message
+        response_times: Response time of each message (same order)
+        period: Length of the cycle, e.g. one day
+        num_windows: Number of equal-width windows per period
+        num_batches: Number of batches per window
+        confidence_level: Confidence level (default 0.95)
+    
+    Returns:
+        One dictionary per window with its bounds, message count, and the
+        same statistic keys as `calculate_statistics_with_ci` (CI bounds are
+        NaN when a window has fewer than two full batches of data)
+    """
+    if len(arrival_times) != len(response_times):
+        raise ValueError("arrival_times and response_times must have equal length")
+    if num_windows < 1 or period <= 0:
+        raise ValueError("need a positive period and at least one window")
+    
+    width = period / num_windows
+    grouped: List[List[float]] = [[] for _ in range(num_windows)]
+    for arrival, response in zip(arrival_times, response_times):
+        idx = min(int((arrival % period) / width), num_windows - 1)
+        grouped[idx].append(response)
+    
+    nan = float("nan")
+    windows = []
+    for idx, values in enumerate(grouped):
+        entry = {
+            "window_start": idx * width,
+            "window_end": (idx + 1) * width,
+            "count": len(values),
+            "mean": nan,
+            "mean_ci_lower": nan,
+            "mean_ci_upper": nan,
+            "percentile_95": nan,
+            "percentile_95_ci_lower": nan,
+            "percentile_95_ci_upper": nan,
+            "num_batches_used": 0,
+        }
+        batch_size = len(values) // num_batches
+        if batch_size > 0:
+            batch_means, batch_percentiles = calculate_batch_statistics(
+                values, num_batches, batch_size
+            )
+            mean, mean_lo, mean_hi = _mean_with_ci(batch_means, confidence_level)
+            perc, perc_lo, perc_hi = _mean_with_ci(batch_percentiles, confidence_level)
+            entry.update(
+                {
+                    "mean": mean,
+                    "mean_ci_lower": mean_lo,
+                    "mean_ci_upper": mean_hi,
+                    "percentile_95": perc,
+                    "percentile_95_ci_lower": perc_lo,
+                    "percentile_95_ci_upper": perc_hi,
+                    "num_batches_used": num_batches,
+                }
+            )
+        elif values:
+            entry["mean"] = sum(values) / len(values)
+        windows.append(entry)
+    
+    return windows
+
+
+def _proportion_with_ci(
+    indicators: List[int],
+    num_batches: int,
+    batch_size: int,
+    confidence_level: float,
+) -> Tuple[float, float, float]:
+    """Batch-means proportion of 0/1 indicators; the first batch is ignored."""
+    batch_rates = [
+        sum(indicators[i * batch_size : (i + 1) * batch_size]) / batch_size
+        for i in range(1, num_batches)
+    ]
+    return _mean_with_ci(batch_rates, confidence_level)
+
+
+def calculate_loss_statistics_with_ci(
+    loss_indicators: List[int],
+    num_batches: int,
+    confidence_level: float = 0.95,
+) -> dict:
+    """
+    Calculate the loss probability and its confidence interval using batch means.
+    
+    Args:
+        loss_indicators: One entry per arrival, 1 if the message was lost
+        num_batches: Total number of batches (m); the first is ignored
+        confidence_level: Confidence level (default 0.95)
+    
+    Returns:
+        Dictionary with the loss probability, its confidence interval and
+        the raw arrival and loss counts
+    """
+    if num_batches < 2:
+        raise ValueError("Need at least 2 batches (one to ignore, one to use)")
+    
+    batch_size = len(loss_indicators) // num_batches
+    if batch_size == 0:
+        raise ValueError(
+            f"Not enough data: need {num_batches}, have {len(loss_indicators)}"
+        )
+    
+    loss_probability, ci_lower, ci_upper = _proportion_with_ci(
+        loss_indicators, num_batches, batch_size, confidence_level
+    )
+    
+    return {
+        "loss_probability": loss_probability,
+        "loss_probability_ci_lower": max(ci_lower, 0.0),
+        "loss_probability_ci_upper": min(ci_upper, 1.0),
+        "arrivals": len(loss_indicators),
+        "lost": sum(loss_indicators),
+        "num_batches_used": num_batches - 1,
+    }
+
+
+def calculate_miss_rate_with_ci(
+    miss_indicators: List[int],
+    num_batches: int,
+    confidence_level: float = 0.95,
+    batch_size: Optional[int] = None,
+) -> dict:
+    """
+    Calculate the deadline-miss rate and its confidence interval using batch means.
+    
+    Args:
+        miss_indicators: One entry per RT message leaving the system, 1 if it
+            missed its deadline (late or expired)
+        num_batches: Total number of batches (m); the first is ignored
+        confidence_level: Confidence level (default 0.95)
+        batch_size: Messages per batch; by default len // num_batches. When
+            given, only the first num_batches * batch_size entries are used
+    
+    Returns:
+        Dictionary with the miss rate, its confidence interval and the raw
+        message and miss counts
+    """
+    if num_batches < 2:
+        raise ValueError("Need at least 2 batches (one to ignore, one to use)")
+    
+    if batch_size is None:
+        batch_size = len(miss_indicators) // num_batches
+    if batch_size == 0 or len(miss_indicators) < num_batches * batch_size:
+        raise ValueError(
+            f"Not enough data: need {num_batches * max(batch_size, 1)}, "
+            f"have {len(miss_indicators)}"
+        )
+    miss_indicators = miss_indicators[: num_batches * batch_size]
+    
+    miss_rate, ci_lower, ci_upper = _proportion_with_ci(
+        miss_indicators, num_batches, batch_size, confidence_level
+    )
+    
+    return {
+        "miss_rate": miss_rate,
+        "miss_rate_ci_lower": max(ci_lower, 0.0),
+        "miss_rate_ci_upper": min(ci_upper, 1.0),
+        "messages": len(miss_indicators),
+        "missed": sum(miss_indicators),
+        "num_batches_used": num_batches - 1,
+    }
+
+
+def calculate_paired_difference_with_ci(
+    response_times_a: List[float],
+    response_times_b: List[float],
+    num_batches: int,
+    batch_size: int,
+    confidence_level: float = 0.95,
+) -> dict:
+    """
+    Calculate the mean paired difference (a - b) and its confidence interval.
+    
+    Both sequences must describe the same messages in the same order (e.g.
+    two scheduling policies driven by common random numbers). Batch means of
+    the differences are formed and the first batch is ignored.
+    
+    Args:
+        response_times_a: Response times under the first configuration
+        response_times_b: Response times under the second configuration
+        num_batches: Total number of batches (m)
+        batch_size: Size of each batch (b)
+        confidence_level: Confidence level (default 0.95)
+    
+    Returns:
+        Dictionary with the mean difference and its confidence interval
+    """
+    if num_batches < 2:
+        raise ValueError("Need at least 2 batches (one to ignore, one to use)")
+    
+    total_needed = num_batches * batch_size
+    if min(len(response_times_a), len(response_times_b)) < total_needed:
+        raise ValueError(
+            f"Not enough data: need {total_needed}, have "
+            f"{min(len(response_times_a), len(response_times_b))}"
+        )
+    
+    batch_diffs = []
+    for i in range(1, num_batches):
+        start_idx = i * batch_size
+        end_idx = start_idx + batch_size
+        batch_diffs.append(
+            (
+                sum(response_times_a[start_idx:end_idx])
+                - sum(response_times_b[start_idx:end_idx])
+            )
+            / batch_size
+        )
+    
+    mean_diff, ci_lower, ci_upper = _mean_with_ci(batch_diffs, confidence_level)
+    
+    return {
+        "mean_difference": mean_diff,
+        "mean_difference_ci_lower": ci_lower,
+        "mean_difference_ci_upper": ci_upper,
+        "num_batches_used": num_batches - 1,
+    }
+
+
+def calculate_mean_with_ci(
+    values: List[float],
+    num_batches: int,
+    batch_size: int,
+    confidence_level: float = 0.95,
+) -> dict:
+    """
+    Calculate the mean of any per-message quantity and its confidence interval.
+    
+    Same batching as `calculate_statistics_with_ci` (first batch ignored),
+    for quantities where a percentile is not meaningful, e.g. derivative
+    estimates or indicators.
+    
+    Args:
+        values: Per-message observations
+        num_batches: Total number of batches (m)
+        batch_size: Size of each batch (b)
+        confidence_level: Confidence level (default 0.95)
+    
+    Returns:
+        Dictionary with the mean and its confidence interval
+    """
+    if num_batches < 2:
+        raise ValueError("Need at least 2 batches (one to ignore, one to use)")
+    
+    total_needed = num_batches * batch_size
+    if len(values) < total_needed:
+        raise ValueError(f"Not enough data: need {total_needed}, have {len(values)}")
+    
+    batch_means = [
+        sum(values[i * batch_size : (i + 1) * batch_size]) / batch_size
+        for i in range(1, num_batches)
+    ]
+    mean, ci_lower, ci_upper = _mean_with_ci(batch_means, confidence_level)
+    
+    return {
+        "mean": mean,
+        "mean_ci_lower": ci_lower,
+        "mean_ci_upper": ci_upper,
+        "num_batches_used": num_batches - 1,
+    }
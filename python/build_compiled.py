@@ -0,0 +1,86 @@
+"""
+Optional mypyc build of the simulator core.
+
+    pip install mypy
+    python build_compiled.py           # builds simulate_task3.*.so in place
+    python build_compiled.py --clean   # back to pure Python
+
+The extension is compiled from the unchanged `simulate_task3.py`; Python
+imports it in preference to the source file, and when it is absent (not
+built, or built for another interpreter) the source is used as before.
+Rebuild after editing the source, or the stale extension keeps being
+imported. `check_compiled.py` verifies the build gives identical output.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+from typing import Sequence
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Modules compiled into extensions, relative to this directory.
+COMPILED_MODULES = ("simulate_task3.py",)
+
+
+def built_extensions() -> list:
+    return sorted(
+        path
+        for module in COMPILED_MODULES
+        for path in glob.glob(os.path.join(HERE, module[:-3] + ".*.so"))
+        + glob.glob(os.path.join(HERE, module[:-3] + ".*.pyd"))
+    )
+
+
+def clean() -> None:
+    for path in built_extensions():
+        os.remove(path)
+        print(f"removed {os.path.relpath(path, HERE)}")
+    shutil.rmtree(os.path.join(HERE, "build"), ignore_errors=True)
+
+
+def build(opt_level: str = "3") -> None:
+    try:
+        from mypyc.build import mypycify
+        from setuptools import setup
+    except ImportError:
+        raise SystemExit("mypyc is not installed; run `pip install mypy` first") from None
+
+    cwd = os.getcwd()
+    os.chdir(HERE)
+    try:
+        setup(
+            name="simulate-network-core",
+            # Imported modules are only type-checked as far as the compiled
+            # code uses them; their own annotations are not held to mypy.
+            ext_modules=mypycify(
+                ["--follow-imports=silent", *COMPILED_MODULES], opt_level=opt_level
+            ),
+            script_args=["build_ext", "--inplace"],
+        )
+    finally:
+        os.chdir(cwd)
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--clean", action="store_true", help="remove built extensions")
+    parser.add_argument("--opt-level", default="3", choices=["0", "1", "2", "3"])
+    args = parser.parse_args(argv)
+
+    if args.clean:
+        clean()
+        return 0
+    build(args.opt_level)
+    for path in built_extensions():
+        print(f"built {os.path.relpath(path, HERE)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Parity check of the compiled simulator core against its pure-Python source.
+
+    python check_compiled.py
+
+Runs the same scenarios through `simulate_task3` as imported (the mypyc
+extension if one is built) and through a fresh copy loaded from
+`simulate_task3.py`, and requires identical response times, loss records
+and final clocks. Prints the per-event speedup; exits with status 1 on any
+difference.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import simulate_task3
+from distributions import Erlang, LogNormal
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_pure_python():
+    """A separate instance of `simulate_task3` executed from its source file."""
+    spec = importlib.util.spec_from_file_location(
+        "simulate_task3_pure", os.path.join(HERE, "simulate_task3.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# (name, constructor kwargs, messages per class)
+SCENARIOS: List[Tuple[str, Dict[str, Any], int]] = [
+    ("assignment", dict(nrt_inter_arrival=25.0), 20000),
+    ("heavy load", dict(nrt_inter_arrival=7.0), 20000),
+    ("preemptive-repeat", dict(nrt_inter_arrival=12.0, policy="preemptive-repeat"), 10000),
+    ("non-preemptive", dict(nrt_inter_arrival=12.0, policy="non-preemptive"), 10000),
+    ("fifo", dict(nrt_inter_arrival=12.0, policy="fifo"), 10000),
+    (
+        "finite buffers",
+        dict(nrt_inter_arrival=6.0, nrt_capacity=5, total_capacity=8, drop_policy="push-out"),
+        10000,
+    ),
+    ("constant times", dict(nrt_inter_arrival=11.0, use_exponential=False), 2000),
+    (
+        "distributions",
+        dict(
+            nrt_inter_arrival=12.0,
+            rt_service_dist=Erlang(k=3, mean=2.0),
+            nrt_service_dist=LogNormal(mean=4.0, cv=1.5),
+        ),
+        10000,
+    ),
+]
+
+
+def _run(module, kwargs: Dict[str, Any], messages: int, seed: int) -> Tuple[tuple, float, int]:
+    params = dict(rt_inter_arrival=7.0, rt_service=2.0, nrt_service=4.0, seed=seed)
+    params.update(kwargs)
+    sim = module.SimulateTask3(**params)
+    start = time.perf_counter()
+    sim.run_until_messages(messages, messages)
+    elapsed = time.perf_counter() - start
+    # Arrivals plus (about) as many completions.
+    events = 2 * (sim.rt_message_id + sim.nrt_message_id)
+    outcome = (
+        sim.rt_response_times,
+        sim.nrt_response_times,
+        sim.rt_loss_indicators,
+        sim.nrt_loss_indicators,
+        (sim.MC, sim.RTCL, sim.nonRTCL, sim.SCL, sim.s),
+    )
+    return outcome, elapsed, events
+
+
+def check(seeds: Tuple[int, ...] = (1, 2, 3), report: Callable[[str], None] = print) -> bool:
+    """Compare every scenario and seed; True if all outputs are identical."""
+    pure = load_pure_python()
+    compiled = not simulate_task3.__file__.endswith(".py")
+    report(f"simulate_task3 imported from {os.path.basename(simulate_task3.__file__)}")
+
+    ok = True
+    total_pure = total_imported = 0.0
+    for name, kwargs, messages in SCENARIOS:
+        for seed in seeds:
+            expected, t_pure, events = _run(pure, kwargs, messages, seed)
+            actual, t_imported, _ = _run(simulate_task3, kwargs, messages, seed)
+            total_pure += t_pure
+            total_imported += t_imported
+            if actual != expected:
+                ok = False
+                report(f"MISMATCH: {name}, seed {seed}")
+        report(
+            f"{name:20s} {1e6 * t_pure / events:7.2f} us/event pure, "
+            f"{1e6 * t_imported / events:7.2f} us/event imported"
+        )
+
+    if compiled:
+        report(f"Speedup over pure Python: {total_pure / total_imported:.1f}x")
+    else:
+        report("No compiled extension found; compared pure Python with itself")
+    report("All outputs identical" if ok else "Outputs differ")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check() else 1)
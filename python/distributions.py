@@ -0,0 +1,281 @@
+"""Inter-arrival and service-time distributions with block (vectorized) samplers."""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Type, Union
+
+import numpy as np
+
+
+class Distribution:
+    """
+    Base class: subclasses implement `sample(rng, size)` returning a float64
+    array of `size` variates drawn with the numpy Generator `rng`.
+    """
+
+    name = ""
+
+    @property
+    def mean(self) -> float:
+        raise NotImplementedError
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        raise NotImplementedError
+
+    def stream(
+        self, seed: Union[None, int, np.random.SeedSequence] = None, block_size: int = 4096
+    ) -> "VariateStream":
+        return VariateStream(self, np.random.default_rng(seed), block_size)
+
+    def __repr__(self) -> str:
+        params = ", ".join(f"{k}={v!r}" for k, v in vars(self).items() if not k.startswith("_"))
+        return f"{type(self).__name__}({params})"
+
+
+class Deterministic(Distribution):
+    name = "deterministic"
+
+    def __init__(self, value: float) -> None:
+        if value < 0:
+            raise ValueError("value must be non-negative")
+        self.value = float(value)
+
+    @property
+    def mean(self) -> float:
+        return self.value
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        return np.full(size, self.value)
+
+
+class Exponential(Distribution):
+    name = "exponential"
+
+    def __init__(self, mean: float) -> None:
+        if mean <= 0:
+            raise ValueError("mean must be positive")
+        self._mean = float(mean)
+
+    @property
+    def mean(self) -> float:
+        return self._mean
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        return rng.exponential(self._mean, size)
+
+    def __repr__(self) -> str:
+        return f"Exponential(mean={self._mean!r})"
+
+
+class Erlang(Distribution):
+    """Sum of `k` exponential phases with overall mean `mean` (SCV 1/k)."""
+
+    name = "erlang"
+
+    def __init__(self, k: int, mean: float) -> None:
+        if k < 1 or mean <= 0:
+            raise ValueError("need k >= 1 and a positive mean")
+        self.k = int(k)
+        self._mean = float(mean)
+
+    @property
+    def mean(self) -> float:
+        return self._mean
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        return rng.gamma(self.k, self._mean / self.k, size)
+
+    def __repr__(self) -> str:
+        return f"Erlang(k={self.k!r}, mean={self._mean!r})"
+
+
+class HyperExponential(Distribution):
+    """Exponential with mean `means[i]` chosen with probability `probs[i]`."""
+
+    name = "hyperexponential"
+
+    def __init__(self, probs: Sequence[float], means: Sequence[float]) -> None:
+        if len(probs) != len(means) or not probs:
+            raise ValueError("probs and means must be non-empty and of equal length")
+        if any(p < 0 for p in probs) or not math.isclose(sum(probs), 1.0):
+            raise ValueError("probs must be non-negative and sum to 1")
+        if any(m <= 0 for m in means):
+            raise ValueError("means must be positive")
+        self.probs = [float(p) for p in probs]
+        self.means = [float(m) for m in means]
+        self._means_arr = np.asarray(self.means)
+
+    @property
+    def mean(self) -> float:
+        return sum(p * m for p, m in zip(self.probs, self.means))
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        phase = rng.choice(len(self.probs), size=size, p=self.probs)
+        return rng.standard_exponential(size) * self._means_arr[phase]
+
+
+class LogNormal(Distribution):
+    """Lognormal parameterized by its mean and coefficient of variation."""
+
+    name = "lognormal"
+
+    def __init__(self, mean: float, cv: float) -> None:
+        if mean <= 0 or cv <= 0:
+            raise ValueError("mean and cv must be positive")
+        self._mean = float(mean)
+        self.cv = float(cv)
+        self._sigma = math.sqrt(math.log1p(cv * cv))
+        self._mu = math.log(mean) - 0.5 * self._sigma ** 2
+
+    @property
+    def mean(self) -> float:
+        return self._mean
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        return rng.lognormal(self._mu, self._sigma, size)
+
+    def __repr__(self) -> str:
+        return f"LogNormal(mean={self._mean!r}, cv={self.cv!r})"
+
+
+class Pareto(Distribution):
+    """Pareto (type I) with shape `alpha` > 1, scaled to have mean `mean`."""
+
+    name = "pareto"
+
+    def __init__(self, alpha: float, mean: float) -> None:
+        if alpha <= 1 or mean <= 0:
+            raise ValueError("need alpha > 1 (finite mean) and a positive mean")
+        self.alpha = float(alpha)
+        self._mean = float(mean)
+        self._xm = mean * (alpha - 1) / alpha
+
+    @property
+    def mean(self) -> float:
+        return self._mean
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        # numpy's pareto is the Lomax form; shift by one for Pareto type I.
+        return self._xm * (1.0 + rng.pareto(self.alpha, size))
+
+    def __repr__(self) -> str:
+        return f"Pareto(alpha={self.alpha!r}, mean={self._mean!r})"
+
+
+class Empirical(Distribution):
+    """
+    Distribution of observed data: resampling with replacement, or with
+    `interpolate=True` the linearly interpolated inverse empirical CDF.
+    """
+
+    name = "empirical"
+
+    def __init__(self, data: Sequence[float], interpolate: bool = False) -> None:
+        values = np.sort(np.asarray(data, dtype=np.float64))
+        if values.size == 0 or values[0] < 0:
+            raise ValueError("data must be non-empty and non-negative")
+        self.interpolate = interpolate
+        self._values = values
+        self._grid = np.linspace(0.0, 1.0, values.size)
+
+    @property
+    def mean(self) -> float:
+        if self.interpolate and self._values.size > 1:
+            # Mean of the piecewise-linear inverse CDF (trapezoidal rule).
+            return float(0.5 * (self._values[1:] + self._values[:-1]).mean())
+        return float(self._values.mean())
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        if self.interpolate:
+            return np.interp(rng.random(size), self._grid, self._values)
+        return self._values[rng.integers(0, self._values.size, size)]
+
+    def __repr__(self) -> str:
+        return f"Empirical(n={self._values.size}, interpolate={self.interpolate!r})"
+
+
+DISTRIBUTIONS: Dict[str, Type[Distribution]] = {
+    cls.name: cls
+    for cls in (
+        Deterministic,
+        Exponential,
+        Erlang,
+        HyperExponential,
+        LogNormal,
+        Pareto,
+        Empirical,
+    )
+}
+
+
+def register_distribution(cls: Type[Distribution]) -> Type[Distribution]:
+    """Add a Distribution subclass to the registry (usable as a decorator)."""
+    if not cls.name:
+        raise ValueError("distribution classes need a non-empty `name`")
+    DISTRIBUTIONS[cls.name] = cls
+    return cls
+
+
+def make_distribution(spec: Union[Distribution, float, Dict[str, Any]]) -> Distribution:
+    """
+    Build a distribution from a spec.
+
+    A number means exponential with that mean; a dict names a registered
+    distribution and its parameters, e.g. `{"name": "erlang", "k": 3, "mean": 4}`.
+    """
+    if isinstance(spec, Distribution):
+        return spec
+    if isinstance(spec, (int, float)):
+        return Exponential(float(spec))
+    params = dict(spec)
+    name = params.pop("name", None)
+    if name not in DISTRIBUTIONS:
+        raise ValueError(
+            f"Unknown distribution {name!r}; expected one of {sorted(DISTRIBUTIONS)}"
+        )
+    return DISTRIBUTIONS[name](**params)
+
+
+class VariateStream:
+    """Callable that hands out variates one at a time from refilled blocks."""
+
+    def __init__(
+        self, dist: Distribution, rng: np.random.Generator, block_size: int = 4096
+    ) -> None:
+        self.dist = dist
+        self.rng = rng
+        self.block_size = block_size
+        self._buf: List[float] = []
+        self._pos = 0
+
+    def __call__(self) -> float:
+        if self._pos >= len(self._buf):
+            self._buf = self.dist.sample(self.rng, self.block_size).tolist()
+            self._pos = 0
+        value = self._buf[self._pos]
+        self._pos += 1
+        return value
+
+    def block(self, size: int) -> np.ndarray:
+        """Return the next `size` variates as an array."""
+        out = np.empty(size)
+        taken = min(size, len(self._buf) - self._pos)
+        out[:taken] = self._buf[self._pos : self._pos + taken]
+        self._pos += taken
+        if taken < size:
+            out[taken:] = self.dist.sample(self.rng, size - taken)
+        return out
+
+
+def make_streams(
+    dists: Sequence[Optional[Distribution]],
+    seed: Optional[int] = None,
+    block_size: int = 4096,
+) -> List[Optional[VariateStream]]:
+    """Create one independent stream per distribution (None entries stay None)."""
+    children = np.random.SeedSequence(seed).spawn(len(dists))
+    return [
+        None if dist is None else dist.stream(child, block_size)
+        for dist, child in zip(dists, children)
+    ]
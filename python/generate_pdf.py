@@ -1,43 +1,20 @@
+import time
+
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_pdf import PdfPages
 import numpy as np
 
-from batch_means import calculate_statistics_with_ci
-from simulate_task3 import SimulateTask3
-
-
-def run_single_simulation(
-    rt_inter_arrival: float,
-    nrt_inter_arrival: float,
-    rt_service: float,
-    nrt_service: float,
-    num_batches: int,
-    batch_size: int,
-    seed: int = None,
-) -> tuple[dict, dict]:
-    sim = SimulateTask3(
-        rt_inter_arrival=rt_inter_arrival,
-        nrt_inter_arrival=nrt_inter_arrival,
-        rt_service=rt_service,
-        nrt_service=nrt_service,
-        use_exponential=True,
-        seed=seed,
-    )
+from results_store import ResultsStore
+from task3 import RESULTS_STORE, mark_unstable_points, run_sweep_point, store_result
 
-    total_messages = num_batches * batch_size
-    sim.run_until_messages(total_messages, total_messages)
 
-    rt_stats = calculate_statistics_with_ci(
-        sim.rt_response_times, num_batches, batch_size
-    )
-    nrt_stats = calculate_statistics_with_ci(
-        sim.nrt_response_times, num_batches, batch_size
-    )
+def generate_pdf(unity_id: str = "arrao6", store_path: str = RESULTS_STORE):
+    """
+    Build the Task 3 report from the results store.
 
-    return rt_stats, nrt_stats
-
-
-def generate_pdf(unity_id: str = "arrao6"):
+    Points already recorded for the assignment parameters (by this
+    function or by `task3.main`) are reused; only missing ones are run.
+    """
     pdf_filename = f"P1T3-Results-{unity_id}.pdf"
     
     mst_rt = 2.0
@@ -45,30 +22,55 @@ def generate_pdf(unity_id: str = "arrao6"):
     miat_rt = 7.0
     num_batches = 51
     batch_size = 1000
+    miat_nrt_values = [float(x) for x in range(10, 45, 5)]
+    params = {
+        "miat_rt": miat_rt,
+        "mst_rt": mst_rt,
+        "mst_nrt": mst_nrt,
+        "num_batches": num_batches,
+        "batch_size": batch_size,
+    }
+
+    store = ResultsStore(store_path)
+    stored = {r["miat_nrt"] for r in store.load_results(**params)}
 
     print("Running simulations for PDF generation...")
-    results = []
+    sweep = time.strftime("pdf-%Y%m%dT%H%M%S")
     
-    for miat_nrt in range(10, 45, 5):
-        print(f"Running simulation for MIAT_nonRT = {miat_nrt}...")
-        rt_stats, nrt_stats = run_single_simulation(
-            rt_inter_arrival=miat_rt,
-            nrt_inter_arrival=float(miat_nrt),
-            rt_service=mst_rt,
-            nrt_service=mst_nrt,
-            num_batches=num_batches,
-            batch_size=batch_size,
+    for miat_nrt in miat_nrt_values:
+        if miat_nrt in stored:
+            print(f"Using stored result for MIAT_nonRT = {miat_nrt:g}")
+            continue
+        print(f"Running simulation for MIAT_nonRT = {miat_nrt:g}...")
+        start = time.perf_counter()
+        result = run_sweep_point(
+            miat_rt, miat_nrt, mst_rt, mst_nrt, num_batches, batch_size
         )
+        if result.get("unstable"):
+            print(
+                f"  Unstable (utilization {result['utilization']:.3f}); "
+                "recorded as unstable"
+            )
 
-        results.append(
-            {
-                "miat_nrt": float(miat_nrt),
-                "lambda_nrt_inv": 1.0 / miat_nrt,
-                "rt_stats": rt_stats,
-                "nrt_stats": nrt_stats,
-            }
+        store_result(
+            store,
+            result,
+            miat_rt,
+            mst_rt,
+            mst_nrt,
+            num_batches,
+            batch_size,
+            time.perf_counter() - start,
+            sweep,
         )
 
+    store.flush()
+    results = [
+        r for r in store.load_results(**params) if r["miat_nrt"] in miat_nrt_values
+    ]
+    unstable = [r for r in results if r.get("unstable")]
+    results = [r for r in results if not r.get("unstable")]
+
     print("Generating PDF...")
     
     with PdfPages(pdf_filename) as pdf:
@@ -181,6 +183,8 @@ def generate_pdf(unity_id: str = "arrao6"):
         ax4.grid(True, alpha=0.3)
         ax4.legend()
 
+        mark_unstable_points(axes.flat, unstable)
+
         plt.tight_layout()
         pdf.savefig(fig, bbox_inches='tight')
         plt.close()
@@ -206,6 +210,12 @@ def generate_pdf(unity_id: str = "arrao6"):
             ax.text(0.1, y_pos, line, fontsize=9, family='monospace', transform=ax.transAxes)
             y_pos -= line_height
         
+        for r in unstable:
+            line = (f"{r['miat_nrt']:<12.1f} {r['lambda_nrt_inv']:<12.4f} "
+                   f"unstable (utilization {r['utilization']:.3f}), run aborted")
+            ax.text(0.1, y_pos, line, fontsize=9, family='monospace', transform=ax.transAxes)
+            y_pos -= line_height
+        
         y_pos -= line_height * 2
         ax.text(0.1, y_pos, "Confidence Intervals (95%)", fontsize=12, fontweight='bold', transform=ax.transAxes)
         y_pos -= line_height * 2
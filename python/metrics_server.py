@@ -0,0 +1,348 @@
+"""
+Live progress metrics of running simulations over localhost HTTP or a Unix socket.
+
+    metrics = ProgressMetrics()
+    with MetricsServer(metrics, port=8765):
+        run_single_simulation(..., metrics=metrics)
+
+While it runs, `curl localhost:8765/metrics` returns the latest snapshot as
+JSON. `MetricsServer(metrics, path="sim.sock")` listens on a Unix socket
+instead; every client connected there receives one JSON line per `interval`
+seconds (`nc -U sim.sock`) until it disconnects.
+
+The simulator only pays at its checkpoints, every CHECKPOINT_INTERVAL events:
+`ProgressMetrics` then updates a snapshot dict that the server, in its own
+thread and event loop, serves as it is.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from simulate_task3 import SimulateTask3
+from student_t import t_critical_value
+
+
+class RunningBatchMeans:
+    """
+    Batch-means mean and CI half-width of a growing list of observations.
+
+    Each `update` only sums the batches completed since the last one, so
+    the total cost over a run is one pass over the data. The first batch
+    is ignored, as in `batch_means`, and with `num_batches` no batch past
+    the last one the final estimate uses is taken in, so the running CI
+    ends on the same data.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        confidence_level: float = 0.95,
+        num_batches: Optional[int] = None,
+    ) -> None:
+        self.batch_size = batch_size
+        self.confidence_level = confidence_level
+        self.num_batches = num_batches
+        self.batch_means: List[float] = []
+
+    def update(self, values: List[float]) -> None:
+        b = self.batch_size
+        done = (len(self.batch_means) + 1) * b
+        end = len(values)
+        if self.num_batches is not None:
+            end = min(end, self.num_batches * b)
+        while done + b <= end:
+            self.batch_means.append(sum(values[done : done + b]) / b)
+            done += b
+
+    def mean(self) -> Optional[float]:
+        if not self.batch_means:
+            return None
+        return sum(self.batch_means) / len(self.batch_means)
+
+    def half_width(self) -> Optional[float]:
+        k = len(self.batch_means)
+        if k < 2:
+            return None
+        mean = sum(self.batch_means) / k
+        var = sum((x - mean) ** 2 for x in self.batch_means) / (k - 1)
+        t = t_critical_value(self.confidence_level, k - 1)
+        return t * math.sqrt(var / k)
+
+
+def _finite(value: Optional[float]) -> Optional[float]:
+    """JSON has no inf or nan; report them as null."""
+    return value if value is not None and math.isfinite(value) else None
+
+
+class ProgressMetrics:
+    """
+    Running counters of one simulation, or of a sweep of them.
+
+    `attach` installs a progress hook on a `SimulateTask3` about to run
+    `run_until_messages`; `start_sweep` and `point_done` add sweep-level
+    progress around consecutive runs. `snapshot()` returns the latest
+    values and is safe to call from any thread.
+    """
+
+    def __init__(
+        self, batch_size: Optional[int] = None, confidence_level: float = 0.95
+    ) -> None:
+        self.batch_size = batch_size
+        self.confidence_level = confidence_level
+        self.points_total: Optional[int] = None
+        self.points_done = 0
+        self._sweep_started = time.perf_counter()
+        self._snapshot: Dict[str, Any] = {"state": "idle"}
+
+    def start_sweep(self, num_points: int) -> None:
+        self.points_total = num_points
+        self.points_done = 0
+        self._sweep_started = time.perf_counter()
+
+    def point_done(self) -> None:
+        self.points_done += 1
+
+    def attach(
+        self,
+        sim: SimulateTask3,
+        num_rt_messages: int,
+        num_nrt_messages: int,
+        label: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        num_batches: Optional[int] = None,
+    ) -> None:
+        """
+        Report on `sim` while it collects the given numbers of messages.
+
+        Running CIs use batches of `batch_size` (default: the one given to
+        the constructor), at most `num_batches` of them; without a batch
+        size only counters are reported.
+        """
+        batch_size = batch_size or self.batch_size
+        self._label = label
+        self._targets = (num_rt_messages, num_nrt_messages)
+        self._run_started = self._last_time = time.perf_counter()
+        self._last_events = 0
+        self._events_per_sec: Optional[float] = None
+        self._stats = [
+            RunningBatchMeans(batch_size, self.confidence_level, num_batches)
+            if batch_size
+            else None
+            for _ in range(2)
+        ]
+        sim.progress_hook = self._checkpoint
+        self._checkpoint(sim, 0)
+
+    def _checkpoint(self, sim: SimulateTask3, events: int) -> None:
+        now = time.perf_counter()
+        if now > self._last_time and events > self._last_events:
+            rate = (events - self._last_events) / (now - self._last_time)
+            self._events_per_sec = rate
+        self._last_time, self._last_events = now, events
+        elapsed = now - self._run_started
+
+        classes = {}
+        fractions = []
+        for name, collected, target, queue, stats in zip(
+            ("rt", "nrt"),
+            (sim.rt_response_times, sim.nrt_response_times),
+            self._targets,
+            (sim.rt_queue, sim.nrt_queue),
+            self._stats,
+        ):
+            entry: Dict[str, Any] = {
+                "collected": len(collected),
+                "target": target,
+                "in_system": len(queue),
+            }
+            if stats is not None:
+                stats.update(collected)
+                entry["mean"] = stats.mean()
+                entry["ci_half_width"] = stats.half_width()
+            classes[name] = entry
+            fractions.append(min(len(collected) / target, 1.0) if target else 1.0)
+
+        progress = min(fractions)
+        eta = elapsed * (1.0 - progress) / progress if progress > 0 else None
+        snapshot = {
+            "state": "running" if progress < 1.0 else "finished",
+            "label": self._label,
+            "time": time.time(),
+            "events": events,
+            "events_per_sec": self._events_per_sec,
+            "sim_clock": _finite(sim.MC),
+            "elapsed": elapsed,
+            "progress": progress,
+            "eta": eta,
+            "rt": classes["rt"],
+            "nrt": classes["nrt"],
+        }
+        if self.points_total is not None:
+            done = self.points_done + progress
+            sweep_elapsed = now - self._sweep_started
+            snapshot["points_done"] = self.points_done
+            snapshot["points_total"] = self.points_total
+            snapshot["sweep_eta"] = (
+                sweep_elapsed * (self.points_total - done) / done if done > 0 else None
+            )
+        self._snapshot = snapshot
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self._snapshot
+
+
+class MetricsServer:
+    """
+    Serves `ProgressMetrics` snapshots from a background thread.
+
+    Listens on `host:port` for HTTP GET requests (port 0 picks a free one,
+    see `address`), or on the Unix socket `path` as a stream of JSON lines
+    every `interval` seconds. Use as a context manager or call `start()`
+    and `stop()`.
+    """
+
+    def __init__(
+        self,
+        metrics: ProgressMetrics,
+        port: int = 8765,
+        host: str = "127.0.0.1",
+        path: Optional[str] = None,
+        interval: float = 1.0,
+    ) -> None:
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.path = path
+        self.interval = interval
+        self.address: Any = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._clients: Set[asyncio.Task] = set()
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def _payload(self) -> bytes:
+        return json.dumps(self.metrics.snapshot()).encode()
+
+    async def _http(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            request = await reader.readline()
+            while (await reader.readline()).strip():
+                pass  # headers
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1] in ("/", "/metrics"):
+                status, body = "200 OK", self._payload()
+            else:
+                status, body = "404 Not Found", b'{"error": "GET /metrics"}'
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _stream(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        task = asyncio.current_task()
+        self._clients.add(task)
+        try:
+            while True:
+                writer.write(self._payload() + b"\n")
+                await writer.drain()
+                await asyncio.sleep(self.interval)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.discard(task)
+            writer.close()
+
+    async def _main(self) -> None:
+        self._stop = asyncio.Event()
+        if self.path is not None:
+            server = await asyncio.start_unix_server(self._stream, path=self.path)
+            self.address = self.path
+        else:
+            server = await asyncio.start_server(self._http, self.host, self.port)
+            self.address = server.sockets[0].getsockname()[:2]
+        self._ready.set()
+        async with server:
+            await self._stop.wait()
+            for task in list(self._clients):
+                task.cancel()
+            await asyncio.gather(*self._clients, return_exceptions=True)
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._main())
+        except BaseException as exc:  # reported by start()
+            self._error = exc
+            self._ready.set()
+        finally:
+            self._loop.close()
+
+    def start(self) -> MetricsServer:
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-server", daemon=True
+        )
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        loop = self._loop
+        if loop is not None and self._stop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join()
+        self._thread = None
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self) -> MetricsServer:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    from task3 import run_single_simulation
+
+    # A long run at the assignment's heaviest load, observable while it runs.
+    metrics = ProgressMetrics()
+    with MetricsServer(metrics) as server:
+        host, port = server.address
+        print(f"Serving progress at http://{host}:{port}/metrics")
+        rt_stats, nrt_stats = run_single_simulation(
+            rt_inter_arrival=7.0,
+            nrt_inter_arrival=10.0,
+            rt_service=2.0,
+            nrt_service=4.0,
+            num_batches=101,
+            batch_size=10000,
+            metrics=metrics,
+        )
+    print(
+        f"nonRT mean {nrt_stats['mean']:.4f} "
+        f"[{nrt_stats['mean_ci_lower']:.4f}, {nrt_stats['mean_ci_upper']:.4f}]"
+    )
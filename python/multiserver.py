@@ -0,0 +1,261 @@
+"""Multi-server (c-server) RT/nonRT station with preemptive priority."""
+
+from __future__ import annotations
+
+import heapq
+import random
+from collections import deque
+from typing import TYPE_CHECKING, List, Optional
+
+from simulate_task3 import (
+    EPS,
+    SERVER_IDLE,
+    SERVER_NONRT,
+    SERVER_RT,
+    class_streams,
+    exponential_or_constant,
+)
+
+if TYPE_CHECKING:
+    from distributions import Distribution
+
+
+class MultiServerSimulation:
+    """
+    `SimulateTask3` generalised to `num_servers` identical servers.
+
+    An RT arrival that finds every server busy preempts the nonRT message in
+    service with the largest remaining service time; the preempted message
+    resumes its residual on whichever server frees up first, ahead of
+    waiting nonRT messages. Completion clocks live in a heap and the nonRT
+    jobs in service in a second (max-)heap, both with lazy invalidation, so
+    every event costs O(log c).
+    """
+
+    def __init__(
+        self,
+        rt_inter_arrival: float,
+        nrt_inter_arrival: float,
+        rt_service: float,
+        nrt_service: float,
+        num_servers: int,
+        use_exponential: bool = True,
+        seed: Optional[int] = None,
+        rt_arrival_dist: Optional[Distribution] = None,
+        nrt_arrival_dist: Optional[Distribution] = None,
+        rt_service_dist: Optional[Distribution] = None,
+        nrt_service_dist: Optional[Distribution] = None,
+    ) -> None:
+        if num_servers < 1:
+            raise ValueError("num_servers must be at least 1")
+        self.rt_inter_arrival = rt_inter_arrival
+        self.nrt_inter_arrival = nrt_inter_arrival
+        self.rt_service = rt_service
+        self.nrt_service = nrt_service
+        self.num_servers = num_servers
+        self.use_exponential = use_exponential
+
+        if seed is not None:
+            random.seed(seed)
+
+        (
+            self._rt_iat_stream,
+            self._nrt_iat_stream,
+            self._rt_service_stream,
+            self._nrt_service_stream,
+        ) = class_streams(
+            (rt_arrival_dist, nrt_arrival_dist, rt_service_dist, nrt_service_dist), seed
+        )
+
+        self.MC: float = 0.0
+
+        # Per-server state: class in service (SERVER_IDLE when free), the
+        # message's (arrival_time, id), completion clock and event version.
+        self.server_state: List[int] = [SERVER_IDLE] * num_servers
+        self.server_job: List[Optional[tuple[float, int]]] = [None] * num_servers
+        self.server_SCL: List[float] = [float("inf")] * num_servers
+        self._version: List[int] = [0] * num_servers
+        self._free: List[int] = list(range(num_servers))
+        self._completions: List[tuple[float, int, int]] = []
+        self._nrt_in_service: List[tuple[float, int, int]] = []
+
+        self.busy_time: List[float] = [0.0] * num_servers
+        self._busy_since: List[float] = [0.0] * num_servers
+
+        self.rt_queue: deque[tuple[float, int]] = deque()
+        self.nrt_queue: deque[tuple[float, int]] = deque()
+        # Preempted nonRT messages (arrival_time, id, residual), oldest first.
+        self.nrt_preempted: List[tuple[float, int, float]] = []
+
+        self.rt_response_times: List[float] = []
+        self.nrt_response_times: List[float] = []
+        self.rt_message_id = 0
+        self.nrt_message_id = 0
+        self.preemptions = 0
+
+        self.RTCL = self.MC + self.next_rt_inter_arrival()
+        self.nonRTCL = self.MC + self.next_nrt_inter_arrival()
+
+    def next_rt_inter_arrival(self) -> float:
+        if self._rt_iat_stream is not None:
+            return self._rt_iat_stream()
+        return exponential_or_constant(self.rt_inter_arrival, self.use_exponential)
+
+    def next_nrt_inter_arrival(self) -> float:
+        if self._nrt_iat_stream is not None:
+            return self._nrt_iat_stream()
+        return exponential_or_constant(self.nrt_inter_arrival, self.use_exponential)
+
+    def next_rt_service_time(self) -> float:
+        if self._rt_service_stream is not None:
+            return self._rt_service_stream()
+        return exponential_or_constant(self.rt_service, self.use_exponential)
+
+    def next_nrt_service_time(self) -> float:
+        if self._nrt_service_stream is not None:
+            return self._nrt_service_stream()
+        return exponential_or_constant(self.nrt_service, self.use_exponential)
+
+    def _start(self, server: int, cls: int, job: tuple[float, int], st: float) -> None:
+        scl = self.MC + st
+        version = self._version[server] + 1
+        self._version[server] = version
+        self.server_state[server] = cls
+        self.server_job[server] = job
+        self.server_SCL[server] = scl
+        heapq.heappush(self._completions, (scl, server, version))
+        if cls == SERVER_NONRT:
+            heapq.heappush(self._nrt_in_service, (-scl, server, version))
+
+    def _acquire_free_server(self) -> Optional[int]:
+        if not self._free:
+            return None
+        server = heapq.heappop(self._free)
+        self._busy_since[server] = self.MC
+        return server
+
+    def _release(self, server: int) -> None:
+        self._version[server] += 1
+        self.server_state[server] = SERVER_IDLE
+        self.server_job[server] = None
+        self.server_SCL[server] = float("inf")
+        self.busy_time[server] += self.MC - self._busy_since[server]
+        heapq.heappush(self._free, server)
+
+    def _preemptable_server(self) -> Optional[int]:
+        """Server with the in-service nonRT message that has the most work left."""
+        heap = self._nrt_in_service
+        while heap:
+            _, server, version = heap[0]
+            if self._version[server] == version:
+                return server
+            heapq.heappop(heap)
+        return None
+
+    def handle_rt_arrival(self) -> None:
+        self.MC = self.RTCL
+        job = (self.MC, self.rt_message_id)
+        self.rt_message_id += 1
+        self.RTCL = self.MC + self.next_rt_inter_arrival()
+
+        server = self._acquire_free_server()
+        if server is None:
+            server = self._preemptable_server()
+            if server is None:
+                self.rt_queue.append(job)
+                return
+            heapq.heappop(self._nrt_in_service)
+            remaining_time = self.server_SCL[server] - self.MC
+            arrival_time, msg_id = self.server_job[server]
+            if remaining_time > EPS:
+                heapq.heappush(self.nrt_preempted, (arrival_time, msg_id, remaining_time))
+                self.preemptions += 1
+            else:
+                self.nrt_response_times.append(self.MC - arrival_time)
+        self._start(server, SERVER_RT, job, self.next_rt_service_time())
+
+    def handle_nrt_arrival(self) -> None:
+        self.MC = self.nonRTCL
+        job = (self.MC, self.nrt_message_id)
+        self.nrt_message_id += 1
+        self.nonRTCL = self.MC + self.next_nrt_inter_arrival()
+
+        server = self._acquire_free_server()
+        if server is None:
+            self.nrt_queue.append(job)
+            return
+        self._start(server, SERVER_NONRT, job, self.next_nrt_service_time())
+
+    def handle_service_completion(self, server: int) -> None:
+        self.MC = self.server_SCL[server]
+        arrival_time, _ = self.server_job[server]
+        if self.server_state[server] == SERVER_RT:
+            self.rt_response_times.append(self.MC - arrival_time)
+        else:
+            self.nrt_response_times.append(self.MC - arrival_time)
+
+        if self.rt_queue:
+            self._start(server, SERVER_RT, self.rt_queue.popleft(), self.next_rt_service_time())
+        elif self.nrt_preempted:
+            arrival_time, msg_id, residual = heapq.heappop(self.nrt_preempted)
+            self._start(server, SERVER_NONRT, (arrival_time, msg_id), residual)
+        elif self.nrt_queue:
+            self._start(
+                server, SERVER_NONRT, self.nrt_queue.popleft(), self.next_nrt_service_time()
+            )
+        else:
+            self._release(server)
+
+    def _next_completion(self) -> tuple[float, int]:
+        heap = self._completions
+        while heap:
+            scl, server, version = heap[0]
+            if self._version[server] == version:
+                return scl, server
+            heapq.heappop(heap)
+        return float("inf"), -1
+
+    def run_until_messages(self, num_rt_messages: int, num_nrt_messages: int) -> None:
+        self.rt_response_times.clear()
+        self.nrt_response_times.clear()
+
+        max_iterations = 10_000_000
+        iteration = 0
+
+        while (
+            len(self.rt_response_times) < num_rt_messages
+            or len(self.nrt_response_times) < num_nrt_messages
+        ):
+            iteration += 1
+            if iteration > max_iterations:
+                raise RuntimeError(
+                    f"Simulation exceeded {max_iterations} iterations. "
+                    f"Collected {len(self.rt_response_times)} RT and "
+                    f"{len(self.nrt_response_times)} nonRT messages."
+                )
+
+            scl, server = self._next_completion()
+            # The earliest event; on exact ties arrivals go first, RT before
+            # nonRT, so the clock never steps back.
+            if self.RTCL <= self.nonRTCL and self.RTCL <= scl:
+                self.handle_rt_arrival()
+            elif self.nonRTCL <= scl:
+                self.handle_nrt_arrival()
+            else:
+                heapq.heappop(self._completions)
+                self.handle_service_completion(server)
+
+        del self.rt_response_times[num_rt_messages:]
+        del self.nrt_response_times[num_nrt_messages:]
+
+    def server_utilization(self) -> List[float]:
+        """Fraction of simulated time each server has been busy."""
+        if self.MC <= 0:
+            return [0.0] * self.num_servers
+        utilization = []
+        for server in range(self.num_servers):
+            busy = self.busy_time[server]
+            if self.server_state[server] != SERVER_IDLE:
+                busy += self.MC - self._busy_since[server]
+            utilization.append(busy / self.MC)
+        return utilization
@@ -0,0 +1,414 @@
+"""Queueing network of two-class (RT / nonRT) preemptive-priority nodes."""
+
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import random
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from batch_means import calculate_statistics_with_ci
+from scheduling import SchedulingPolicy, get_policy
+from simulate_task3 import SERVER_IDLE, SERVER_NONRT, SERVER_RT, SimulateTask3
+
+
+# Event kinds; on equal times arrivals (external ones from a source and
+# routed ones alike) are handled before completions.
+EVENT_ARRIVAL = 0
+EVENT_COMPLETION = 1
+
+# Dense rows (one probability per node) or sparse {node: [(next, prob), ...]}.
+RoutingMatrix = Union[Sequence[Sequence[float]], Dict[int, Sequence[Tuple[int, float]]]]
+
+
+class Source(NamedTuple):
+    """External Poisson arrivals of one class into `node`, optionally on a fixed path."""
+
+    node: int
+    cls: int
+    inter_arrival: float
+    path: Optional[Tuple[int, ...]] = None
+
+
+class Message:
+    __slots__ = ("msg_id", "cls", "created", "hop_arrival", "path", "hop")
+
+    def __init__(
+        self,
+        msg_id: Tuple[int, int],
+        cls: int,
+        created: float,
+        path: Optional[Tuple[int, ...]] = None,
+    ) -> None:
+        self.msg_id = msg_id
+        self.cls = cls
+        self.created = created
+        self.hop_arrival = created
+        self.path = path
+        self.hop = 0
+
+
+class NetworkNode(SimulateTask3):
+    """
+    One RT/nonRT server of a network: a `SimulateTask3` fed by the network.
+
+    The node draws no arrivals of its own. `arrive` and `complete` hand the
+    events of the network's heap to the `SimulateTask3` handlers, so
+    preemption, residual service and the `scheduling` policies follow the
+    single-node rules exactly. Service times come from the node's own random
+    stream, so its behaviour depends only on the messages it receives and
+    not on the rest of the network.
+    """
+
+    def __init__(
+        self,
+        node_id: int,
+        rt_service: float,
+        nrt_service: float,
+        rng: random.Random,
+        policy: SchedulingPolicy,
+    ) -> None:
+        self.node_id = node_id
+        self.rng = rng
+        super().__init__(
+            rt_inter_arrival=math.inf,
+            nrt_inter_arrival=math.inf,
+            rt_service=rt_service,
+            nrt_service=nrt_service,
+            use_exponential=True,
+            policy=policy,
+        )
+        # Messages in the node by local message id, one table per class.
+        self._rt_messages: Dict[int, Message] = {}
+        self._nrt_messages: Dict[int, Message] = {}
+
+        # `version` invalidates stale completion events; `seq` orders the
+        # events this node schedules.
+        self.version = 0
+        self.seq = 0
+
+        self.rt_hops = 0
+        self.nrt_hops = 0
+        self.rt_hop_time = 0.0
+        self.nrt_hop_time = 0.0
+        self.rt_hop_times: Optional[List[float]] = None
+        self.nrt_hop_times: Optional[List[float]] = None
+
+    def next_rt_arrival_time(self) -> float:
+        return math.inf
+
+    def next_nrt_arrival_time(self) -> float:
+        return math.inf
+
+    def generate_service_time(self, mean_value: float) -> float:
+        return -mean_value * math.log(1.0 - self.rng.random())
+
+    def arrive(self, msg: Message, t: float) -> bool:
+        """Queue `msg`; return True if the service completion clock changed."""
+        msg.hop_arrival = t
+        before = (self.s, self.SCL)
+        if msg.cls == SERVER_RT:
+            self._rt_messages[self.rt_message_id] = msg
+            self.RTCL = t
+            self.handle_rt_arrival()
+        else:
+            self._nrt_messages[self.nrt_message_id] = msg
+            self.nonRTCL = t
+            self.handle_nrt_arrival()
+        return (self.s, self.SCL) != before
+
+    def complete(self, t: float) -> Message:
+        """Finish the message in service, start the next one and return the finished one."""
+        if self.s == SERVER_RT:
+            msg = self._rt_messages.pop(self.rt_queue[0][1])
+            self.handle_service_completion()
+            hop_time = self.rt_response_times.pop()
+            self.rt_hops += 1
+            self.rt_hop_time += hop_time
+            if self.rt_hop_times is not None:
+                self.rt_hop_times.append(hop_time)
+        else:
+            msg = self._nrt_messages.pop(self.nrt_queue[0][1])
+            self.handle_service_completion()
+            hop_time = self.nrt_response_times.pop()
+            self.nrt_hops += 1
+            self.nrt_hop_time += hop_time
+            if self.nrt_hop_times is not None:
+                self.nrt_hop_times.append(hop_time)
+        return msg
+
+
+def _node_rng(seed: int, node: int) -> random.Random:
+    return random.Random(f"{seed}:node:{node}")
+
+
+def _source_rng(seed: int, index: int) -> random.Random:
+    return random.Random(f"{seed}:source:{index}")
+
+
+def _compile_routing(
+    matrix: RoutingMatrix, num_nodes: int
+) -> List[Optional[Tuple[List[float], List[int]]]]:
+    """Turn a routing matrix into per-node (cumulative probabilities, targets)."""
+    if isinstance(matrix, dict):
+        rows = {node: list(entries) for node, entries in matrix.items()}
+    else:
+        rows = {}
+        for node, row in enumerate(matrix):
+            rows[node] = [(j, float(p)) for j, p in enumerate(row) if p > 0]
+
+    compiled: List[Optional[Tuple[List[float], List[int]]]] = [None] * num_nodes
+    for node, entries in rows.items():
+        if not entries:
+            continue
+        cumulative: List[float] = []
+        targets: List[int] = []
+        total = 0.0
+        for target, prob in entries:
+            if not 0 <= target < num_nodes:
+                raise ValueError(f"routing target {target} is not a node")
+            total += prob
+            cumulative.append(total)
+            targets.append(target)
+        if total > 1.0 + 1e-9:
+            raise ValueError(f"routing probabilities from node {node} exceed 1")
+        compiled[node] = (cumulative, targets)
+    return compiled
+
+
+class NetworkSimulation:
+    """
+    Network of `NetworkNode`s driven by one global event heap.
+
+    Messages enter from `sources` and, after finishing service at a node,
+    follow their source's fixed `path` or else are routed by the per-class
+    `routing` matrix (probabilities summing to less than one leave the
+    network with the remainder). Every hop may add a constant `link_delay`.
+
+    Heap entries are ordered by (time, kind, node, scheduling node, that
+    node's sequence number), which depends only on per-node history, so a
+    partitioned run can reproduce the exact same event order.
+    """
+
+    def __init__(
+        self,
+        num_nodes: int,
+        rt_service: Union[float, Sequence[float]],
+        nrt_service: Union[float, Sequence[float]],
+        sources: Sequence[Source],
+        routing: Optional[Dict[int, RoutingMatrix]] = None,
+        link_delay: float = 0.0,
+        seed: Optional[int] = None,
+        policy: Union[str, SchedulingPolicy] = "preemptive-resume",
+        record_hops: bool = False,
+    ) -> None:
+        if num_nodes < 1:
+            raise ValueError("need at least one node")
+        if link_delay < 0:
+            raise ValueError("link_delay must be non-negative")
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), "little")
+
+        self.num_nodes = num_nodes
+        self.seed = seed
+        self.link_delay = link_delay
+        self.policy = get_policy(policy)
+
+        rt_means = (
+            [float(rt_service)] * num_nodes
+            if isinstance(rt_service, (int, float))
+            else list(rt_service)
+        )
+        nrt_means = (
+            [float(nrt_service)] * num_nodes
+            if isinstance(nrt_service, (int, float))
+            else list(nrt_service)
+        )
+        if len(rt_means) != num_nodes or len(nrt_means) != num_nodes:
+            raise ValueError("per-node service means must have one entry per node")
+
+        self.nodes = [
+            NetworkNode(i, rt_means[i], nrt_means[i], _node_rng(seed, i), self.policy)
+            for i in range(num_nodes)
+        ]
+        if record_hops:
+            for node in self.nodes:
+                node.rt_hop_times = []
+                node.nrt_hop_times = []
+
+        self.sources = [Source(*src) for src in sources]
+        for src in self.sources:
+            if not 0 <= src.node < num_nodes:
+                raise ValueError(f"source node {src.node} is not a node")
+            if src.path is not None:
+                if not src.path or src.path[0] != src.node:
+                    raise ValueError("a source path must start at the source node")
+                for node in src.path:
+                    if not 0 <= node < num_nodes:
+                        raise ValueError(f"path node {node} is not a node")
+        self._source_rngs = [_source_rng(seed, i) for i in range(len(self.sources))]
+        self._source_counts = [0] * len(self.sources)
+
+        self.routing = {
+            cls: _compile_routing(matrix, num_nodes)
+            for cls, matrix in (routing or {}).items()
+        }
+
+        self.MC: float = 0.0
+        self.events_processed = 0
+        self._heap: List[tuple] = []
+
+        self.rt_response_times: List[float] = []
+        self.nrt_response_times: List[float] = []
+        self.rt_message_ids: List[Tuple[int, int]] = []
+        self.nrt_message_ids: List[Tuple[int, int]] = []
+
+        for index in range(len(self.sources)):
+            if self._owns(self.sources[index].node):
+                self._schedule_source(index, 0.0)
+
+    def _owns(self, node: int) -> bool:
+        return True
+
+    def _push(self, time: float, kind: int, node: int, origin: int, payload) -> None:
+        origin_node = self.nodes[origin]
+        origin_node.seq += 1
+        heapq.heappush(self._heap, (time, kind, node, origin, origin_node.seq, payload))
+
+    def _schedule_source(self, index: int, now: float) -> None:
+        src = self.sources[index]
+        iat = -src.inter_arrival * math.log(1.0 - self._source_rngs[index].random())
+        self._push(now + iat, EVENT_ARRIVAL, src.node, src.node, -1 - index)
+
+    def _schedule_completion(self, node: NetworkNode) -> None:
+        node.version += 1
+        if node.s != SERVER_IDLE:
+            self._push(node.SCL, EVENT_COMPLETION, node.node_id, node.node_id, node.version)
+
+    def _deliver(self, msg: Message, dest: int, time: float, origin: int) -> None:
+        self._push(time, EVENT_ARRIVAL, dest, origin, msg)
+
+    def _next_hop(self, node: NetworkNode, msg: Message) -> Optional[int]:
+        if msg.path is not None:
+            msg.hop += 1
+            return msg.path[msg.hop] if msg.hop < len(msg.path) else None
+        table = self.routing.get(msg.cls)
+        entry = table[node.node_id] if table is not None else None
+        if entry is None:
+            return None
+        cumulative, targets = entry
+        u = node.rng.random()
+        for bound, target in zip(cumulative, targets):
+            if u < bound:
+                return target
+        return None
+
+    def _exit(self, msg: Message, time: float) -> None:
+        if msg.cls == SERVER_RT:
+            self.rt_response_times.append(time - msg.created)
+            self.rt_message_ids.append(msg.msg_id)
+        else:
+            self.nrt_response_times.append(time - msg.created)
+            self.nrt_message_ids.append(msg.msg_id)
+
+    def _process(self, event: tuple) -> None:
+        time, kind, node_id, _, _, payload = event
+        node = self.nodes[node_id]
+        self.MC = time
+        self.events_processed += 1
+
+        if kind == EVENT_COMPLETION:
+            msg = node.complete(time)
+            self._schedule_completion(node)
+            dest = self._next_hop(node, msg)
+            if dest is None:
+                self._exit(msg, time)
+            else:
+                self._deliver(msg, dest, time + self.link_delay, node_id)
+            return
+
+        if isinstance(payload, Message):
+            msg = payload
+        else:
+            index = -1 - payload
+            src = self.sources[index]
+            count = self._source_counts[index]
+            self._source_counts[index] = count + 1
+            msg = Message((index, count), src.cls, time, src.path)
+            self._schedule_source(index, time)
+        if node.arrive(msg, time):
+            self._schedule_completion(node)
+
+    def _pop_event(self) -> Optional[tuple]:
+        heap = self._heap
+        nodes = self.nodes
+        while heap:
+            event = heapq.heappop(heap)
+            if event[1] == EVENT_COMPLETION and event[5] != nodes[event[2]].version:
+                continue
+            return event
+        return None
+
+    def run(
+        self,
+        until: float = math.inf,
+        num_rt_messages: Optional[int] = None,
+        num_nrt_messages: Optional[int] = None,
+    ) -> None:
+        """Run until time `until` or until enough messages have left the network."""
+        if until == math.inf and num_rt_messages is None and num_nrt_messages is None:
+            raise ValueError("give a time horizon or message counts")
+        heap = self._heap
+        while True:
+            if (
+                (num_rt_messages is not None or num_nrt_messages is not None)
+                and len(self.rt_response_times) >= (num_rt_messages or 0)
+                and len(self.nrt_response_times) >= (num_nrt_messages or 0)
+            ):
+                break
+            event = self._pop_event()
+            if event is None:
+                break
+            if event[0] > until:
+                heapq.heappush(heap, event)
+                break
+            self._process(event)
+
+    def hop_statistics(self) -> List[dict]:
+        """Per-node count and mean response time (time spent at that hop) per class."""
+        nan = float("nan")
+        return [
+            {
+                "node": node.node_id,
+                "rt_count": node.rt_hops,
+                "rt_mean": node.rt_hop_time / node.rt_hops if node.rt_hops else nan,
+                "nrt_count": node.nrt_hops,
+                "nrt_mean": node.nrt_hop_time / node.nrt_hops if node.nrt_hops else nan,
+            }
+            for node in self.nodes
+        ]
+
+    def end_to_end_statistics(self, num_batches: int, batch_size: int) -> Tuple[dict, dict]:
+        """Batch-means statistics of end-to-end response time for RT and nonRT."""
+        return (
+            calculate_statistics_with_ci(self.rt_response_times, num_batches, batch_size),
+            calculate_statistics_with_ci(self.nrt_response_times, num_batches, batch_size),
+        )
+
+
+def tandem_network(
+    num_nodes: int,
+    rt_inter_arrival: float,
+    nrt_inter_arrival: float,
+    rt_service: float,
+    nrt_service: float,
+    **kwargs,
+) -> NetworkSimulation:
+    """Chain of nodes where both classes enter at node 0 and leave after the last."""
+    path = tuple(range(num_nodes))
+    sources = [
+        Source(0, SERVER_RT, rt_inter_arrival, path),
+        Source(0, SERVER_NONRT, nrt_inter_arrival, path),
+    ]
+    return NetworkSimulation(num_nodes, rt_service, nrt_service, sources, **kwargs)
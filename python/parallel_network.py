@@ -0,0 +1,327 @@
+"""Conservative parallel simulation of a `NetworkSimulation` across processes."""
+
+from __future__ import annotations
+
+import heapq
+import math
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from batch_means import calculate_statistics_with_ci
+from network import (
+    EVENT_ARRIVAL,
+    Message,
+    NetworkSimulation,
+    RoutingMatrix,
+    Source,
+)
+from scheduling import SchedulingPolicy
+from simulate_task3 import SERVER_RT
+
+
+# Channel record: arrival time, destination node, origin node, origin
+# sequence number, source index, per-source count, class, creation time, hop.
+_RECORD_FIELDS = 9
+
+
+class _Channel:
+    """
+    One-way, double-buffered shared-memory message channel between two partitions.
+
+    Window k writes slot k % 2; the reader drains that slot right after the
+    window barrier, before the writer can reuse it two windows later.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        row = 1 + capacity * _RECORD_FIELDS
+        self.shm = shared_memory.SharedMemory(create=True, size=2 * row * 8)
+        self.array = np.ndarray((2, row), dtype=np.float64, buffer=self.shm.buf)
+        self.array[:, 0] = 0.0
+
+    def write(self, slot: int, records: List[Tuple[float, ...]]) -> None:
+        if len(records) > self.capacity:
+            raise RuntimeError(
+                f"{len(records)} cross-partition messages in one window exceed the "
+                f"channel capacity of {self.capacity}; raise channel_capacity"
+            )
+        if records:
+            flat = np.asarray(records, dtype=np.float64).ravel()
+            self.array[slot, 1 : 1 + flat.size] = flat
+        self.array[slot, 0] = len(records)
+
+    def read(self, slot: int) -> np.ndarray:
+        count = int(self.array[slot, 0])
+        return self.array[slot, 1 : 1 + count * _RECORD_FIELDS].reshape(
+            count, _RECORD_FIELDS
+        )
+
+    def close(self) -> None:
+        del self.array
+        self.shm.close()
+        self.shm.unlink()
+
+
+class _PartitionSimulation(NetworkSimulation):
+    """The part of the network owned by one worker; other nodes are remote."""
+
+    def __init__(self, part: int, owner: Sequence[int], *args, **kwargs) -> None:
+        self._part = part
+        self._owner = owner
+        self._outgoing: Dict[int, List[Tuple[float, ...]]] = {}
+        self._current_event: tuple = ()
+        self.exits: List[tuple] = []
+        super().__init__(*args, **kwargs)
+
+    def _owns(self, node: int) -> bool:
+        return self._owner[node] == self._part
+
+    def _deliver(self, msg: Message, dest: int, time: float, origin: int) -> None:
+        dest_part = self._owner[dest]
+        if dest_part == self._part:
+            super()._deliver(msg, dest, time, origin)
+            return
+        origin_node = self.nodes[origin]
+        origin_node.seq += 1
+        source_index, count = msg.msg_id
+        self._outgoing.setdefault(dest_part, []).append(
+            (
+                time,
+                dest,
+                origin,
+                origin_node.seq,
+                source_index,
+                count,
+                msg.cls,
+                msg.created,
+                msg.hop,
+            )
+        )
+
+    def receive(self, records: np.ndarray) -> None:
+        for time, dest, origin, seq, source_index, count, cls, created, hop in records.tolist():
+            source_index = int(source_index)
+            msg = Message(
+                (source_index, int(count)),
+                int(cls),
+                created,
+                self.sources[source_index].path,
+            )
+            msg.hop = int(hop)
+            heapq.heappush(
+                self._heap,
+                (time, EVENT_ARRIVAL, int(dest), int(origin), int(seq), msg),
+            )
+
+    def _process(self, event: tuple) -> None:
+        self._current_event = event
+        super()._process(event)
+
+    def _exit(self, msg: Message, time: float) -> None:
+        key = self._current_event[:5]
+        self.exits.append((key, msg.cls, msg.msg_id, time - msg.created))
+
+    def run_window(self, end: float, inclusive: bool) -> float:
+        """Process events before `end` (up to and including it if `inclusive`)."""
+        heap = self._heap
+        while True:
+            event = self._pop_event()
+            if event is None:
+                break
+            if event[0] > end or (event[0] == end and not inclusive):
+                heapq.heappush(heap, event)
+                break
+            self._process(event)
+        return heap[0][0] if heap else math.inf
+
+
+def _worker(
+    part: int,
+    num_parts: int,
+    owner: Sequence[int],
+    sim_args: tuple,
+    sim_kwargs: dict,
+    until: float,
+    lookahead: float,
+    channels: Dict[Tuple[int, int], _Channel],
+    min_times: np.ndarray,
+    barrier,
+    results,
+) -> None:
+    try:
+        sim = _PartitionSimulation(part, owner, *sim_args, **sim_kwargs)
+
+        def exchange(window: int, local_min: float) -> float:
+            slot = window % 2
+            for dest_part in range(num_parts):
+                if dest_part != part:
+                    records = sim._outgoing.pop(dest_part, [])
+                    channels[(part, dest_part)].write(slot, records)
+                    if records:
+                        local_min = min(local_min, min(r[0] for r in records))
+            min_times[slot, part] = local_min
+            barrier.wait()
+            for src_part in range(num_parts):
+                if src_part != part:
+                    sim.receive(channels[(src_part, part)].read(slot))
+            return float(min_times[slot].min())
+
+        window = 0
+        start = exchange(window, sim._heap[0][0] if sim._heap else math.inf)
+        while start <= until:
+            end = start + lookahead
+            final = end > until
+            local_min = sim.run_window(until if final else end, inclusive=final)
+            if final:
+                break
+            window += 1
+            start = max(end, exchange(window, local_min))
+
+        hops = {
+            node.node_id: (node.rt_hops, node.rt_hop_time, node.nrt_hops, node.nrt_hop_time)
+            for node in sim.nodes
+            if sim._owns(node.node_id)
+        }
+        results.put((part, None, sim.exits, hops, sim.events_processed))
+    except BaseException as exc:  # noqa: BLE001 - reported to the parent
+        barrier.abort()
+        results.put((part, repr(exc), [], {}, 0))
+
+
+class ParallelNetworkResult:
+    """Merged outcome of a partitioned run, laid out like `NetworkSimulation`."""
+
+    def __init__(self, exits: List[tuple], hops: Dict[int, tuple], events: int) -> None:
+        exits.sort(key=lambda e: e[0])
+        self.events_processed = events
+        self.rt_response_times = [e[3] for e in exits if e[1] == SERVER_RT]
+        self.nrt_response_times = [e[3] for e in exits if e[1] != SERVER_RT]
+        self.rt_message_ids = [e[2] for e in exits if e[1] == SERVER_RT]
+        self.nrt_message_ids = [e[2] for e in exits if e[1] != SERVER_RT]
+        self._hops = hops
+
+    def hop_statistics(self) -> List[dict]:
+        nan = float("nan")
+        stats = []
+        for node_id in sorted(self._hops):
+            rt_hops, rt_time, nrt_hops, nrt_time = self._hops[node_id]
+            stats.append(
+                {
+                    "node": node_id,
+                    "rt_count": rt_hops,
+                    "rt_mean": rt_time / rt_hops if rt_hops else nan,
+                    "nrt_count": nrt_hops,
+                    "nrt_mean": nrt_time / nrt_hops if nrt_hops else nan,
+                }
+            )
+        return stats
+
+    def end_to_end_statistics(self, num_batches: int, batch_size: int) -> Tuple[dict, dict]:
+        return (
+            calculate_statistics_with_ci(self.rt_response_times, num_batches, batch_size),
+            calculate_statistics_with_ci(self.nrt_response_times, num_batches, batch_size),
+        )
+
+
+def run_parallel(
+    num_nodes: int,
+    rt_service: Union[float, Sequence[float]],
+    nrt_service: Union[float, Sequence[float]],
+    sources: Sequence[Source],
+    until: float,
+    seed: int,
+    link_delay: float,
+    routing: Optional[Dict[int, RoutingMatrix]] = None,
+    policy: Union[str, SchedulingPolicy] = "preemptive-resume",
+    num_workers: int = 2,
+    partition: Optional[Sequence[int]] = None,
+    channel_capacity: int = 1 << 16,
+) -> ParallelNetworkResult:
+    """
+    Run a `NetworkSimulation` split across `num_workers` processes.
+
+    Nodes are assigned to workers by `partition` (worker index per node,
+    contiguous blocks by default). Workers advance in synchronous time
+    windows of length `link_delay`, the lookahead: a message sent to
+    another partition in a window arrives no earlier than the window's end,
+    so it is exchanged through a shared-memory channel at the barrier.
+    Windows with no events anywhere are skipped.
+
+    Because every node owns its random streams and events are ordered by
+    per-node keys, the result matches `NetworkSimulation(...).run(until)`
+    with the same arguments exactly. Requires the `fork` start method.
+    """
+    if link_delay <= 0:
+        raise ValueError("parallel runs need a positive link_delay as lookahead")
+    if partition is None:
+        block = math.ceil(num_nodes / num_workers)
+        partition = [i // block for i in range(num_nodes)]
+    if len(partition) != num_nodes or not all(0 <= p < num_workers for p in partition):
+        raise ValueError("partition must give a worker index for every node")
+
+    ctx = mp.get_context("fork")
+    channels = {
+        (src, dst): _Channel(channel_capacity)
+        for src in range(num_workers)
+        for dst in range(num_workers)
+        if src != dst
+    }
+    min_shm = shared_memory.SharedMemory(create=True, size=2 * num_workers * 8)
+    min_times = np.ndarray((2, num_workers), dtype=np.float64, buffer=min_shm.buf)
+    barrier = ctx.Barrier(num_workers)
+    results = ctx.Queue()
+
+    sim_args = (num_nodes, rt_service, nrt_service, list(sources))
+    sim_kwargs = {
+        "routing": routing,
+        "link_delay": link_delay,
+        "seed": seed,
+        "policy": policy,
+    }
+    workers = [
+        ctx.Process(
+            target=_worker,
+            args=(
+                part,
+                num_workers,
+                list(partition),
+                sim_args,
+                sim_kwargs,
+                until,
+                link_delay,
+                channels,
+                min_times,
+                barrier,
+                results,
+            ),
+        )
+        for part in range(num_workers)
+    ]
+    try:
+        for worker in workers:
+            worker.start()
+        collected = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+    finally:
+        for channel in channels.values():
+            channel.close()
+        del min_times
+        min_shm.close()
+        min_shm.unlink()
+
+    errors = [err for _, err, _, _, _ in collected if err is not None]
+    if errors:
+        raise RuntimeError(f"parallel simulation failed: {errors[0]}")
+
+    exits: List[tuple] = []
+    hops: Dict[int, tuple] = {}
+    events = 0
+    for _, _, part_exits, part_hops, part_events in collected:
+        exits.extend(part_exits)
+        hops.update(part_hops)
+        events += part_events
+    return ParallelNetworkResult(exits, hops, events)
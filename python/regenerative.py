@@ -0,0 +1,199 @@
+"""Regenerative-method response-time estimates from server idle points."""
+
+from __future__ import annotations
+
+import math
+from typing import List, Optional, Sequence, Tuple
+
+from simulate_task3 import SERVER_IDLE, SimulateTask3
+from student_t import t_critical_value
+
+
+def calculate_ratio_with_ci(
+    sums: Sequence[float],
+    counts: Sequence[int],
+    confidence_level: float = 0.95,
+) -> dict:
+    """
+    Ratio estimate E[Y]/E[N] and its CI from i.i.d. cycles (Y, N).
+
+    The point estimate is sum(Y)/sum(N); the interval is the usual
+    central-limit one for ratio estimators, r ± t * s / (N̄ sqrt(k)),
+    with s the standard deviation of Y - r N over the k cycles.
+
+    Returns:
+        Dictionary with mean, mean_ci_lower, mean_ci_upper and num_cycles
+    """
+    k = len(sums)
+    if k < 2:
+        raise ValueError(f"Need at least 2 completed regeneration cycles, have {k}")
+    total = sum(counts)
+    if total == 0:
+        raise ValueError("No messages completed in any regeneration cycle")
+
+    ratio = sum(sums) / total
+    n_bar = total / k
+    var = sum((y - ratio * n) ** 2 for y, n in zip(sums, counts)) / (k - 1)
+    half_width = t_critical_value(confidence_level, k - 1) * math.sqrt(var / k) / n_bar
+    return {
+        "mean": ratio,
+        "mean_ci_lower": ratio - half_width,
+        "mean_ci_upper": ratio + half_width,
+        "num_cycles": k,
+    }
+
+
+class RegenerativeSimulation(SimulateTask3):
+    """
+    `SimulateTask3` that splits the run into regeneration cycles.
+
+    With Poisson arrivals the system probabilistically restarts every time
+    a completion leaves it empty: the pending arrival clocks are fresh
+    exponentials by memorylessness, so the stretches between such points
+    are i.i.d. Each completed cycle records its RT and nonRT response-time
+    sums and counts and its length; the mean response time is then a ratio
+    of cycle means, with no warm-up to discard and no batch size to pick.
+    A run starting with messages in the system discards the partial cycle
+    before the first empty point, and the unfinished last cycle is dropped.
+
+    Takes the `SimulateTask3` arguments; inter-arrival times must be
+    exponential with constant means.
+    """
+
+    def __init__(
+        self,
+        rt_inter_arrival: float,
+        nrt_inter_arrival: float,
+        rt_service: float,
+        nrt_service: float,
+        **kwargs,
+    ) -> None:
+        self._cycle_start = 0.0
+        self._cycle_rt_sum = 0.0
+        self._cycle_rt_count = 0
+        self._cycle_nrt_sum = 0.0
+        self._cycle_nrt_count = 0
+        self._in_cycle = True
+        # Completed cycles: (rt_sum, rt_count, nrt_sum, nrt_count, length).
+        self.cycles: List[Tuple[float, int, float, int, float]] = []
+
+        super().__init__(
+            rt_inter_arrival, nrt_inter_arrival, rt_service, nrt_service, **kwargs
+        )
+
+        for key in ("rt_arrival_dist", "nrt_arrival_dist"):
+            dist = kwargs.get(key)
+            poisson = dist.name == "exponential" if dist is not None else self.use_exponential
+            if not poisson:
+                raise ValueError(
+                    "regeneration at idle points needs exponential inter-arrival times"
+                )
+        if self.rt_arrival_rate is not None or self.nrt_arrival_rate is not None:
+            raise ValueError("regeneration at idle points needs constant arrival rates")
+
+    def _system_empty(self) -> bool:
+        return self.s == SERVER_IDLE and not self.rt_queue and not self.nrt_queue
+
+    def handle_service_completion(self) -> None:
+        rt_done = len(self.rt_response_times)
+        nrt_done = len(self.nrt_response_times)
+
+        super().handle_service_completion()
+
+        if len(self.rt_response_times) > rt_done:
+            self._cycle_rt_sum += self.rt_response_times[-1]
+            self._cycle_rt_count += 1
+        elif len(self.nrt_response_times) > nrt_done:
+            self._cycle_nrt_sum += self.nrt_response_times[-1]
+            self._cycle_nrt_count += 1
+
+        if self.s == SERVER_IDLE:
+            if self._in_cycle:
+                self.cycles.append(
+                    (
+                        self._cycle_rt_sum,
+                        self._cycle_rt_count,
+                        self._cycle_nrt_sum,
+                        self._cycle_nrt_count,
+                        self.MC - self._cycle_start,
+                    )
+                )
+            self._start_cycle()
+
+    def _start_cycle(self) -> None:
+        self._cycle_start = self.MC
+        self._cycle_rt_sum = self._cycle_nrt_sum = 0.0
+        self._cycle_rt_count = self._cycle_nrt_count = 0
+        self._in_cycle = True
+
+    def run_until_messages(self, num_rt_messages: int, num_nrt_messages: int) -> None:
+        self.cycles.clear()
+        self._start_cycle()
+        self._in_cycle = self._system_empty()
+        super().run_until_messages(num_rt_messages, num_nrt_messages)
+
+    def regenerative_statistics(self, confidence_level: float = 0.95) -> Tuple[dict, dict]:
+        """
+        Ratio-estimator mean response times of the completed cycles.
+
+        Returns:
+            (rt_stats, nrt_stats), each with the `calculate_ratio_with_ci`
+            keys plus the number of messages in the completed cycles
+        """
+        stats = []
+        for sum_idx, count_idx in ((0, 1), (2, 3)):
+            sums = [c[sum_idx] for c in self.cycles]
+            counts = [c[count_idx] for c in self.cycles]
+            entry = calculate_ratio_with_ci(sums, counts, confidence_level)
+            entry["num_messages"] = sum(counts)
+            stats.append(entry)
+        return stats[0], stats[1]
+
+
+def run_regenerative_simulation(
+    rt_inter_arrival: float,
+    nrt_inter_arrival: float,
+    rt_service: float,
+    nrt_service: float,
+    num_messages: int,
+    seed: Optional[int] = None,
+    confidence_level: float = 0.95,
+) -> Tuple[dict, dict]:
+    """
+    Mean RT and nonRT response times with regenerative CIs.
+
+    Runs until `num_messages` of each class have completed and estimates
+    from the regeneration cycles finished by then.
+
+    Returns:
+        (rt_stats, nrt_stats) as from `regenerative_statistics`
+    """
+    sim = RegenerativeSimulation(
+        rt_inter_arrival=rt_inter_arrival,
+        nrt_inter_arrival=nrt_inter_arrival,
+        rt_service=rt_service,
+        nrt_service=nrt_service,
+        use_exponential=True,
+        seed=seed,
+    )
+    sim.run_until_messages(num_messages, num_messages)
+    return sim.regenerative_statistics(confidence_level)
+
+
+if __name__ == "__main__":
+    # Assignment parameters at a moderate and a heavy nonRT load.
+    for miat_nrt in (40.0, 10.0):
+        rt_stats, nrt_stats = run_regenerative_simulation(
+            rt_inter_arrival=7.0,
+            nrt_inter_arrival=miat_nrt,
+            rt_service=2.0,
+            nrt_service=4.0,
+            num_messages=5000,
+            seed=42,
+        )
+        print(f"MIAT_nonRT = {miat_nrt} ({rt_stats['num_cycles']} cycles)")
+        for name, stats in (("RT", rt_stats), ("nonRT", nrt_stats)):
+            print(
+                f"  {name:5s} mean {stats['mean']:.4f} "
+                f"[{stats['mean_ci_lower']:.4f}, {stats['mean_ci_upper']:.4f}]"
+            )
@@ -0,0 +1,303 @@
+"""On-disk columnar store for sweep results."""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+INDEX_FILE = "index.json"
+
+# Distinct values kept in the index for a string column, for chunk pruning.
+_MAX_INDEXED_VALUES = 64
+
+Range = Union[Any, Tuple[Optional[float], Optional[float]]]
+
+
+def flatten_result(result: dict) -> Dict[str, Any]:
+    """
+    Flatten a `task3` result dictionary into one row of scalar columns.
+
+    Nested statistics dictionaries become dotted columns such as
+    "rt_stats.mean"; other scalar entries are kept as they are.
+    """
+    row: Dict[str, Any] = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            for stat, v in value.items():
+                if isinstance(v, (int, float, np.integer, np.floating)):
+                    row[f"{key}.{stat}"] = float(v)
+        elif value is None:
+            row[key] = math.nan
+        else:
+            row[key] = value
+    return row
+
+
+def unflatten_row(row: Dict[str, Any]) -> dict:
+    """Inverse of `flatten_result`: regroup dotted columns into dictionaries."""
+    result: dict = {}
+    for column, value in row.items():
+        if isinstance(value, np.generic):
+            value = value.item()
+        if "." in column:
+            key, stat = column.split(".", 1)
+            result.setdefault(key, {})[stat] = value
+        else:
+            result[column] = value
+    return result
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _column_array(values: List[Any]) -> np.ndarray:
+    """
+    One column as an array: str if any value is a string, else float64.
+
+    Missing values become "" in a string column and NaN in a float one.
+    """
+    if any(isinstance(v, str) for v in values):
+        return np.array(["" if _is_missing(v) else str(v) for v in values], dtype=str)
+    return np.array([math.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def _concat_column(pieces: List[np.ndarray]) -> np.ndarray:
+    """Join one column's pieces from several chunks, keeping strings as strings."""
+    if not pieces:
+        return np.empty(0)
+    if all(piece.dtype.kind != "U" for piece in pieces):
+        return np.concatenate(pieces)
+    return np.concatenate(
+        [
+            piece
+            if piece.dtype.kind == "U"
+            else np.array(["" if math.isnan(v) else str(v) for v in piece.tolist()], dtype=str)
+            for piece in pieces
+        ]
+    )
+
+
+def _column_summary(array: np.ndarray) -> dict:
+    if array.dtype.kind == "U":
+        values = sorted(set(array.tolist()))
+        summary: dict = {"dtype": "str"}
+        if len(values) <= _MAX_INDEXED_VALUES:
+            summary["values"] = values
+        return summary
+    finite = array[~np.isnan(array)]
+    return {
+        "dtype": "f8",
+        "min": float(finite.min()) if finite.size else None,
+        "max": float(finite.max()) if finite.size else None,
+    }
+
+
+def _chunk_may_match(columns: dict, filters: Dict[str, Range]) -> bool:
+    """False only if the index proves no row in the chunk passes `filters`."""
+    for name, wanted in filters.items():
+        summary = columns.get(name)
+        if summary is None:
+            return False
+        if summary["dtype"] == "str":
+            if "values" in summary and not isinstance(wanted, tuple):
+                if wanted not in summary["values"]:
+                    return False
+            continue
+        lo, hi = wanted if isinstance(wanted, tuple) else (wanted, wanted)
+        if summary["min"] is None:
+            return False
+        if lo is not None and summary["max"] < lo:
+            return False
+        if hi is not None and summary["min"] > hi:
+            return False
+    return True
+
+
+def _row_mask(data: Dict[str, np.ndarray], rows: int, filters: Dict[str, Range]) -> np.ndarray:
+    mask = np.ones(rows, dtype=bool)
+    for name, wanted in filters.items():
+        column = data.get(name)
+        if column is None:
+            return np.zeros(rows, dtype=bool)
+        if isinstance(wanted, tuple):
+            lo, hi = wanted
+            if lo is not None:
+                mask &= column >= lo
+            if hi is not None:
+                mask &= column <= hi
+        else:
+            mask &= column == wanted
+    return mask
+
+
+class ResultsStore:
+    """
+    Append-only columnar store of flattened sweep results in a directory.
+
+    Rows are buffered and written as `.npz` chunks of one float64 (or
+    string) array per column, listed in `index.json` together with every
+    column's min/max (or distinct strings). Queries use the index to skip
+    chunks that cannot match and only load the chunks and columns they
+    need. Missing values read as NaN, or as "" in a string column.
+    """
+
+    def __init__(self, path: str, chunk_rows: int = 1024) -> None:
+        self.path = path
+        self.chunk_rows = chunk_rows
+        os.makedirs(path, exist_ok=True)
+        index_path = os.path.join(path, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                self._index = json.load(f)
+        else:
+            self._index = {"version": 1, "chunks": []}
+        self._pending: List[Dict[str, Any]] = []
+
+    def __enter__(self) -> ResultsStore:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.flush()
+
+    def __len__(self) -> int:
+        return sum(c["rows"] for c in self._index["chunks"]) + len(self._pending)
+
+    def append(self, row: Dict[str, Any]) -> None:
+        """Add one row of scalar columns; written once `chunk_rows` are buffered."""
+        self._pending.append(dict(row))
+        if len(self._pending) >= self.chunk_rows:
+            self.flush()
+
+    def append_result(
+        self,
+        result: dict,
+        seed: Optional[int] = None,
+        elapsed: Optional[float] = None,
+        **params: Any,
+    ) -> None:
+        """
+        Record one sweep point: a `task3` result plus its run parameters.
+
+        The statistics are flattened with `flatten_result`; the seed, the
+        wall-clock time of the run, the time it was recorded and any extra
+        parameters (m, b, service means, sweep label, ...) become columns.
+        """
+        row = flatten_result(result)
+        row.update(params)
+        row["seed"] = math.nan if seed is None else seed
+        row["elapsed_seconds"] = math.nan if elapsed is None else elapsed
+        row["recorded_at"] = time.time()
+        self.append(row)
+
+    def flush(self) -> None:
+        """Write buffered rows as a new chunk and update the index."""
+        if not self._pending:
+            return
+        names = sorted({name for row in self._pending for name in row})
+        data = {
+            name: _column_array([row.get(name) for row in self._pending])
+            for name in names
+        }
+        chunk_id = len(self._index["chunks"])
+        filename = f"chunk-{chunk_id:06d}.npz"
+        np.savez(os.path.join(self.path, filename), **data)
+
+        self._index["chunks"].append(
+            {
+                "file": filename,
+                "rows": len(self._pending),
+                "columns": {name: _column_summary(a) for name, a in data.items()},
+            }
+        )
+        index_path = os.path.join(self.path, INDEX_FILE)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, index_path)
+        self._pending = []
+
+    def columns(self) -> List[str]:
+        names = {name for c in self._index["chunks"] for name in c["columns"]}
+        names.update(name for row in self._pending for name in row)
+        return sorted(names)
+
+    def _blocks(
+        self, filters: Dict[str, Range], needed: Optional[Sequence[str]]
+    ) -> Iterator[Tuple[Dict[str, np.ndarray], int]]:
+        for chunk in self._index["chunks"]:
+            if not _chunk_may_match(chunk["columns"], filters):
+                continue
+            with np.load(os.path.join(self.path, chunk["file"])) as npz:
+                names = npz.files if needed is None else [n for n in needed if n in npz.files]
+                yield {name: npz[name] for name in names}, chunk["rows"]
+        if self._pending:
+            names = {name for row in self._pending for name in row}
+            if needed is not None:
+                names &= set(needed)
+            yield (
+                {n: _column_array([row.get(n) for row in self._pending]) for n in names},
+                len(self._pending),
+            )
+
+    def query(
+        self, columns: Optional[Sequence[str]] = None, **filters: Range
+    ) -> Dict[str, np.ndarray]:
+        """
+        Select rows by column values and return them column by column.
+
+        Each filter is either an exact value or an inclusive `(low, high)`
+        range, where either bound may be None. Rows come back in the order
+        they were appended.
+
+        Example:
+            store.query(["miat_nrt", "nrt_stats.mean"], miat_rt=7.0, miat_nrt=(10, 20))
+        """
+        needed = None
+        if columns is not None:
+            needed = list(dict.fromkeys(list(columns) + list(filters)))
+
+        parts: List[Tuple[Dict[str, np.ndarray], int]] = []
+        for data, rows in self._blocks(filters, needed):
+            mask = _row_mask(data, rows, filters)
+            count = int(mask.sum())
+            if count:
+                parts.append(({name: array[mask] for name, array in data.items()}, count))
+
+        if columns is None:
+            columns = sorted({name for data, _ in parts for name in data})
+        out: Dict[str, np.ndarray] = {}
+        for name in columns:
+            pieces = [
+                data[name] if name in data else np.full(count, np.nan)
+                for data, count in parts
+            ]
+            out[name] = _concat_column(pieces)
+        return out
+
+    def load_results(self, key: str = "miat_nrt", **filters: Range) -> List[dict]:
+        """
+        Matching rows as `task3` result dictionaries, sorted by `key`.
+
+        When several rows share a `key` value the most recently appended
+        one wins, so re-running a point supersedes the older result.
+        """
+        data = self.query(**filters)
+        if key not in data:
+            return []
+        latest: Dict[float, dict] = {}
+        names = list(data)
+        for i in range(len(data[key])):
+            row = {
+                name: data[name][i]
+                for name in names
+                if not _is_missing(data[name][i].item()) and data[name][i] != ""
+            }
+            latest[float(data[key][i])] = unflatten_row(row)
+        return [latest[k] for k in sorted(latest)]
@@ -0,0 +1,154 @@
+"""Scheduling policies for the two-class (RT / nonRT) server."""
+
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Dict, Iterator, List, Optional, Tuple, Type, Union
+
+
+class SchedulingPolicy:
+    """
+    Scheduling strategy, described by three switches read by the simulator:
+
+    - `preemptive`: an RT arrival interrupts a nonRT message in service
+    - `repeat`: an interrupted nonRT message later restarts its full
+      (identical) service requirement instead of resuming the remainder
+    - `fifo`: the next message is the earliest arrival of either class
+      instead of RT first
+    """
+
+    name = ""
+    preemptive = True
+    repeat = False
+    fifo = False
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}()"
+
+
+class PreemptiveResume(SchedulingPolicy):
+    name = "preemptive-resume"
+
+
+class PreemptiveRepeat(SchedulingPolicy):
+    name = "preemptive-repeat"
+    repeat = True
+
+
+class NonPreemptive(SchedulingPolicy):
+    name = "non-preemptive"
+    preemptive = False
+
+
+class Fifo(SchedulingPolicy):
+    name = "fifo"
+    preemptive = False
+    fifo = True
+
+
+SCHEDULING_POLICIES: Dict[str, Type[SchedulingPolicy]] = {
+    cls.name: cls for cls in (PreemptiveResume, PreemptiveRepeat, NonPreemptive, Fifo)
+}
+
+
+def get_policy(policy: Union[str, SchedulingPolicy]) -> SchedulingPolicy:
+    """Return a policy instance from a registered name or an instance."""
+    if isinstance(policy, SchedulingPolicy):
+        return policy
+    try:
+        return SCHEDULING_POLICIES[policy]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown scheduling policy {policy!r}; "
+            f"expected one of {sorted(SCHEDULING_POLICIES)}"
+        ) from None
+
+
+# Order of service within the RT class.
+RT_FIFO = "fifo"
+RT_EDF = "edf"
+RT_DISCIPLINES = (RT_FIFO, RT_EDF)
+
+
+class DeadlineQueue:
+    """
+    RT queue served earliest deadline first, with the deque operations the
+    simulator uses.
+
+    Entries are (arrival_time, message_id) as in the FIFO deque; absolute
+    deadlines are looked up in `deadlines` by message id when an entry is
+    appended, and messages without one go last. Waiting messages are kept
+    in a binary heap, so an arrival or a service start costs
+    O(log queue length). The message in service is pinned at the head
+    until it leaves: EDF does not preempt within the RT class.
+    """
+
+    def __init__(self, deadlines: Dict[int, float]) -> None:
+        self.deadlines = deadlines
+        self._heap: List[Tuple[float, int, float]] = []
+        self._pinned: Optional[Tuple[float, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._heap) + (self._pinned is not None)
+
+    def __iter__(self) -> Iterator[Tuple[float, int]]:
+        """The pinned message, then the waiting ones in arrival order."""
+        if self._pinned is not None:
+            yield self._pinned
+        for _, msg_id, arrival in sorted(self._heap, key=lambda e: e[1]):
+            yield arrival, msg_id
+
+    def __getitem__(self, index: int) -> Tuple[float, int]:
+        """Only the head, the next message to serve, can be indexed."""
+        if index != 0:
+            raise IndexError("only the head of a DeadlineQueue can be indexed")
+        if self._pinned is not None:
+            return self._pinned
+        if not self._heap:
+            raise IndexError("DeadlineQueue is empty")
+        _, msg_id, arrival = self._heap[0]
+        return arrival, msg_id
+
+    def append(self, entry: Tuple[float, int]) -> None:
+        arrival, msg_id = entry
+        heapq.heappush(
+            self._heap, (self.deadlines.get(msg_id, math.inf), msg_id, arrival)
+        )
+
+    def popleft(self) -> Tuple[float, int]:
+        """Remove the head: the pinned message, else the earliest deadline."""
+        if self._pinned is not None:
+            entry = self._pinned
+            self._pinned = None
+            return entry
+        _, msg_id, arrival = heapq.heappop(self._heap)
+        return arrival, msg_id
+
+    def pin(self) -> None:
+        """Mark the head as in service; later arrivals queue behind it."""
+        if self._pinned is None and self._heap:
+            self._pinned = self.popleft()
+
+    def drop_waiting(self, oldest: bool) -> Optional[int]:
+        """
+        Remove the oldest (or newest) waiting message; its id, or None.
+
+        O(queue length), for the buffer drop policies only.
+        """
+        heap = self._heap
+        if not heap:
+            return None
+        pick = (min if oldest else max)(range(len(heap)), key=lambda i: heap[i][1])
+        msg_id = heap[pick][1]
+        heap[pick] = heap[-1]
+        heap.pop()
+        heapq.heapify(heap)
+        return msg_id
+
+    def copy(self, deadlines: Optional[Dict[int, float]] = None) -> DeadlineQueue:
+        """A copy looking up deadlines in `deadlines` (default: the same)."""
+        twin = DeadlineQueue(self.deadlines if deadlines is None else deadlines)
+        twin._heap = list(self._heap)
+        twin._pinned = self._pinned
+        return twin
@@ -0,0 +1,361 @@
+"""Single-run response-time sensitivities to the arrival and service means."""
+
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Dict, List, Tuple, Union
+
+from batch_means import calculate_mean_with_ci, calculate_statistics_with_ci
+from scheduling import SchedulingPolicy
+from simulate_task3 import SERVER_IDLE, SERVER_NONRT, SERVER_RT, SimulateTask3
+from student_t import t_critical_value
+
+
+# Parameters the derivatives are taken with respect to, in vector order.
+PARAMETERS = ("rt_inter_arrival", "nrt_inter_arrival", "rt_service", "nrt_service")
+
+SENSITIVITY_METHODS = ("lr", "ipa")
+
+Gradient = Tuple[float, float, float, float]
+
+_ZERO: Gradient = (0.0, 0.0, 0.0, 0.0)
+
+
+def _add(a: Gradient, b: Gradient) -> Gradient:
+    return (a[0] + b[0], a[1] + b[1], a[2] + b[2], a[3] + b[3])
+
+
+def _sub(a: Gradient, b: Gradient) -> Gradient:
+    return (a[0] - b[0], a[1] - b[1], a[2] - b[2], a[3] - b[3])
+
+
+def _unit(index: int, value: float) -> Gradient:
+    g = [0.0, 0.0, 0.0, 0.0]
+    g[index] = value
+    return (g[0], g[1], g[2], g[3])
+
+
+def _ratio_derivative_with_ci(
+    sums: List[float],
+    counts: List[int],
+    scores: List[float],
+    confidence_level: float,
+) -> dict:
+    """
+    Derivative of E[Y]/E[N] from i.i.d. cycles (Y, N, score), delta-method CI.
+
+    d(E[Y]/E[N]) = (E[Y S] - E[Y]/E[N] E[N S]) / E[N].
+    """
+    k = len(sums)
+    if k < 2:
+        raise ValueError(f"Need at least 2 completed regeneration cycles, have {k}")
+    a = sum(y * s for y, s in zip(sums, scores)) / k
+    b = sum(n * s for n, s in zip(counts, scores)) / k
+    c = sum(sums) / k
+    n_bar = sum(counts) / k
+    if n_bar == 0:
+        raise ValueError("No messages completed in any regeneration cycle")
+
+    derivative = a / n_bar - c * b / n_bar**2
+    d_n = 2 * c * b / n_bar**3 - a / n_bar**2
+    influence = [
+        (y * s - a) / n_bar
+        - b / n_bar**2 * (y - c)
+        - c / n_bar**2 * (n * s - b)
+        + d_n * (n - n_bar)
+        for y, n, s in zip(sums, counts, scores)
+    ]
+    var = sum(x * x for x in influence) / (k - 1)
+    half_width = t_critical_value(confidence_level, k - 1) * math.sqrt(var / k)
+    return {
+        "mean": derivative,
+        "mean_ci_lower": derivative - half_width,
+        "mean_ci_upper": derivative + half_width,
+        "num_cycles": k,
+    }
+
+
+class SensitivitySimulation(SimulateTask3):
+    """
+    `SimulateTask3` that also estimates the slopes of the mean response times
+    with respect to the four means in `PARAMETERS`, from the same run.
+
+    All inter-arrival and service times are exponential. The system
+    regenerates whenever it empties, and two estimators are collected:
+
+    - Likelihood ratio (`lr`): each regeneration cycle records its RT and
+      nonRT response-time sums and counts and the score d/dθ log-likelihood
+      of the variates it used (arrival clocks still pending when a cycle
+      ends contribute their survival to this cycle and their residual to
+      the next). The ratio-estimator derivative is unbiased for both
+      classes; its variance grows with the cycle length.
+    - Infinitesimal perturbation analysis (`ipa`): every drawn value X with
+      mean θ has dX/dθ = X/θ, and the gradient of each clock is carried
+      along with it (restarted at regeneration points), giving a gradient
+      per completed message. It has far lower variance and is unbiased for
+      RT messages, but it misses the jump when a perturbation moves an RT
+      arrival across a nonRT completion, so the nonRT IPA slopes are biased
+      (even in sign) and only the LR ones should be used for nonRT.
+    """
+
+    def __init__(
+        self,
+        rt_inter_arrival: float,
+        nrt_inter_arrival: float,
+        rt_service: float,
+        nrt_service: float,
+        seed: int = None,
+        policy: Union[str, SchedulingPolicy] = "preemptive-resume",
+    ) -> None:
+        self._dMC: Gradient = _ZERO
+        self._d_rtcl: Gradient = _ZERO
+        self._d_nrtcl: Gradient = _ZERO
+        self._d_scl: Gradient = _ZERO
+        self._d_preempted: Gradient = _ZERO
+        self._d_nrt_requirement: Gradient = _ZERO
+        # Arrival-time gradients of queued messages, parallel to the queues.
+        self._rt_arrival_d: deque[Gradient] = deque()
+        self._nrt_arrival_d: deque[Gradient] = deque()
+
+        self.rt_response_gradients: List[Gradient] = []
+        self.nrt_response_gradients: List[Gradient] = []
+
+        # Current regeneration cycle: response-time sums and counts per
+        # class, score vector, and when each arrival clock was last drawn.
+        self._cycle_rt_sum = 0.0
+        self._cycle_rt_count = 0
+        self._cycle_nrt_sum = 0.0
+        self._cycle_nrt_count = 0
+        self._cycle_score = [0.0, 0.0, 0.0, 0.0]
+        self._rt_clock_drawn = 0.0
+        self._nrt_clock_drawn = 0.0
+        # Completed cycles: (rt_sum, rt_count, nrt_sum, nrt_count, score).
+        self.cycles: List[Tuple[float, int, float, int, Gradient]] = []
+
+        super().__init__(
+            rt_inter_arrival=rt_inter_arrival,
+            nrt_inter_arrival=nrt_inter_arrival,
+            rt_service=rt_service,
+            nrt_service=nrt_service,
+            use_exponential=True,
+            seed=seed,
+            policy=policy,
+        )
+
+    def _score(self, index: int, value: float, mean: float) -> None:
+        self._cycle_score[index] += (value - mean) / (mean * mean)
+
+    def next_rt_arrival_time(self) -> float:
+        t = super().next_rt_arrival_time()
+        iat = t - self.MC
+        self._rt_clock_drawn = self.MC
+        self._score(0, iat, self.rt_inter_arrival)
+        self._d_rtcl = _add(self._dMC, _unit(0, iat / self.rt_inter_arrival))
+        return t
+
+    def next_nrt_arrival_time(self) -> float:
+        t = super().next_nrt_arrival_time()
+        iat = t - self.MC
+        self._nrt_clock_drawn = self.MC
+        self._score(1, iat, self.nrt_inter_arrival)
+        self._d_nrtcl = _add(self._dMC, _unit(1, iat / self.nrt_inter_arrival))
+        return t
+
+    def next_rt_service_time(self) -> float:
+        st = super().next_rt_service_time()
+        self._score(2, st, self.rt_service)
+        self._d_scl = _add(self._dMC, _unit(2, st / self.rt_service))
+        return st
+
+    def next_nrt_service_time(self) -> float:
+        st = super().next_nrt_service_time()
+        self._score(3, st, self.nrt_service)
+        self._d_nrt_requirement = _unit(3, st / self.nrt_service)
+        self._d_scl = _add(self._dMC, self._d_nrt_requirement)
+        return st
+
+    def handle_rt_arrival(self) -> None:
+        self._dMC = self._d_rtcl
+        s_before = self.s
+        d_scl_before = self._d_scl
+        self._rt_arrival_d.append(self._dMC)
+
+        super().handle_rt_arrival()
+
+        if (
+            s_before == SERVER_NONRT
+            and self.s == SERVER_RT
+            and self.preempted_service_time is not None
+        ):
+            if self._repeat:
+                self._d_preempted = self._d_nrt_requirement
+            else:
+                self._d_preempted = _sub(d_scl_before, self._dMC)
+
+    def handle_nrt_arrival(self) -> None:
+        self._dMC = self._d_nrtcl
+        self._nrt_arrival_d.append(self._dMC)
+        super().handle_nrt_arrival()
+
+    def start_next_service(self) -> None:
+        resuming = self.preempted_service_time is not None
+        super().start_next_service()
+        if resuming and self.preempted_service_time is None:
+            self._d_scl = _add(self._dMC, self._d_preempted)
+
+    def handle_service_completion(self) -> None:
+        self._dMC = self._d_scl
+        rt_done = len(self.rt_response_times)
+        nrt_done = len(self.nrt_response_times)
+
+        super().handle_service_completion()
+
+        if len(self.rt_response_times) > rt_done:
+            self._cycle_rt_sum += self.rt_response_times[-1]
+            self._cycle_rt_count += 1
+            self.rt_response_gradients.append(
+                _sub(self._dMC, self._rt_arrival_d.popleft())
+            )
+        elif len(self.nrt_response_times) > nrt_done:
+            self._cycle_nrt_sum += self.nrt_response_times[-1]
+            self._cycle_nrt_count += 1
+            self.nrt_response_gradients.append(
+                _sub(self._dMC, self._nrt_arrival_d.popleft())
+            )
+
+        if self.s == SERVER_IDLE:
+            self._regenerate()
+
+    def _regenerate(self) -> None:
+        """Close the current cycle at an empty-system point and open the next."""
+        t = self.MC
+        score = self._cycle_score
+        next_score = [0.0, 0.0, 0.0, 0.0]
+        # A pending arrival clock drawn as X at time t0 splits, by
+        # memorylessness, into survival past t - t0 (this cycle) and a fresh
+        # exponential residual (next cycle): log f(X) = log S(t - t0) + log f(R).
+        for index, clock, drawn, mean in (
+            (0, self.RTCL, self._rt_clock_drawn, self.rt_inter_arrival),
+            (1, self.nonRTCL, self._nrt_clock_drawn, self.nrt_inter_arrival),
+        ):
+            m2 = mean * mean
+            score[index] += (t - drawn) / m2 - ((clock - drawn) - mean) / m2
+            next_score[index] = ((clock - t) - mean) / m2
+
+        self.cycles.append(
+            (
+                self._cycle_rt_sum,
+                self._cycle_rt_count,
+                self._cycle_nrt_sum,
+                self._cycle_nrt_count,
+                (score[0], score[1], score[2], score[3]),
+            )
+        )
+        self._cycle_rt_sum = self._cycle_nrt_sum = 0.0
+        self._cycle_rt_count = self._cycle_nrt_count = 0
+        self._cycle_score = next_score
+        self._rt_clock_drawn = self._nrt_clock_drawn = t
+
+        # Response times are differences, so perturbations need not carry
+        # across cycles; the residual arrival times restart from here.
+        self._dMC = _ZERO
+        self._d_rtcl = _unit(0, (self.RTCL - t) / self.rt_inter_arrival)
+        self._d_nrtcl = _unit(1, (self.nonRTCL - t) / self.nrt_inter_arrival)
+
+    def run_until_messages(self, num_rt_messages: int, num_nrt_messages: int) -> None:
+        self.rt_response_gradients.clear()
+        self.nrt_response_gradients.clear()
+        self.cycles.clear()
+        super().run_until_messages(num_rt_messages, num_nrt_messages)
+        del self.rt_response_gradients[num_rt_messages:]
+        del self.nrt_response_gradients[num_nrt_messages:]
+
+    def lr_sensitivity_statistics(
+        self, confidence_level: float = 0.95
+    ) -> Dict[str, Dict[str, dict]]:
+        """
+        Likelihood-ratio estimates of d(mean response time)/d(parameter).
+
+        Returns:
+            {"rt": {parameter: stats}, "nrt": {parameter: stats}} with the
+            derivative, its confidence interval and the number of cycles
+        """
+        cycles = self.cycles
+        results: Dict[str, Dict[str, dict]] = {}
+        for name, sum_idx, count_idx in (("rt", 0, 1), ("nrt", 2, 3)):
+            sums = [c[sum_idx] for c in cycles]
+            counts = [c[count_idx] for c in cycles]
+            results[name] = {
+                param: _ratio_derivative_with_ci(
+                    sums, counts, [c[4][k] for c in cycles], confidence_level
+                )
+                for k, param in enumerate(PARAMETERS)
+            }
+        return results
+
+    def ipa_sensitivity_statistics(
+        self, num_batches: int, batch_size: int, confidence_level: float = 0.95
+    ) -> Dict[str, Dict[str, dict]]:
+        """
+        Batch-means IPA estimates of d(mean response time)/d(parameter).
+
+        Returns:
+            {"rt": {parameter: stats}, "nrt": {parameter: stats}} with the
+            `calculate_mean_with_ci` keys for every parameter in `PARAMETERS`
+        """
+        results: Dict[str, Dict[str, dict]] = {}
+        for name, gradients in (
+            ("rt", self.rt_response_gradients),
+            ("nrt", self.nrt_response_gradients),
+        ):
+            results[name] = {
+                param: calculate_mean_with_ci(
+                    [g[k] for g in gradients], num_batches, batch_size, confidence_level
+                )
+                for k, param in enumerate(PARAMETERS)
+            }
+        return results
+
+
+def run_sensitivity_simulation(
+    rt_inter_arrival: float,
+    nrt_inter_arrival: float,
+    rt_service: float,
+    nrt_service: float,
+    num_batches: int,
+    batch_size: int,
+    seed: int = None,
+    method: str = "lr",
+) -> Tuple[dict, dict, dict]:
+    """
+    `run_single_simulation` plus the response-time slopes from the same run.
+
+    Returns:
+        (rt_stats, nrt_stats, sensitivities) where sensitivities maps "rt"
+        and "nrt" to per-parameter derivative statistics
+    """
+    if method not in SENSITIVITY_METHODS:
+        raise ValueError(
+            f"Unknown sensitivity method {method!r}; expected one of {SENSITIVITY_METHODS}"
+        )
+    sim = SensitivitySimulation(
+        rt_inter_arrival=rt_inter_arrival,
+        nrt_inter_arrival=nrt_inter_arrival,
+        rt_service=rt_service,
+        nrt_service=nrt_service,
+        seed=seed,
+    )
+
+    total_messages = num_batches * batch_size
+    sim.run_until_messages(total_messages, total_messages)
+
+    rt_stats = calculate_statistics_with_ci(sim.rt_response_times, num_batches, batch_size)
+    nrt_stats = calculate_statistics_with_ci(
+        sim.nrt_response_times, num_batches, batch_size
+    )
+    if method == "lr":
+        sensitivities = sim.lr_sensitivity_statistics()
+    else:
+        sensitivities = sim.ipa_sensitivity_statistics(num_batches, batch_size)
+    return rt_stats, nrt_stats, sensitivities
@@ -0,0 +1,175 @@
+"""Parallel sweep points whose response times come back through shared memory."""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batch_means import calculate_statistics_with_ci
+from simulate_task3 import SimulateTask3, UnstableSystemError
+from task3 import unstable_result
+
+
+class SampleBuffer:
+    """
+    RT and nonRT response times of one run in a shared float64 block.
+
+    The creator owns the block; workers `attach` by name, fill their views
+    in place and detach. Both sides see the samples as NumPy arrays without
+    any pickling. `close()` releases (and, for the owner, frees) the block.
+    """
+
+    def __init__(
+        self, num_rt: int, num_nrt: int, name: Optional[str] = None
+    ) -> None:
+        self.num_rt = num_rt
+        self.num_nrt = num_nrt
+        size = max(8 * (num_rt + num_nrt), 8)
+        self._owner = name is None
+        if self._owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        data = np.ndarray((num_rt + num_nrt,), dtype=np.float64, buffer=self.shm.buf)
+        self.rt_response_times = data[:num_rt]
+        self.nrt_response_times = data[num_rt:]
+
+    @classmethod
+    def attach(cls, name: str, num_rt: int, num_nrt: int) -> SampleBuffer:
+        return cls(num_rt, num_nrt, name=name)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self) -> None:
+        # Views into the block must go before it can be closed.
+        self.rt_response_times = self.nrt_response_times = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+    def __enter__(self) -> SampleBuffer:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _run_into_buffer(
+    buffer_name: str,
+    rt_inter_arrival: float,
+    nrt_inter_arrival: float,
+    rt_service: float,
+    nrt_service: float,
+    total_messages: int,
+    seed: Optional[int],
+) -> None:
+    """Worker side: simulate and write the response times into the shared block."""
+    sim = SimulateTask3(
+        rt_inter_arrival=rt_inter_arrival,
+        nrt_inter_arrival=nrt_inter_arrival,
+        rt_service=rt_service,
+        nrt_service=nrt_service,
+        use_exponential=True,
+        seed=seed,
+    )
+    sim.run_until_messages(total_messages, total_messages)
+
+    buffer = SampleBuffer.attach(buffer_name, total_messages, total_messages)
+    try:
+        buffer.rt_response_times[:] = sim.rt_response_times
+        buffer.nrt_response_times[:] = sim.nrt_response_times
+    finally:
+        buffer.close()
+
+
+def parallel_sweep(
+    miat_rt: float,
+    mst_rt: float,
+    mst_nrt: float,
+    miat_nrt_values: Sequence[float],
+    num_batches: int,
+    batch_size: int,
+    seed: Optional[int] = None,
+    num_workers: Optional[int] = None,
+    keep_samples: bool = False,
+) -> Tuple[List[dict], Dict[float, SampleBuffer]]:
+    """
+    Run `run_single_simulation` for every MIAT_nonRT in a process pool.
+
+    Each point gets a `SampleBuffer` created here; the worker writes its
+    response times into it and only returns once done, so no sample is
+    pickled. Statistics are computed from the shared arrays directly; a
+    point whose run is aborted as unstable gets a `task3.unstable_result`
+    and its buffer is freed, while the other points carry on.
+
+    Returns:
+        (results, samples): results in the `task3` layout, sorted by
+        MIAT_nonRT, and - with `keep_samples` - the buffers by MIAT_nonRT
+        for later histogramming (the caller must `close()` them); otherwise
+        the buffers are freed and `samples` is empty. Unstable points have
+        no buffer.
+    """
+    miat_nrt_values = list(miat_nrt_values)
+    if len(set(miat_nrt_values)) != len(miat_nrt_values):
+        raise ValueError("MIAT_nonRT values must be distinct")
+    total_messages = num_batches * batch_size
+    buffers = {
+        miat_nrt: SampleBuffer(total_messages, total_messages)
+        for miat_nrt in miat_nrt_values
+    }
+    results: List[dict] = []
+    try:
+        with ProcessPoolExecutor(
+            max_workers=num_workers, mp_context=mp.get_context("fork")
+        ) as pool:
+            futures = {
+                pool.submit(
+                    _run_into_buffer,
+                    buffers[miat_nrt].name,
+                    miat_rt,
+                    miat_nrt,
+                    mst_rt,
+                    mst_nrt,
+                    total_messages,
+                    seed,
+                ): miat_nrt
+                for miat_nrt in miat_nrt_values
+            }
+            for future in as_completed(futures):
+                miat_nrt = futures[future]
+                try:
+                    future.result()
+                except UnstableSystemError as exc:
+                    buffers.pop(miat_nrt).close()
+                    results.append(unstable_result(miat_nrt, exc))
+                    continue
+                buffer = buffers[miat_nrt]
+                results.append(
+                    {
+                        "miat_nrt": miat_nrt,
+                        "lambda_nrt_inv": 1.0 / miat_nrt,
+                        "rt_stats": calculate_statistics_with_ci(
+                            buffer.rt_response_times, num_batches, batch_size
+                        ),
+                        "nrt_stats": calculate_statistics_with_ci(
+                            buffer.nrt_response_times, num_batches, batch_size
+                        ),
+                    }
+                )
+    except BaseException:
+        for buffer in buffers.values():
+            buffer.close()
+        raise
+
+    if not keep_samples:
+        for buffer in buffers.values():
+            buffer.close()
+        buffers = {}
+    results.sort(key=lambda r: r["miat_nrt"])
+    return results, buffers
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import itertools
 import math
 import random
-from typing import Any, Dict, List, Optional
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    from python.distributions import Distribution
 
 
 SERVER_IDLE = 0
@@ -11,6 +16,130 @@ SERVER_NONRT = 2
 
 EPS = 1e-10
 
+# Decimal places kept of the relative clocks when comparing states.
+STATE_DECIMALS = 9
+
+# Event kinds of `EventRecord`.
+EVENT_START = "start"
+EVENT_RT_ARRIVAL = "rt_arrival"
+EVENT_NRT_ARRIVAL = "nrt_arrival"
+EVENT_COMPLETION = "completion"
+
+_SERVER_STATUS = {SERVER_IDLE: "idle", SERVER_RT: "s=1", SERVER_NONRT: "s=2"}
+
+
+class EventRecord(NamedTuple):
+    """The simulation state right after one event (one row of the table)."""
+
+    index: int
+    kind: str
+    MC: float
+    RTCL: float
+    nonRTCL: float
+    nRT: int
+    nnonRT: int
+    SCL: float
+    s: int
+    preempted: Optional[float]
+    # True for an RT arrival that preempted the nonRT message in service.
+    preemption: bool = False
+
+    @property
+    def server_status(self) -> str:
+        return _SERVER_STATUS.get(self.s, str(self.s))
+
+    def as_log_entry(self) -> Dict[str, Any]:
+        """The `output_log` dictionary of this row."""
+        return {
+            "MC": self.MC,
+            "RTCL": self.RTCL,
+            "nonRTCL": self.nonRTCL,
+            "nRT": self.nRT,
+            "nnonRT": self.nnonRT,
+            "SCL": self.SCL,
+            "server_status": self.server_status,
+            "preempted": "" if self.preempted is None else f"{self.preempted:.2f}",
+        }
+
+
+def of_kind(events: Iterable[EventRecord], *kinds: str) -> Iterator[EventRecord]:
+    """Only the events of the given kinds."""
+    return (event for event in events if event.kind in kinds)
+
+
+def preemptions(events: Iterable[EventRecord]) -> Iterator[EventRecord]:
+    """Only the RT arrivals that preempted a nonRT message."""
+    return (event for event in events if event.preemption)
+
+
+def every(events: Iterable[EventRecord], k: int) -> Iterator[EventRecord]:
+    """Every `k`-th record of `events`, starting with the first (snapshots)."""
+    if k < 1:
+        raise ValueError("k must be at least 1")
+    return itertools.islice(events, 0, None, k)
+
+
+def _shift_entry(entry: Dict[str, Any], offset: float) -> Dict[str, Any]:
+    shifted = dict(entry)
+    for key in ("MC", "RTCL", "nonRTCL", "SCL"):
+        shifted[key] = entry[key] + offset
+    return shifted
+
+
+class PeriodicTrace(Sequence):
+    """
+    Read-only `output_log` of a fast-forwarded run, built entry by entry.
+
+    The trace is the simulated `prefix` (transient plus one period), then
+    `repeats` copies of `period` shifted by `period_length` each, then the
+    simulated `tail`, so a trace of 1e11 entries costs only the memory of
+    the entries actually simulated.
+    """
+
+    def __init__(
+        self,
+        prefix: List[Dict[str, Any]],
+        period: List[Dict[str, Any]],
+        period_length: float,
+        repeats: int,
+        tail: List[Dict[str, Any]],
+    ) -> None:
+        self.prefix = prefix
+        self.period = period
+        self.period_length = period_length
+        self.repeats = repeats
+        self.tail = tail
+
+    def __len__(self) -> int:
+        return len(self.prefix) + self.repeats * len(self.period) + len(self.tail)
+
+    def _entry(self, index: int) -> Dict[str, Any]:
+        if index < len(self.prefix):
+            return self.prefix[index]
+        index -= len(self.prefix)
+        skipped = self.repeats * len(self.period)
+        if index < skipped:
+            cycle, position = divmod(index, len(self.period))
+            return _shift_entry(self.period[position], (cycle + 1) * self.period_length)
+        return self.tail[index - skipped]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._entry(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("trace index out of range")
+        return self._entry(index)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        yield from self.prefix
+        for cycle in range(1, self.repeats + 1):
+            offset = cycle * self.period_length
+            for entry in self.period:
+                yield _shift_entry(entry, offset)
+        yield from self.tail
+
 
 class Simulate:
     def __init__(
@@ -21,6 +150,10 @@ class Simulate:
         nrt_service: float,
         use_exponential: bool = False,
         seed: Optional[int] = None,
+        rt_arrival_dist: Optional[Distribution] = None,
+        nrt_arrival_dist: Optional[Distribution] = None,
+        rt_service_dist: Optional[Distribution] = None,
+        nrt_service_dist: Optional[Distribution] = None,
     ) -> None:
         self.rt_inter_arrival = rt_inter_arrival
         self.nrt_inter_arrival = nrt_inter_arrival
@@ -32,6 +165,20 @@ class Simulate:
         if seed is not None:
             random.seed(seed)
 
+        # Per-class distributions override `use_exponential` for that stream.
+        dists = (rt_arrival_dist, nrt_arrival_dist, rt_service_dist, nrt_service_dist)
+        self._rt_iat_stream = self._nrt_iat_stream = None
+        self._rt_service_stream = self._nrt_service_stream = None
+        if any(d is not None for d in dists):
+            from python.distributions import make_streams
+
+            (
+                self._rt_iat_stream,
+                self._nrt_iat_stream,
+                self._rt_service_stream,
+                self._nrt_service_stream,
+            ) = make_streams(dists, seed)
+
         # Initial conditions (aligned with the assignment’s example tables)
         self.MC: float = 0.0
         self.RTCL: float = 3.0
@@ -59,48 +206,73 @@ class Simulate:
             return -mean_value * math.log(r)
         return mean_value
 
-    def log_state(self) -> None:
-        """Append the current state to `output_log` and optionally print it."""
-        preempted_str = (
-            ""
-            if self.preempted_service_time is None
-            else f"{self.preempted_service_time:.2f}"
+    def next_rt_inter_arrival(self) -> float:
+        """Return the next RT inter-arrival time from its distribution."""
+        if self._rt_iat_stream is not None:
+            return self._rt_iat_stream()
+        return self.generate_inter_arrival_time(self.rt_inter_arrival)
+
+    def next_nrt_inter_arrival(self) -> float:
+        """Return the next nonRT inter-arrival time from its distribution."""
+        if self._nrt_iat_stream is not None:
+            return self._nrt_iat_stream()
+        return self.generate_inter_arrival_time(self.nrt_inter_arrival)
+
+    def next_rt_service_time(self) -> float:
+        """Return the next RT service time from its distribution."""
+        if self._rt_service_stream is not None:
+            return self._rt_service_stream()
+        return self.generate_service_time(self.rt_service)
+
+    def next_nrt_service_time(self) -> float:
+        """Return the next nonRT service time from its distribution."""
+        if self._nrt_service_stream is not None:
+            return self._nrt_service_stream()
+        return self.generate_service_time(self.nrt_service)
+
+    def snapshot(
+        self, kind: str = EVENT_START, index: int = 0, preemption: bool = False
+    ) -> EventRecord:
+        """The current state as an immutable `EventRecord`."""
+        return EventRecord(
+            index,
+            kind,
+            self.MC,
+            self.RTCL,
+            self.nonRTCL,
+            self.nRT,
+            self.nnonRT,
+            self.SCL,
+            self.s,
+            self.preempted_service_time,
+            preemption,
         )
-        server_status_str = {
-            SERVER_IDLE: "idle",
-            SERVER_RT: "s=1",
-            SERVER_NONRT: "s=2",
-        }.get(self.s, str(self.s))
 
-        log_entry: Dict[str, Any] = {
-            "MC": self.MC,
-            "RTCL": self.RTCL,
-            "nonRTCL": self.nonRTCL,
-            "nRT": self.nRT,
-            "nnonRT": self.nnonRT,
-            "SCL": self.SCL,
-            "server_status": server_status_str,
-            "preempted": preempted_str,
-        }
+    def _record(self, event: EventRecord) -> None:
+        log_entry = event.as_log_entry()
         self.output_log.append(log_entry)
 
         if self._print_log:
             print(
-                f"{self.MC:6.2f} | {self.RTCL:8.2f} | {self.nonRTCL:10.2f} | "
-                f"{self.nRT:3} | {self.nnonRT:6} | {self.SCL:8.2f} | "
-                f"{server_status_str:15} | {preempted_str:20}"
+                f"{event.MC:6.2f} | {event.RTCL:8.2f} | {event.nonRTCL:10.2f} | "
+                f"{event.nRT:3} | {event.nnonRT:6} | {event.SCL:8.2f} | "
+                f"{log_entry['server_status']:15} | {log_entry['preempted']:20}"
             )
 
+    def log_state(self) -> None:
+        """Append the current state to `output_log` and optionally print it."""
+        self._record(self.snapshot())
+
     def handle_rt_arrival(self) -> None:
         """Process an RT arrival event and apply preemption if needed."""
         self.MC = self.RTCL
         self.nRT += 1
-        iat = self.generate_inter_arrival_time(self.rt_inter_arrival)
+        iat = self.next_rt_inter_arrival()
         self.RTCL = self.MC + iat
 
         if self.nRT == 1:
             if self.s == SERVER_IDLE:
-                st = self.generate_service_time(self.rt_service)
+                st = self.next_rt_service_time()
                 self.SCL = self.MC + st
                 self.nRT -= 1
                 self.s = SERVER_RT
@@ -112,7 +284,7 @@ class Simulate:
                 else:
                     self.preempted_service_time = None
 
-                st = self.generate_service_time(self.rt_service)
+                st = self.next_rt_service_time()
                 self.SCL = self.MC + st
                 self.nRT -= 1
                 self.s = SERVER_RT
@@ -121,11 +293,11 @@ class Simulate:
         """Process a nonRT arrival event."""
         self.MC = self.nonRTCL
         self.nnonRT += 1
-        iat = self.generate_inter_arrival_time(self.nrt_inter_arrival)
+        iat = self.next_nrt_inter_arrival()
         self.nonRTCL = self.MC + iat
 
         if self.nnonRT == 1 and self.s == SERVER_IDLE:
-            st = self.generate_service_time(self.nrt_service)
+            st = self.next_nrt_service_time()
             self.SCL = self.MC + st
             self.nnonRT -= 1
             self.s = SERVER_NONRT
@@ -135,7 +307,7 @@ class Simulate:
         self.MC = self.SCL
 
         if self.nRT > 0:
-            st = self.generate_service_time(self.rt_service)
+            st = self.next_rt_service_time()
             self.SCL = self.MC + st
             self.s = SERVER_RT
             self.nRT -= 1
@@ -144,7 +316,7 @@ class Simulate:
                 st = self.preempted_service_time
                 self.preempted_service_time = None
             else:
-                st = self.generate_service_time(self.nrt_service)
+                st = self.next_nrt_service_time()
             self.SCL = self.MC + st
             self.s = SERVER_NONRT
             self.nnonRT -= 1
@@ -152,6 +324,51 @@ class Simulate:
             self.s = SERVER_IDLE
             self.SCL = float("inf")
 
+    def iter_events(self, max_time: float = math.inf) -> Iterator[EventRecord]:
+        """
+        Advance the simulation lazily, yielding an `EventRecord` per event.
+
+        The first record is the current state (kind "start"), then one per
+        handled event until the next event would come after `max_time`
+        (never, by default). Nothing is kept, so unbounded runs need
+        constant memory, and the simulation simply stops where the consumer
+        stops iterating; a later call continues from there. Records compose
+        with `of_kind`, `preemptions`, `every` and `itertools`.
+        """
+        index = 0
+        yield self.snapshot(EVENT_START, index)
+
+        while self.MC < max_time:
+            next_event_time = min(self.RTCL, self.nonRTCL)
+            if self.s != SERVER_IDLE:
+                next_event_time = min(next_event_time, self.SCL)
+
+            if next_event_time > max_time:
+                break
+
+            rt_due = abs(self.RTCL - next_event_time) < EPS
+            nrt_due = abs(self.nonRTCL - next_event_time) < EPS
+            svc_due = self.s != SERVER_IDLE and abs(self.SCL - next_event_time) < EPS
+
+            # If clocks tie (possible with integer clocks), process arrivals before completion.
+            if rt_due:
+                s_before = self.s
+                self.handle_rt_arrival()
+                index += 1
+                yield self.snapshot(
+                    EVENT_RT_ARRIVAL,
+                    index,
+                    s_before == SERVER_NONRT and self.s == SERVER_RT,
+                )
+            if nrt_due:
+                self.handle_nrt_arrival()
+                index += 1
+                yield self.snapshot(EVENT_NRT_ARRIVAL, index)
+            if svc_due:
+                self.handle_service_completion()
+                index += 1
+                yield self.snapshot(EVENT_COMPLETION, index)
+
     def run(self, max_time: float, print_log: bool = True) -> List[Dict[str, Any]]:
         """Run the simulation until the next event would exceed `max_time`."""
         self._print_log = print_log
@@ -163,13 +380,108 @@ class Simulate:
             )
             print("=" * 100)
 
+        for event in self.iter_events(max_time):
+            self._record(event)
+
+        return self.output_log
+
+    def _state_key(self) -> Tuple:
+        """The state relative to MC, rounded so float noise does not hide repeats."""
+        mc = self.MC
+        return (
+            round(self.RTCL - mc, STATE_DECIMALS),
+            round(self.nonRTCL - mc, STATE_DECIMALS),
+            math.inf if self.s == SERVER_IDLE else round(self.SCL - mc, STATE_DECIMALS),
+            self.nRT,
+            self.nnonRT,
+            self.s,
+            None
+            if self.preempted_service_time is None
+            else round(self.preempted_service_time, STATE_DECIMALS),
+        )
+
+    def fast_forward(self, max_time: float, max_events: int = 1_000_000) -> Dict[str, Any]:
+        """
+        Run a deterministic simulation to `max_time` by skipping whole periods.
+
+        With constant inter-arrival and service times the state, taken
+        relative to MC (clocks, queue counts, server status and preempted
+        residual), eventually repeats. Once it does, the run jumps over as
+        many whole periods as fit before `max_time` and simulates only the
+        remainder, so horizons like 1e12 take as long as one period.
+
+        `output_log` becomes a `PeriodicTrace`, equal entry for entry to the
+        log `run(max_time)` would produce, but only materialised on access.
+
+        Returns:
+            Summary statistics over [0, max_time]: event counts, per-class
+            server utilisation, time-average nRT and nnonRT, and where the
+            period starts, its length and how many periods were skipped
+
+        Raises:
+            ValueError: for random variates
+            RuntimeError: if no state repeats within `max_events` events
+                before `max_time` is reached
+        """
+        if self.use_exponential or any(
+            stream is not None
+            for stream in (
+                self._rt_iat_stream,
+                self._nrt_iat_stream,
+                self._rt_service_stream,
+                self._nrt_service_stream,
+            )
+        ):
+            raise ValueError("fast-forward needs constant inter-arrival and service times")
+
+        self._print_log = False
+        self.output_log = []
         self.log_state()
 
+        # rt arrivals, nrt arrivals, completions, preemptions, RT busy time,
+        # nonRT busy time, integral of nRT, integral of nnonRT.
+        totals = [0.0] * 8
+        seen: Dict[Tuple, Tuple[int, float, List[float]]] = {}
+        period = None
+        skipped = 0
+
+        def advance(until: float) -> None:
+            dt = until - self.MC
+            if self.s == SERVER_RT:
+                totals[4] += dt
+            elif self.s == SERVER_NONRT:
+                totals[5] += dt
+            totals[6] += self.nRT * dt
+            totals[7] += self.nnonRT * dt
+
         while self.MC < max_time:
+            if period is None:
+                key = self._state_key()
+                if key in seen:
+                    start_index, start_mc, start_totals = seen[key]
+                    period = (start_index, start_mc, self.MC - start_mc)
+                    length = self.MC - start_mc
+                    skipped = int((max_time - self.MC) // length)
+                    if skipped:
+                        offset = skipped * length
+                        for i in range(8):
+                            totals[i] += skipped * (totals[i] - start_totals[i])
+                        self.MC += offset
+                        self.RTCL += offset
+                        self.nonRTCL += offset
+                        self.SCL += offset
+                    prefix_len = len(self.output_log)
+                elif len(seen) >= max_events:
+                    raise RuntimeError(
+                        f"No repeated state within {max_events} events; "
+                        "the system may be overloaded"
+                    )
+                else:
+                    seen[key] = (len(self.output_log), self.MC, list(totals))
+
             next_event_time = min(self.RTCL, self.nonRTCL)
             if self.s != SERVER_IDLE:
                 next_event_time = min(next_event_time, self.SCL)
-
             if next_event_time > max_time:
                 break
 
@@ -177,15 +489,52 @@ class Simulate:
             nrt_due = abs(self.nonRTCL - next_event_time) < EPS
             svc_due = self.s != SERVER_IDLE and abs(self.SCL - next_event_time) < EPS
 
-            # If clocks tie (possible with integer clocks), process arrivals before completion.
+            advance(next_event_time)
             if rt_due:
+                preempting = self.s == SERVER_NONRT and self.nRT == 0
                 self.handle_rt_arrival()
+                totals[0] += 1
+                if preempting and self.preempted_service_time is not None:
+                    totals[3] += 1
                 self.log_state()
             if nrt_due:
                 self.handle_nrt_arrival()
+                totals[1] += 1
                 self.log_state()
             if svc_due:
                 self.handle_service_completion()
+                totals[2] += 1
                 self.log_state()
 
-        return self.output_log
+        advance(max_time)
+
+        if period is None:
+            log = self.output_log
+            self.output_log = PeriodicTrace(log, [], 0.0, 0, [])
+            period_start = period_length = math.nan
+        else:
+            start_index, period_start, period_length = period
+            log = self.output_log
+            self.output_log = PeriodicTrace(
+                log[:prefix_len],
+                log[start_index:prefix_len],
+                period_length,
+                skipped,
+                log[prefix_len:],
+            )
+
+        return {
+            "horizon": max_time,
+            "events": len(self.output_log) - 1,
+            "rt_arrivals": int(totals[0]),
+            "nrt_arrivals": int(totals[1]),
+            "completions": int(totals[2]),
+            "preemptions": int(totals[3]),
+            "rt_utilization": totals[4] / max_time,
+            "nrt_utilization": totals[5] / max_time,
+            "mean_nRT": totals[6] / max_time,
+            "mean_nnonRT": totals[7] / max_time,
+            "period_start": period_start,
+            "period_length": period_length,
+            "periods_skipped": skipped,
+        }
@@ -1,8 +1,29 @@
 from __future__ import annotations
+import copy
 import math
 import random
 from collections import deque
-from typing import List, Optional
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Union
+
+from scheduling import (
+    RT_DISCIPLINES,
+    RT_EDF,
+    RT_FIFO,
+    DeadlineQueue,
+    SchedulingPolicy,
+    get_policy,
+)
+
+try:
+    from mypy_extensions import mypyc_attr
+except ImportError:  # only needed when compiling with mypyc
+
+    def mypyc_attr(*args, **kwargs):  # type: ignore[misc,no-redef]
+        return lambda cls: cls
+
+if TYPE_CHECKING:
+    from arrival_rates import RateFunction
+    from distributions import Distribution, VariateStream
 
 
 SERVER_IDLE = 0
@@ -11,7 +32,103 @@ SERVER_NONRT = 2
 
 EPS = 1e-10
 
+DROP_TAIL = "tail-drop"
+DROP_OLDEST = "drop-oldest"
+PUSH_OUT = "push-out"
+DROP_POLICIES = (DROP_TAIL, DROP_OLDEST, PUSH_OUT)
+
+# `run_until_messages` looks up from the event loop every CHECKPOINT_INTERVAL
+# events, for the drift check and the progress hook.
+CHECKPOINT_INTERVAL = 10_000
+
+# Online drift check: the number of messages in the system is sampled at every
+# checkpoint, and the run is declared unstable once the last DRIFT_SAMPLES
+# samples all exceed DRIFT_MIN_QUEUE and the newest is the largest. A stable
+# queue practically never holds that many for that long.
+DRIFT_SAMPLES = 5
+DRIFT_MIN_QUEUE = 1_000
+
+
+def class_streams(
+    dists: Sequence[Optional[Distribution]], seed: Optional[int]
+) -> List[Optional[VariateStream]]:
+    """
+    One independent block-sampled stream per distribution given.
+
+    Entries without a distribution are None; those classes keep drawing
+    through `exponential_or_constant`.
+    """
+    if all(dist is None for dist in dists):
+        return [None] * len(dists)
+    from distributions import make_streams
+
+    return make_streams(dists, seed)
+
+
+def exponential_or_constant(mean_value: float, use_exponential: bool) -> float:
+    """An exponential variate with `mean_value`, or `mean_value` itself."""
+    if use_exponential:
+        r = random.random()
+        return -mean_value * math.log(r)
+    return mean_value
+
+
+# mypyc cannot compile subclasses of RuntimeError as native classes.
+@mypyc_attr(native_class=False)
+class UnstableSystemError(RuntimeError):
+    """
+    A run aborted because its queues grow without bound.
+
+    `reason` is "utilization" when the offered load was already >= 1 before
+    the run, or "drift" when the queue kept growing during it; the other
+    attributes describe where the run stood when it stopped.
+    """
 
+    def __init__(
+        self,
+        reason: str,
+        utilization: float,
+        clock: float,
+        rt_in_system: int,
+        nrt_in_system: int,
+        rt_completed: int,
+        nrt_completed: int,
+    ) -> None:
+        self.reason = reason
+        self.utilization = utilization
+        self.clock = clock
+        self.rt_in_system = rt_in_system
+        self.nrt_in_system = nrt_in_system
+        self.rt_completed = rt_completed
+        self.nrt_completed = nrt_completed
+        if reason == "utilization":
+            message = f"Unstable configuration: utilization {utilization:.3f} >= 1"
+        else:
+            message = (
+                f"Unstable run: {rt_in_system} RT and {nrt_in_system} nonRT messages "
+                f"in the system and growing at MC = {clock:.1f} "
+                f"(utilization {utilization:.3f})"
+            )
+        super().__init__(message)
+
+    def __reduce__(self):
+        # Keeps the error picklable, so it can come back from a worker process.
+        return (
+            type(self),
+            (
+                self.reason,
+                self.utilization,
+                self.clock,
+                self.rt_in_system,
+                self.nrt_in_system,
+                self.rt_completed,
+                self.nrt_completed,
+            ),
+        )
+
+
+# Subclasses (sensitivity, regenerative, ...) stay interpreted.
+@mypyc_attr(allow_interpreted_subclasses=True)
 class SimulateTask3:
     def __init__(
         self,
@@ -21,71 +138,335 @@ class SimulateTask3:
         nrt_service: float,
         use_exponential: bool = True,
         seed: Optional[int] = None,
+        rt_arrival_rate: Optional[RateFunction] = None,
+        nrt_arrival_rate: Optional[RateFunction] = None,
+        record_arrival_times: bool = False,
+        rt_arrival_dist: Optional[Distribution] = None,
+        nrt_arrival_dist: Optional[Distribution] = None,
+        rt_service_dist: Optional[Distribution] = None,
+        nrt_service_dist: Optional[Distribution] = None,
+        rt_capacity: Optional[int] = None,
+        nrt_capacity: Optional[int] = None,
+        total_capacity: Optional[int] = None,
+        drop_policy: str = DROP_TAIL,
+        policy: Union[str, SchedulingPolicy] = "preemptive-resume",
+        check_stability: bool = True,
+        rt_deadline_dist: Optional[Distribution] = None,
+        rt_discipline: str = RT_FIFO,
+        drop_expired: bool = False,
     ) -> None:
         self.rt_inter_arrival = rt_inter_arrival
         self.nrt_inter_arrival = nrt_inter_arrival
         self.rt_service = rt_service
         self.nrt_service = nrt_service
         self.use_exponential = use_exponential
+        # Time-varying rates replace the constant mean inter-arrival times.
+        self.rt_arrival_rate = rt_arrival_rate
+        self.nrt_arrival_rate = nrt_arrival_rate
+        self.record_arrival_times = record_arrival_times
+
+        # Buffer limits count messages of a class in the system, including
+        # the one in service or preempted; `total_capacity` bounds both.
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(
+                f"Unknown drop policy {drop_policy!r}; expected one of {DROP_POLICIES}"
+            )
+        for capacity in (rt_capacity, nrt_capacity, total_capacity):
+            if capacity is not None and capacity < 1:
+                raise ValueError("buffer capacities must be at least 1")
+        self.rt_capacity = rt_capacity
+        self.nrt_capacity = nrt_capacity
+        self.total_capacity = total_capacity
+        self.drop_policy = drop_policy
+        self._bounded = (
+            rt_capacity is not None
+            or nrt_capacity is not None
+            or total_capacity is not None
+        )
+
+        # Refuse offered loads >= 1 and abort runs whose queues keep growing
+        # (see `UnstableSystemError`); bounded buffers cannot grow anyway.
+        self.check_stability = check_stability
+
+        # Called as hook(sim, events) at every checkpoint of
+        # `run_until_messages` and once when it returns.
+        self.progress_hook: Optional[Callable[[SimulateTask3, int], None]] = None
+
+        self.policy = get_policy(policy)
+        self._preemptive = self.policy.preemptive
+        self._repeat = self.policy.repeat
+        self._fifo = self.policy.fifo
+
+        # Relative RT deadlines; with `rt_discipline="edf"` waiting RT
+        # messages are served earliest deadline first, and `drop_expired`
+        # discards a waiting RT message whose deadline has passed when it
+        # reaches the head of the queue.
+        if rt_discipline not in RT_DISCIPLINES:
+            raise ValueError(
+                f"Unknown RT discipline {rt_discipline!r}; "
+                f"expected one of {RT_DISCIPLINES}"
+            )
+        if rt_deadline_dist is None and (rt_discipline == RT_EDF or drop_expired):
+            raise ValueError("EDF and drop_expired need rt_deadline_dist")
+        self.rt_discipline = rt_discipline
+        self.drop_expired = drop_expired
+        self._deadlines = rt_deadline_dist is not None
 
         if seed is not None:
             random.seed(seed)
 
+        # Per-class distributions each get an independent block-sampled
+        # stream; classes without one keep the `use_exponential` behaviour.
+        dists = (
+            rt_arrival_dist,
+            nrt_arrival_dist,
+            rt_service_dist,
+            nrt_service_dist,
+            rt_deadline_dist,
+        )
+        (
+            self._rt_iat_stream,
+            self._nrt_iat_stream,
+            self._rt_service_stream,
+            self._nrt_service_stream,
+            self._rt_deadline_stream,
+        ) = class_streams(dists, seed)
+        if any(d is not None for d in dists):
+            if rt_arrival_dist is not None:
+                self.rt_inter_arrival = rt_arrival_dist.mean
+            if nrt_arrival_dist is not None:
+                self.nrt_inter_arrival = nrt_arrival_dist.mean
+            if rt_service_dist is not None:
+                self.rt_service = rt_service_dist.mean
+            if nrt_service_dist is not None:
+                self.nrt_service = nrt_service_dist.mean
+
         self.MC: float = 0.0
         self.SCL: float = float("inf")
         self.s: int = SERVER_IDLE
 
-        self.rt_queue: deque[tuple[float, int]] = deque()
+        # Absolute deadlines of the RT messages in the system, by message id.
+        self.rt_deadlines: Dict[int, float] = {}
+        self.rt_queue: Union[deque[tuple[float, int]], DeadlineQueue] = (
+            DeadlineQueue(self.rt_deadlines) if rt_discipline == RT_EDF else deque()
+        )
         self.nrt_queue: deque[tuple[float, int]] = deque()
 
         self.rt_response_times: List[float] = []
         self.nrt_response_times: List[float] = []
+        # Arrival times of completed messages, parallel to the response times.
+        self.rt_arrival_times: List[float] = []
+        self.nrt_arrival_times: List[float] = []
 
         self.rt_message_id = 0
         self.nrt_message_id = 0
 
-        self.preempted_service_time: Optional[float] = None
+        # Loss accounting for bounded buffers: one 0/1 entry per arrival
+        # (indexed by message id minus the base at the last reset).
+        self.rt_arrivals = 0
+        self.nrt_arrivals = 0
+        self.rt_dropped = 0
+        self.nrt_dropped = 0
+        self.rt_loss_indicators: List[int] = []
+        self.nrt_loss_indicators: List[int] = []
+        self._rt_id_base = 0
+        self._nrt_id_base = 0
+
+        # One 0/1 entry per RT message leaving with a deadline: 1 if it
+        # completed after its deadline or expired in the queue.
+        self.rt_deadline_misses: List[int] = []
+        self.rt_expired = 0
 
-        iat_rt = self.generate_inter_arrival_time(self.rt_inter_arrival)
-        iat_nrt = self.generate_inter_arrival_time(self.nrt_inter_arrival)
-        self.RTCL = iat_rt
-        self.nonRTCL = iat_nrt
+        self.preempted_service_time: Optional[float] = None
+        # Full service requirement of the nonRT message last started.
+        self.nrt_service_requirement: float = 0.0
+
+        self.RTCL = self.next_rt_arrival_time()
+        self.nonRTCL = self.next_nrt_arrival_time()
+
+    def utilization(self) -> float:
+        """Offered load MST_RT/MIAT_RT + MST_nonRT/MIAT_nonRT (long-run rates)."""
+        rt_rate = (
+            self.rt_arrival_rate.mean_rate
+            if self.rt_arrival_rate is not None
+            else 1.0 / self.rt_inter_arrival
+        )
+        nrt_rate = (
+            self.nrt_arrival_rate.mean_rate
+            if self.nrt_arrival_rate is not None
+            else 1.0 / self.nrt_inter_arrival
+        )
+        return self.rt_service * rt_rate + self.nrt_service * nrt_rate
+
+    def _unstable(self, reason: str) -> UnstableSystemError:
+        return UnstableSystemError(
+            reason,
+            self.utilization(),
+            self.MC,
+            len(self.rt_queue),
+            len(self.nrt_queue),
+            len(self.rt_response_times),
+            len(self.nrt_response_times),
+        )
 
     def generate_inter_arrival_time(self, mean_value: float) -> float:
-        if self.use_exponential:
-            r = random.random()
-            return -mean_value * math.log(r)
-        return mean_value
+        return exponential_or_constant(mean_value, self.use_exponential)
 
     def generate_service_time(self, mean_value: float) -> float:
-        if self.use_exponential:
-            r = random.random()
-            return -mean_value * math.log(r)
-        return mean_value
+        return exponential_or_constant(mean_value, self.use_exponential)
+
+    def next_rt_arrival_time(self) -> float:
+        if self.rt_arrival_rate is not None:
+            return self.rt_arrival_rate.next_arrival(self.MC)
+        if self._rt_iat_stream is not None:
+            return self.MC + self._rt_iat_stream()
+        return self.MC + self.generate_inter_arrival_time(self.rt_inter_arrival)
+
+    def next_nrt_arrival_time(self) -> float:
+        if self.nrt_arrival_rate is not None:
+            return self.nrt_arrival_rate.next_arrival(self.MC)
+        if self._nrt_iat_stream is not None:
+            return self.MC + self._nrt_iat_stream()
+        return self.MC + self.generate_inter_arrival_time(self.nrt_inter_arrival)
+
+    def next_rt_service_time(self) -> float:
+        if self._rt_service_stream is not None:
+            return self._rt_service_stream()
+        return self.generate_service_time(self.rt_service)
+
+    def next_nrt_service_time(self) -> float:
+        if self._nrt_service_stream is not None:
+            return self._nrt_service_stream()
+        return self.generate_service_time(self.nrt_service)
+
+    def _drop_waiting(self, cls: int, oldest: bool) -> bool:
+        """Drop one waiting (never started) message of `cls`; False if none."""
+        if cls == SERVER_RT:
+            rt_queue = self.rt_queue
+            if isinstance(rt_queue, DeadlineQueue):
+                dropped = rt_queue.drop_waiting(oldest)
+                if dropped is None:
+                    return False
+                self._record_rt_drop(dropped)
+                return True
+            queue = rt_queue
+            first_waiting = 1 if self.s == SERVER_RT else 0
+        else:
+            queue = self.nrt_queue
+            started = self.s == SERVER_NONRT or self.preempted_service_time is not None
+            first_waiting = 1 if started else 0
+        if len(queue) <= first_waiting:
+            return False
+
+        if oldest:
+            _, msg_id = queue[first_waiting]
+            del queue[first_waiting]
+        else:
+            _, msg_id = queue.pop()
+
+        if cls == SERVER_RT:
+            self._record_rt_drop(msg_id)
+        else:
+            self.nrt_dropped += 1
+            idx = msg_id - self._nrt_id_base
+            if 0 <= idx < len(self.nrt_loss_indicators):
+                self.nrt_loss_indicators[idx] = 1
+        return True
+
+    def _record_rt_drop(self, msg_id: int) -> None:
+        self.rt_dropped += 1
+        self.rt_deadlines.pop(msg_id, None)
+        idx = msg_id - self._rt_id_base
+        if 0 <= idx < len(self.rt_loss_indicators):
+            self.rt_loss_indicators[idx] = 1
+
+    def _drop_expired_rt(self) -> None:
+        """Discard waiting RT messages at the head whose deadline has passed."""
+        rt_queue = self.rt_queue
+        deadlines = self.rt_deadlines
+        while rt_queue and deadlines.get(rt_queue[0][1], math.inf) < self.MC:
+            _, msg_id = rt_queue.popleft()
+            del deadlines[msg_id]
+            self.rt_expired += 1
+            self.rt_deadline_misses.append(1)
+
+    def _admit(self, cls: int) -> bool:
+        """Apply the buffer limits to an arrival of `cls`; False if it is lost."""
+        if cls == SERVER_RT:
+            own_len, own_cap = len(self.rt_queue), self.rt_capacity
+        else:
+            own_len, own_cap = len(self.nrt_queue), self.nrt_capacity
+
+        admitted = True
+        if own_cap is not None and own_len >= own_cap:
+            admitted = self.drop_policy == DROP_OLDEST and self._drop_waiting(
+                cls, oldest=True
+            )
+
+        total_cap = self.total_capacity
+        if (
+            admitted
+            and total_cap is not None
+            and len(self.rt_queue) + len(self.nrt_queue) >= total_cap
+        ):
+            if self.drop_policy == PUSH_OUT and cls == SERVER_RT:
+                admitted = self._drop_waiting(SERVER_NONRT, oldest=False)
+            elif self.drop_policy == DROP_OLDEST:
+                admitted = self._drop_waiting(cls, oldest=True)
+            else:
+                admitted = False
+
+        lost = 0 if admitted else 1
+        if cls == SERVER_RT:
+            self.rt_arrivals += 1
+            self.rt_loss_indicators.append(lost)
+            if lost:
+                self.rt_dropped += 1
+                self.rt_message_id += 1
+        else:
+            self.nrt_arrivals += 1
+            self.nrt_loss_indicators.append(lost)
+            if lost:
+                self.nrt_dropped += 1
+                self.nrt_message_id += 1
+        return admitted
 
     def handle_rt_arrival(self) -> None:
         self.MC = self.RTCL
         arrival_time = self.MC
 
-        self.rt_queue.append((arrival_time, self.rt_message_id))
+        if self._bounded and not self._admit(SERVER_RT):
+            self.RTCL = self.next_rt_arrival_time()
+            return
+
+        if self._rt_deadline_stream is not None:
+            deadline = arrival_time + self._rt_deadline_stream()
+            self.rt_deadlines[self.rt_message_id] = deadline
+        rt_queue = self.rt_queue
+        rt_queue.append((arrival_time, self.rt_message_id))
         self.rt_message_id += 1
 
-        iat = self.generate_inter_arrival_time(self.rt_inter_arrival)
-        self.RTCL = self.MC + iat
+        self.RTCL = self.next_rt_arrival_time()
 
-        if len(self.rt_queue) == 1:
+        if len(rt_queue) == 1:
             if self.s == SERVER_IDLE:
-                st = self.generate_service_time(self.rt_service)
+                if isinstance(rt_queue, DeadlineQueue):
+                    rt_queue.pin()
+                st = self.next_rt_service_time()
                 self.SCL = self.MC + st
                 self.s = SERVER_RT
-            elif self.s == SERVER_NONRT:
+            elif self.s == SERVER_NONRT and self._preemptive:
                 remaining_time = self.SCL - self.MC
                 if remaining_time > EPS:
-                    self.preempted_service_time = remaining_time
+                    self.preempted_service_time = (
+                        self.nrt_service_requirement if self._repeat else remaining_time
+                    )
                 else:
                     self.preempted_service_time = None
 
-                st = self.generate_service_time(self.rt_service)
+                if isinstance(rt_queue, DeadlineQueue):
+                    rt_queue.pin()
+                st = self.next_rt_service_time()
                 self.SCL = self.MC + st
                 self.s = SERVER_RT
 
@@ -93,67 +474,144 @@ class SimulateTask3:
         self.MC = self.nonRTCL
         arrival_time = self.MC
 
+        if self._bounded and not self._admit(SERVER_NONRT):
+            self.nonRTCL = self.next_nrt_arrival_time()
+            return
+
         self.nrt_queue.append((arrival_time, self.nrt_message_id))
         self.nrt_message_id += 1
 
-        iat = self.generate_inter_arrival_time(self.nrt_inter_arrival)
-        self.nonRTCL = self.MC + iat
+        self.nonRTCL = self.next_nrt_arrival_time()
 
         if len(self.nrt_queue) == 1 and self.s == SERVER_IDLE:
-            st = self.generate_service_time(self.nrt_service)
+            st = self.next_nrt_service_time()
+            self.nrt_service_requirement = st
+            self.SCL = self.MC + st
+            self.s = SERVER_NONRT
+
+    def start_next_service(self) -> None:
+        if self.drop_expired:
+            self._drop_expired_rt()
+        rt_queue = self.rt_queue
+        nrt_queue = self.nrt_queue
+        if rt_queue and (
+            not self._fifo or not nrt_queue or rt_queue[0][0] <= nrt_queue[0][0]
+        ):
+            if isinstance(rt_queue, DeadlineQueue):
+                rt_queue.pin()
+            st = self.next_rt_service_time()
+            self.SCL = self.MC + st
+            self.s = SERVER_RT
+        elif nrt_queue:
+            if self.preempted_service_time is not None:
+                st = self.preempted_service_time
+                self.preempted_service_time = None
+            else:
+                st = self.next_nrt_service_time()
+                self.nrt_service_requirement = st
             self.SCL = self.MC + st
             self.s = SERVER_NONRT
+        else:
+            self.s = SERVER_IDLE
+            self.SCL = float("inf")
 
     def handle_service_completion(self) -> None:
         self.MC = self.SCL
 
         if self.s == SERVER_RT:
             if self.rt_queue:
-                arrival_time, _ = self.rt_queue.popleft()
+                arrival_time, msg_id = self.rt_queue.popleft()
                 response_time = self.MC - arrival_time
                 self.rt_response_times.append(response_time)
+                if self._deadlines:
+                    deadline = self.rt_deadlines.pop(msg_id, math.inf)
+                    self.rt_deadline_misses.append(1 if self.MC > deadline else 0)
+                if self.record_arrival_times:
+                    self.rt_arrival_times.append(arrival_time)
 
-            if self.rt_queue:
-                st = self.generate_service_time(self.rt_service)
-                self.SCL = self.MC + st
-                self.s = SERVER_RT
-            elif self.nrt_queue:
-                if self.preempted_service_time is not None:
-                    st = self.preempted_service_time
-                    self.preempted_service_time = None
-                else:
-                    st = self.generate_service_time(self.nrt_service)
-                self.SCL = self.MC + st
-                self.s = SERVER_NONRT
-            else:
-                self.s = SERVER_IDLE
-                self.SCL = float("inf")
+            self.start_next_service()
 
         elif self.s == SERVER_NONRT:
             if self.nrt_queue:
                 arrival_time, _ = self.nrt_queue.popleft()
                 response_time = self.MC - arrival_time
                 self.nrt_response_times.append(response_time)
-
-            if self.rt_queue:
-                st = self.generate_service_time(self.rt_service)
-                self.SCL = self.MC + st
-                self.s = SERVER_RT
-            elif self.nrt_queue:
-                if self.preempted_service_time is not None:
-                    st = self.preempted_service_time
-                    self.preempted_service_time = None
-                else:
-                    st = self.generate_service_time(self.nrt_service)
-                self.SCL = self.MC + st
-                self.s = SERVER_NONRT
-            else:
-                self.s = SERVER_IDLE
-                self.SCL = float("inf")
+                if self.record_arrival_times:
+                    self.nrt_arrival_times.append(arrival_time)
+
+            self.start_next_service()
+
+    def step(self) -> None:
+        """Process the events due at the next event time."""
+        next_event_time = min(self.RTCL, self.nonRTCL)
+        if self.s != SERVER_IDLE and self.SCL != float("inf"):
+            next_event_time = min(next_event_time, self.SCL)
+
+        if next_event_time == float("inf"):
+            raise RuntimeError("No events scheduled - simulation cannot proceed")
+
+        rt_due = abs(self.RTCL - next_event_time) < EPS
+        nrt_due = abs(self.nonRTCL - next_event_time) < EPS
+        svc_due = (
+            self.s != SERVER_IDLE
+            and self.SCL != float("inf")
+            and abs(self.SCL - next_event_time) < EPS
+        )
+
+        if rt_due:
+            self.handle_rt_arrival()
+        if nrt_due:
+            self.handle_nrt_arrival()
+        if svc_due:
+            self.handle_service_completion()
+
+    def clone(self) -> SimulateTask3:
+        """
+        A copy of the current state that continues independently.
+
+        Clock, queues, server and pending event times are copied; collected
+        response times and loss records start empty. Random variates come
+        from the same generators as the original, so the copies draw
+        different values from their next sample on. Costs O(queue length).
+        """
+        twin = copy.copy(self)
+        twin.rt_deadlines = dict(self.rt_deadlines)
+        rt_queue = self.rt_queue
+        if isinstance(rt_queue, DeadlineQueue):
+            twin.rt_queue = rt_queue.copy(twin.rt_deadlines)
+        else:
+            twin.rt_queue = deque(rt_queue)
+        twin.nrt_queue = deque(self.nrt_queue)
+        twin.rt_response_times = []
+        twin.nrt_response_times = []
+        twin.rt_arrival_times = []
+        twin.nrt_arrival_times = []
+        twin.rt_loss_indicators = []
+        twin.nrt_loss_indicators = []
+        twin.rt_deadline_misses = []
+        return twin
 
     def run_until_messages(self, num_rt_messages: int, num_nrt_messages: int) -> None:
         self.rt_response_times.clear()
         self.nrt_response_times.clear()
+        self.rt_arrival_times.clear()
+        self.nrt_arrival_times.clear()
+        self.rt_loss_indicators.clear()
+        self.nrt_loss_indicators.clear()
+        self.rt_deadline_misses.clear()
+        self.rt_expired = 0
+        self._rt_id_base = self.rt_message_id
+        self._nrt_id_base = self.nrt_message_id
+        self.rt_arrivals = self.nrt_arrivals = 0
+        self.rt_dropped = self.nrt_dropped = 0
+
+        watch_drift = self.check_stability and not self._bounded
+        if watch_drift and self.utilization() >= 1.0:
+            raise self._unstable("utilization")
+        drift_samples: List[int] = []
+        hook = self.progress_hook
+        checkpoints = watch_drift or hook is not None
+        next_checkpoint = CHECKPOINT_INTERVAL
 
         max_iterations = 10_000_000
         iteration = 0
@@ -169,28 +627,21 @@ class SimulateTask3:
                     f"Collected {len(self.rt_response_times)} RT and "
                     f"{len(self.nrt_response_times)} nonRT messages."
                 )
-
-            next_event_time = min(self.RTCL, self.nonRTCL)
-            if self.s != SERVER_IDLE and self.SCL != float("inf"):
-                next_event_time = min(next_event_time, self.SCL)
-
-            if next_event_time == float("inf"):
-                raise RuntimeError("No events scheduled - simulation cannot proceed")
-
-            rt_due = abs(self.RTCL - next_event_time) < EPS
-            nrt_due = abs(self.nonRTCL - next_event_time) < EPS
-            svc_due = (
-                self.s != SERVER_IDLE
-                and self.SCL != float("inf")
-                and abs(self.SCL - next_event_time) < EPS
-            )
-
-            if rt_due:
-                self.handle_rt_arrival()
-            if nrt_due:
-                self.handle_nrt_arrival()
-            if svc_due:
-                self.handle_service_completion()
+            if checkpoints and iteration == next_checkpoint:
+                next_checkpoint += CHECKPOINT_INTERVAL
+                if hook is not None:
+                    hook(self, iteration)
+                if watch_drift:
+                    drift_samples.append(len(self.rt_queue) + len(self.nrt_queue))
+                    recent = drift_samples[-DRIFT_SAMPLES:]
+                    if (
+                        len(recent) == DRIFT_SAMPLES
+                        and min(recent) > DRIFT_MIN_QUEUE
+                        and recent[-1] == max(recent)
+                    ):
+                        raise self._unstable("drift")
+
+            self.step()
 
             if (
                 len(self.rt_response_times) >= num_rt_messages
@@ -200,5 +651,12 @@ class SimulateTask3:
 
         if len(self.rt_response_times) > num_rt_messages:
             self.rt_response_times = self.rt_response_times[:num_rt_messages]
+            del self.rt_arrival_times[num_rt_messages:]
         if len(self.nrt_response_times) > num_nrt_messages:
             self.nrt_response_times = self.nrt_response_times[:num_nrt_messages]
+            del self.nrt_arrival_times[num_nrt_messages:]
+        # Expired RT drops also count, so the misses can outrun the completions.
+        del self.rt_deadline_misses[num_rt_messages:]
+
+        if hook is not None:
+            hook(self, iteration)
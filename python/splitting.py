@@ -0,0 +1,292 @@
+"""RESTART splitting for extreme response-time percentiles."""
+
+from __future__ import annotations
+
+import math
+from bisect import bisect_right
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from regenerative import calculate_ratio_with_ci
+from simulate_task3 import SimulateTask3
+
+
+class WeightedSample:
+    """
+    Response times of one class from a splitting run, with their weights.
+
+    A completion observed where r trajectories simulate the same stretch of
+    time in expectation has weight 1/r, so weighted counts are unbiased for
+    counts along a single plain run. Each value also carries the batch of
+    the main trajectory it belongs to; the first batch is ignored, as in
+    `batch_means`, and tail probabilities are ratio estimates over the
+    remaining batches.
+    """
+
+    def __init__(
+        self,
+        values: Sequence[float],
+        weights: Sequence[float],
+        batches: Sequence[int],
+        num_batches: int,
+    ) -> None:
+        if num_batches < 3:
+            raise ValueError("Need at least 3 batches (one to ignore, two to use)")
+        batches = np.asarray(batches, dtype=np.intp)
+        used = batches > 0
+        order = np.argsort(np.asarray(values, dtype=np.float64)[used], kind="stable")
+        self.values = np.asarray(values, dtype=np.float64)[used][order]
+        self.weights = np.asarray(weights, dtype=np.float64)[used][order]
+        self.batches = batches[used][order] - 1
+        self.num_batches_used = num_batches - 1
+        self._batch_totals = np.bincount(
+            self.batches, weights=self.weights, minlength=self.num_batches_used
+        )
+        if not np.all(self._batch_totals > 0):
+            raise ValueError("Every batch needs at least one completed message")
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _tail(self, start: int, confidence_level: float) -> Tuple[float, float, float]:
+        """Estimate and CI of P(W >= values[start]), from the sorted values."""
+        exceed = np.bincount(
+            self.batches[start:],
+            weights=self.weights[start:],
+            minlength=self.num_batches_used,
+        )
+        ci = calculate_ratio_with_ci(exceed, self._batch_totals, confidence_level)
+        return (
+            ci["mean"],
+            max(ci["mean_ci_lower"], 0.0),
+            min(ci["mean_ci_upper"], 1.0),
+        )
+
+    def tail_probability(self, threshold: float, confidence_level: float = 0.95) -> dict:
+        """
+        P(response time > threshold) with a batch-means confidence interval.
+
+        Returns:
+            Dictionary with the probability, its confidence interval and the
+            number of batches used
+        """
+        start = int(np.searchsorted(self.values, threshold, side="right"))
+        p, lower, upper = self._tail(start, confidence_level)
+        return {
+            "probability": p,
+            "probability_ci_lower": lower,
+            "probability_ci_upper": upper,
+            "num_batches_used": self.num_batches_used,
+        }
+
+    def _first_at_or_below(self, target: float, bound: int, confidence_level: float) -> int:
+        """Smallest i whose tail bound (0 lower, 2 upper) is <= target."""
+        lo, hi = 0, len(self.values)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._tail(mid, confidence_level)[bound] <= target:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def quantile(self, p: float, confidence_level: float = 0.95) -> dict:
+        """
+        The p-quantile of the response time with a confidence interval.
+
+        The point estimate is the weighted empirical quantile. The interval
+        holds the values t whose tail-probability CI contains 1 - p, found
+        by bisection over the sorted sample; an upper end of inf means the
+        run saw too little of the tail.
+
+        Returns:
+            Dictionary with the quantile, its confidence interval and the
+            number of batches used
+        """
+        if not 0.0 < p < 1.0:
+            raise ValueError(f"p must be in (0, 1), got {p}")
+        target = 1.0 - p
+        values = self.values
+        n = len(values)
+
+        cumulative = np.cumsum(self.weights)
+        point = int(np.searchsorted(cumulative, p * cumulative[-1], side="left"))
+        lower = self._first_at_or_below(target, 1, confidence_level)
+        upper = self._first_at_or_below(target, 2, confidence_level)
+        return {
+            "quantile": values[min(point, n - 1)],
+            "quantile_ci_lower": values[min(lower, n - 1)],
+            "quantile_ci_upper": values[upper] if upper < n else math.inf,
+            "num_batches_used": self.num_batches_used,
+        }
+
+
+class RestartSplitting:
+    """
+    RESTART splitting on the number of nonRT messages in the system.
+
+    Each time a trajectory crosses threshold T_i upwards, R_i - 1 retrials
+    of level i are cloned from it; a retrial runs until the nonRT count
+    drops below its own threshold and is then discarded, while the
+    trajectory it came from carries on. The main trajectory (level 0) is
+    never discarded. Time spent at or above T_i is thus simulated
+    R_1 * ... * R_i times, and completions there are weighted by the
+    inverse. Retrials run depth-first, so the ones spawned during a batch
+    of the main trajectory count towards that batch.
+
+    Works with any `SimulateTask3` configuration; thresholds are best
+    spaced so that R_i times the probability of going from T_i to
+    T_{i+1} is about 1.
+    """
+
+    def __init__(
+        self,
+        thresholds: Sequence[int],
+        splits: Union[int, Sequence[int]],
+        max_events: int = 50_000_000,
+    ) -> None:
+        thresholds = tuple(int(t) for t in thresholds)
+        if not thresholds or thresholds[0] < 1:
+            raise ValueError("need at least one threshold, all of them >= 1")
+        if any(a >= b for a, b in zip(thresholds, thresholds[1:])):
+            raise ValueError("thresholds must be strictly increasing")
+        if isinstance(splits, int):
+            splits = (splits,) * len(thresholds)
+        splits = tuple(int(r) for r in splits)
+        if len(splits) != len(thresholds) or min(splits) < 1:
+            raise ValueError("need one split factor >= 1 per threshold")
+
+        self.thresholds = thresholds
+        self.splits = splits
+        self.max_events = max_events
+        # Weight of a completion at region i (between T_i and T_{i+1}).
+        self.region_weights = [1.0]
+        for r in splits:
+            self.region_weights.append(self.region_weights[-1] / r)
+
+        self.events = 0
+        self.retrials = 0
+        self._batch = 0
+        self._rt: Tuple[List[float], List[float], List[int]] = ([], [], [])
+        self._nrt: Tuple[List[float], List[float], List[int]] = ([], [], [])
+
+    def _collect(self, completed: List[float], into: tuple, weight: float) -> None:
+        values, weights, batches = into
+        values.extend(completed)
+        weights.extend([weight] * len(completed))
+        batches.extend([self._batch] * len(completed))
+        completed.clear()
+
+    def _event(self, sim: SimulateTask3) -> int:
+        """Advance `sim` by one event; the number of nonRT completions."""
+        thresholds = self.thresholds
+        region = bisect_right(thresholds, len(sim.nrt_queue))
+        sim.step()
+        self.events += 1
+        if self.events > self.max_events:
+            raise RuntimeError(
+                f"Splitting exceeded {self.max_events} events "
+                f"({self.retrials} retrials); use fewer or smaller splits"
+            )
+
+        weight = self.region_weights[region]
+        if sim.rt_response_times:
+            self._collect(sim.rt_response_times, self._rt, weight)
+        nrt_done = len(sim.nrt_response_times)
+        if nrt_done:
+            self._collect(sim.nrt_response_times, self._nrt, weight)
+
+        new_region = bisect_right(thresholds, len(sim.nrt_queue))
+        for level in range(region + 1, new_region + 1):
+            for _ in range(self.splits[level - 1] - 1):
+                self._retrial(sim.clone(), level)
+        return nrt_done
+
+    def _retrial(self, sim: SimulateTask3, level: int) -> None:
+        self.retrials += 1
+        floor = self.thresholds[level - 1]
+        while len(sim.nrt_queue) >= floor:
+            self._event(sim)
+
+    def run(
+        self, sim: SimulateTask3, num_batches: int, batch_size: int
+    ) -> Tuple[WeightedSample, WeightedSample]:
+        """
+        Run `sim` as the main trajectory for `num_batches` batches of
+        `batch_size` nonRT completions each.
+
+        Returns:
+            (rt_sample, nrt_sample) of weighted response times
+        """
+        if sim.check_stability and sim.utilization() >= 1.0:
+            raise sim._unstable("utilization")
+        for samples in (self._rt, self._nrt):
+            for column in samples:
+                column.clear()
+        self.events = self.retrials = 0
+        sim.rt_response_times.clear()
+        sim.nrt_response_times.clear()
+
+        for batch in range(num_batches):
+            self._batch = batch
+            done = 0
+            while done < batch_size:
+                done += self._event(sim)
+
+        return (
+            WeightedSample(*self._rt, num_batches),
+            WeightedSample(*self._nrt, num_batches),
+        )
+
+
+def run_splitting_simulation(
+    rt_inter_arrival: float,
+    nrt_inter_arrival: float,
+    rt_service: float,
+    nrt_service: float,
+    thresholds: Sequence[int],
+    splits: Union[int, Sequence[int]],
+    num_batches: int,
+    batch_size: int,
+    seed: Optional[int] = None,
+) -> Tuple[WeightedSample, WeightedSample]:
+    """
+    RT and nonRT response-time samples from a RESTART run.
+
+    The main trajectory completes `num_batches * batch_size` nonRT messages;
+    query the returned samples with `tail_probability` and `quantile`.
+
+    Returns:
+        (rt_sample, nrt_sample)
+    """
+    sim = SimulateTask3(
+        rt_inter_arrival=rt_inter_arrival,
+        nrt_inter_arrival=nrt_inter_arrival,
+        rt_service=rt_service,
+        nrt_service=nrt_service,
+        use_exponential=True,
+        seed=seed,
+    )
+    return RestartSplitting(thresholds, splits).run(sim, num_batches, batch_size)
+
+
+if __name__ == "__main__":
+    # Assignment parameters at a heavy nonRT load.
+    rt_sample, nrt_sample = run_splitting_simulation(
+        rt_inter_arrival=7.0,
+        nrt_inter_arrival=10.0,
+        rt_service=2.0,
+        nrt_service=4.0,
+        thresholds=(5, 10, 15, 20),
+        splits=3,
+        num_batches=21,
+        batch_size=2000,
+        seed=42,
+    )
+    for p in (0.99, 0.999, 0.9999):
+        q = nrt_sample.quantile(p)
+        print(
+            f"nonRT {100 * p:g}th percentile: {q['quantile']:.2f} "
+            f"[{q['quantile_ci_lower']:.2f}, {q['quantile_ci_upper']:.2f}]"
+        )
@@ -0,0 +1,276 @@
+"""
+Headless, sharded Task 3 sweep runner driven by a JSON sweep spec.
+
+Example spec:
+
+    {
+        "name": "assignment",
+        "miat_rt": 7.0,
+        "mst_rt": 2.0,
+        "mst_nrt": 4.0,
+        "miat_nrt": {"start": 10, "stop": 40, "step": 5},
+        "num_batches": 51,
+        "batch_size": 1000,
+        "seeds": [1, 2, 3]
+    }
+
+Every parameter may be a single value, a list, or a start/stop/step range
+(stop inclusive); the sweep is the cartesian product of all of them and the
+seeds. Each host runs one shard:
+
+    python sweep_runner.py run spec.json --output out --shard 0 --num-shards 4
+
+and once every shard has finished, the per-shard stores are combined:
+
+    python sweep_runner.py merge spec.json --output out
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence
+
+import numpy as np
+
+from results_store import ResultsStore
+from task3 import plot_results, run_sweep_point, store_result
+
+if TYPE_CHECKING:
+    from metrics_server import ProgressMetrics
+
+
+# Sweep parameters, in the order they vary (last fastest).
+SWEEP_PARAMETERS = ("miat_rt", "mst_rt", "mst_nrt", "num_batches", "batch_size", "miat_nrt")
+
+MERGED_STORE = "merged"
+
+
+def _expand(name: str, value: Any) -> List[Any]:
+    if isinstance(value, dict):
+        try:
+            start, stop, step = value["start"], value["stop"], value["step"]
+        except KeyError:
+            raise ValueError(f"{name}: a range needs start, stop and step") from None
+        if step <= 0:
+            raise ValueError(f"{name}: step must be positive")
+        values = np.arange(start, stop + step / 2, step)
+        return [round(float(v), 10) for v in values]
+    if isinstance(value, list):
+        if not value:
+            raise ValueError(f"{name}: empty list")
+        return list(value)
+    return [value]
+
+
+def load_spec(path: str) -> dict:
+    with open(path) as f:
+        spec = json.load(f)
+    missing = [p for p in SWEEP_PARAMETERS if p not in spec]
+    if missing:
+        raise ValueError(f"sweep spec is missing {', '.join(missing)}")
+    spec.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return spec
+
+
+def sweep_points(spec: dict) -> List[Dict[str, Any]]:
+    """All points of the sweep, each with a stable `point` index."""
+    axes = [_expand(p, spec[p]) for p in SWEEP_PARAMETERS]
+    seeds = _expand("seeds", spec.get("seeds", [None]))
+    points = []
+    for index, (values, seed) in enumerate(itertools.product(itertools.product(*axes), seeds)):
+        point = dict(zip(SWEEP_PARAMETERS, values))
+        point["num_batches"] = int(point["num_batches"])
+        point["batch_size"] = int(point["batch_size"])
+        point["seed"] = seed
+        point["point"] = index
+        points.append(point)
+    return points
+
+
+def shard_points(
+    points: Sequence[Dict[str, Any]], shard: int, num_shards: int
+) -> List[Dict[str, Any]]:
+    """
+    The points of one shard: every `num_shards`-th point starting at `shard`.
+
+    Interleaving rather than contiguous blocks spreads the slow
+    near-saturation points over all shards.
+    """
+    if num_shards < 1 or not 0 <= shard < num_shards:
+        raise ValueError(f"invalid shard {shard} of {num_shards}")
+    return [p for p in points if p["point"] % num_shards == shard]
+
+
+def shard_store_path(output: str, shard: int, num_shards: int) -> str:
+    return os.path.join(output, f"shard-{shard:04d}-of-{num_shards:04d}")
+
+
+def run_point(point: Dict[str, Any], metrics: ProgressMetrics = None) -> dict:
+    return run_sweep_point(
+        point["miat_rt"],
+        point["miat_nrt"],
+        point["mst_rt"],
+        point["mst_nrt"],
+        point["num_batches"],
+        point["batch_size"],
+        seed=point["seed"],
+        metrics=metrics,
+    )
+
+
+def run_shard(
+    spec: dict,
+    output: str,
+    shard: int = 0,
+    num_shards: int = 1,
+    metrics: ProgressMetrics = None,
+) -> int:
+    """
+    Run the points of one shard into its own store; return how many were run.
+
+    Points already in the shard's store are skipped, so an interrupted
+    shard can simply be started again. `metrics`, if given, follows the
+    progress of the shard and of the point being run.
+    """
+    points = shard_points(sweep_points(spec), shard, num_shards)
+    store = ResultsStore(shard_store_path(output, shard, num_shards), chunk_rows=1)
+    done = set(store.query(["point"]).get("point", np.empty(0)).astype(int).tolist())
+    points = [p for p in points if p["point"] not in done]
+    if metrics is not None:
+        metrics.start_sweep(len(points))
+
+    ran = 0
+    for point in points:
+        print(
+            f"[shard {shard}/{num_shards}] point {point['point']}: "
+            f"MIAT_nonRT = {point['miat_nrt']}, seed = {point['seed']}",
+            flush=True,
+        )
+        start = time.perf_counter()
+        result = run_point(point, metrics)
+        store_result(
+            store,
+            result,
+            point["miat_rt"],
+            point["mst_rt"],
+            point["mst_nrt"],
+            point["num_batches"],
+            point["batch_size"],
+            time.perf_counter() - start,
+            spec["name"],
+            seed=point["seed"],
+            point=point["point"],
+            shard=shard,
+        )
+        ran += 1
+        if metrics is not None:
+            metrics.point_done()
+    store.flush()
+    return ran
+
+
+def merge_shards(spec: dict, output: str, into: str = None) -> ResultsStore:
+    """
+    Combine every shard store under `output` into one store.
+
+    Rows are added in point order, one per point. Raises ValueError
+    listing the missing points if any shard is incomplete.
+    """
+    points = sweep_points(spec)
+    rows: Dict[int, Dict[str, Any]] = {}
+    for entry in sorted(os.listdir(output)):
+        path = os.path.join(output, entry)
+        if not entry.startswith("shard-") or not os.path.isdir(path):
+            continue
+        data = ResultsStore(path).query(sweep=spec["name"])
+        names = list(data)
+        for i in range(len(data.get("point", []))):
+            rows[int(data["point"][i])] = {
+                name: data[name][i].item() for name in names
+            }
+
+    missing = [p["point"] for p in points if p["point"] not in rows]
+    if missing:
+        raise ValueError(
+            f"{len(missing)} of {len(points)} points have no result yet: "
+            f"{missing[:20]}{' ...' if len(missing) > 20 else ''}"
+        )
+
+    merged = ResultsStore(into or os.path.join(output, MERGED_STORE))
+    if len(merged):
+        raise ValueError(f"merged store {merged.path} already has results")
+    for p in points:
+        merged.append(rows[p["point"]])
+    merged.flush()
+    return merged
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run one shard of a sweep")
+    run.add_argument("spec", help="JSON sweep spec")
+    run.add_argument("--output", required=True, help="directory for the shard stores")
+    run.add_argument("--shard", type=int, default=0)
+    run.add_argument("--num-shards", type=int, default=1)
+    run.add_argument(
+        "--metrics-port", type=int, help="serve live progress on localhost:PORT/metrics"
+    )
+    run.add_argument(
+        "--metrics-socket", help="stream live progress as JSON lines on this Unix socket"
+    )
+
+    merge = sub.add_parser("merge", help="combine finished shards into one store")
+    merge.add_argument("spec", help="JSON sweep spec")
+    merge.add_argument("--output", required=True, help="directory of the shard stores")
+    merge.add_argument("--into", help=f"merged store (default OUTPUT/{MERGED_STORE})")
+    merge.add_argument("--plot", help="also plot the merged results to this file")
+
+    points = sub.add_parser("points", help="list the points of a shard")
+    points.add_argument("spec", help="JSON sweep spec")
+    points.add_argument("--shard", type=int, default=0)
+    points.add_argument("--num-shards", type=int, default=1)
+
+    args = parser.parse_args(argv)
+    spec = load_spec(args.spec)
+
+    if args.command == "run":
+        server = None
+        metrics = None
+        if args.metrics_port is not None or args.metrics_socket is not None:
+            from metrics_server import MetricsServer, ProgressMetrics
+
+            metrics = ProgressMetrics()
+            server = MetricsServer(
+                metrics, port=args.metrics_port or 0, path=args.metrics_socket
+            ).start()
+            print(f"Serving progress on {server.address}", flush=True)
+        try:
+            ran = run_shard(spec, args.output, args.shard, args.num_shards, metrics)
+        finally:
+            if server is not None:
+                server.stop()
+        print(f"Shard {args.shard}/{args.num_shards}: ran {ran} points")
+    elif args.command == "merge":
+        try:
+            merged = merge_shards(spec, args.output, args.into)
+        except ValueError as exc:
+            print(f"Cannot merge: {exc}", file=sys.stderr)
+            return 1
+        print(f"Merged {len(merged)} points into {merged.path}")
+        if args.plot:
+            plot_results(merged, args.plot, sweep=spec["name"])
+    else:
+        for p in shard_points(sweep_points(spec), args.shard, args.num_shards):
+            print(json.dumps(p))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,27 @@
+import time
+from typing import TYPE_CHECKING
+
 import matplotlib.pyplot as plt
 import numpy as np
 
-from batch_means import calculate_statistics_with_ci
-from simulate_task3 import SimulateTask3
+from arrival_rates import RateFunction
+from batch_means import (
+    calculate_loss_statistics_with_ci,
+    calculate_miss_rate_with_ci,
+    calculate_statistics_with_ci,
+    calculate_window_statistics,
+)
+from distributions import Distribution
+from results_store import ResultsStore
+from simulate_task3 import DROP_TAIL, SimulateTask3, UnstableSystemError
+
+if TYPE_CHECKING:
+    # Only callers that pass `metrics` pay for asyncio and threading.
+    from metrics_server import ProgressMetrics
+
+
+# Directory of the columnar store every Task 3 sweep point is recorded in.
+RESULTS_STORE = "task3_results"
 
 
 def run_single_simulation(
@@ -13,6 +32,12 @@ def run_single_simulation(
     num_batches: int,
     batch_size: int,
     seed: int = None,
+    rt_arrival_dist: Distribution = None,
+    nrt_arrival_dist: Distribution = None,
+    rt_service_dist: Distribution = None,
+    nrt_service_dist: Distribution = None,
+    variance_method: str = "batch",
+    metrics: "ProgressMetrics" = None,
 ) -> tuple[dict, dict]:
     sim = SimulateTask3(
         rt_inter_arrival=rt_inter_arrival,
@@ -21,6 +46,59 @@ def run_single_simulation(
         nrt_service=nrt_service,
         use_exponential=True,
         seed=seed,
+        rt_arrival_dist=rt_arrival_dist,
+        nrt_arrival_dist=nrt_arrival_dist,
+        rt_service_dist=rt_service_dist,
+        nrt_service_dist=nrt_service_dist,
+    )
+
+    total_messages = num_batches * batch_size
+    if metrics is not None:
+        metrics.attach(
+            sim,
+            total_messages,
+            total_messages,
+            label=f"MIAT_nonRT={nrt_inter_arrival}",
+            batch_size=batch_size,
+            num_batches=num_batches,
+        )
+    sim.run_until_messages(total_messages, total_messages)
+
+    rt_stats = calculate_statistics_with_ci(
+        sim.rt_response_times, num_batches, batch_size, method=variance_method
+    )
+    nrt_stats = calculate_statistics_with_ci(
+        sim.nrt_response_times, num_batches, batch_size, method=variance_method
+    )
+
+    return rt_stats, nrt_stats
+
+
+def run_time_varying_simulation(
+    rt_arrival_rate: RateFunction,
+    nrt_arrival_rate: RateFunction,
+    rt_service: float,
+    nrt_service: float,
+    num_batches: int,
+    batch_size: int,
+    num_windows: int,
+    seed: int = None,
+) -> tuple[dict, dict, list, list]:
+    """Run with time-varying arrival rates and report global and per-window stats."""
+    period = rt_arrival_rate.period or nrt_arrival_rate.period
+    if period is None:
+        raise ValueError("at least one arrival rate must be periodic")
+
+    sim = SimulateTask3(
+        rt_inter_arrival=1.0 / rt_arrival_rate.mean_rate,
+        nrt_inter_arrival=1.0 / nrt_arrival_rate.mean_rate,
+        rt_service=rt_service,
+        nrt_service=nrt_service,
+        use_exponential=True,
+        seed=seed,
+        rt_arrival_rate=rt_arrival_rate,
+        nrt_arrival_rate=nrt_arrival_rate,
+        record_arrival_times=True,
     )
 
     total_messages = num_batches * batch_size
@@ -33,7 +111,194 @@ def run_single_simulation(
         sim.nrt_response_times, num_batches, batch_size
     )
 
-    return rt_stats, nrt_stats
+    # The first batch is the warm-up period, as in the global statistics.
+    rt_windows = calculate_window_statistics(
+        sim.rt_arrival_times[batch_size:],
+        sim.rt_response_times[batch_size:],
+        period,
+        num_windows,
+    )
+    nrt_windows = calculate_window_statistics(
+        sim.nrt_arrival_times[batch_size:],
+        sim.nrt_response_times[batch_size:],
+        period,
+        num_windows,
+    )
+
+    return rt_stats, nrt_stats, rt_windows, nrt_windows
+
+
+def run_finite_buffer_simulation(
+    rt_inter_arrival: float,
+    nrt_inter_arrival: float,
+    rt_service: float,
+    nrt_service: float,
+    num_batches: int,
+    batch_size: int,
+    rt_capacity: int = None,
+    nrt_capacity: int = None,
+    total_capacity: int = None,
+    drop_policy: str = DROP_TAIL,
+    seed: int = None,
+) -> tuple[dict, dict, dict, dict]:
+    """Run with bounded buffers; returns response-time and loss stats per class."""
+    sim = SimulateTask3(
+        rt_inter_arrival=rt_inter_arrival,
+        nrt_inter_arrival=nrt_inter_arrival,
+        rt_service=rt_service,
+        nrt_service=nrt_service,
+        use_exponential=True,
+        seed=seed,
+        rt_capacity=rt_capacity,
+        nrt_capacity=nrt_capacity,
+        total_capacity=total_capacity,
+        drop_policy=drop_policy,
+    )
+
+    total_messages = num_batches * batch_size
+    sim.run_until_messages(total_messages, total_messages)
+
+    rt_stats = calculate_statistics_with_ci(
+        sim.rt_response_times, num_batches, batch_size
+    )
+    nrt_stats = calculate_statistics_with_ci(
+        sim.nrt_response_times, num_batches, batch_size
+    )
+    rt_loss = calculate_loss_statistics_with_ci(sim.rt_loss_indicators, num_batches)
+    nrt_loss = calculate_loss_statistics_with_ci(sim.nrt_loss_indicators, num_batches)
+
+    return rt_stats, nrt_stats, rt_loss, nrt_loss
+
+
+def run_deadline_simulation(
+    rt_inter_arrival: float,
+    nrt_inter_arrival: float,
+    rt_service: float,
+    nrt_service: float,
+    num_batches: int,
+    batch_size: int,
+    rt_deadline_dist: Distribution,
+    rt_discipline: str = "fifo",
+    drop_expired: bool = False,
+    seed: int = None,
+) -> tuple[dict, dict, dict]:
+    """Run with RT deadlines; returns response-time stats and the RT miss rate."""
+    sim = SimulateTask3(
+        rt_inter_arrival=rt_inter_arrival,
+        nrt_inter_arrival=nrt_inter_arrival,
+        rt_service=rt_service,
+        nrt_service=nrt_service,
+        use_exponential=True,
+        seed=seed,
+        rt_deadline_dist=rt_deadline_dist,
+        rt_discipline=rt_discipline,
+        drop_expired=drop_expired,
+    )
+
+    total_messages = num_batches * batch_size
+    sim.run_until_messages(total_messages, total_messages)
+
+    rt_stats = calculate_statistics_with_ci(
+        sim.rt_response_times, num_batches, batch_size
+    )
+    nrt_stats = calculate_statistics_with_ci(
+        sim.nrt_response_times, num_batches, batch_size
+    )
+    miss_rate = calculate_miss_rate_with_ci(
+        sim.rt_deadline_misses, num_batches, batch_size=batch_size
+    )
+
+    return rt_stats, nrt_stats, miss_rate
+
+
+def store_result(
+    store: ResultsStore,
+    result: dict,
+    miat_rt: float,
+    mst_rt: float,
+    mst_nrt: float,
+    num_batches: int,
+    batch_size: int,
+    elapsed: float,
+    sweep: str,
+    seed: int = None,
+    **params,
+) -> None:
+    """
+    Record one sweep point and the parameters it was run with.
+
+    The sample counts are those the statistics were computed from, 0 for a
+    point aborted as unstable.
+    """
+    samples = 0 if result.get("unstable") else num_batches * batch_size
+    store.append_result(
+        result,
+        seed=seed,
+        elapsed=elapsed,
+        sweep=sweep,
+        miat_rt=miat_rt,
+        mst_rt=mst_rt,
+        mst_nrt=mst_nrt,
+        num_batches=num_batches,
+        batch_size=batch_size,
+        rt_samples=samples,
+        nrt_samples=samples,
+        **params,
+    )
+
+
+def unstable_result(miat_nrt: float, error: UnstableSystemError) -> dict:
+    """
+    Result entry for a sweep point whose run was aborted as unstable.
+
+    It has no statistics; `plot_results` and `print_results_summary` mark
+    it instead, and it is stored like any other point.
+    """
+    return {
+        "miat_nrt": miat_nrt,
+        "lambda_nrt_inv": 1.0 / miat_nrt,
+        "unstable": True,
+        "utilization": error.utilization,
+        "aborted_at": error.clock,
+        "nrt_in_system": error.nrt_in_system,
+    }
+
+
+def run_sweep_point(
+    miat_rt: float,
+    miat_nrt: float,
+    mst_rt: float,
+    mst_nrt: float,
+    num_batches: int,
+    batch_size: int,
+    seed: int = None,
+    metrics: "ProgressMetrics" = None,
+) -> dict:
+    """
+    Run one MIAT_nonRT point of a sweep and return its result entry.
+
+    The entry holds "rt_stats" and "nrt_stats", or is an `unstable_result`
+    if the run was aborted as unstable.
+    """
+    try:
+        rt_stats, nrt_stats = run_single_simulation(
+            rt_inter_arrival=miat_rt,
+            nrt_inter_arrival=miat_nrt,
+            rt_service=mst_rt,
+            nrt_service=mst_nrt,
+            num_batches=num_batches,
+            batch_size=batch_size,
+            seed=seed,
+            metrics=metrics,
+        )
+    except UnstableSystemError as exc:
+        return unstable_result(miat_nrt, exc)
+    return {
+        "miat_nrt": miat_nrt,
+        "lambda_nrt_inv": 1.0 / miat_nrt,
+        "rt_stats": rt_stats,
+        "nrt_stats": nrt_stats,
+    }
 
 
 def task_3_1():
@@ -67,27 +332,34 @@ def task_3_1():
     )
     miat_nrt_values = [round(x, 1) for x in miat_nrt_values]
 
-    results = []
+    store = ResultsStore(RESULTS_STORE)
+    sweep = time.strftime("task3.1-%Y%m%dT%H%M%S")
 
     for miat_nrt in miat_nrt_values:
         print(f"Running simulation for MIAT_nonRT = {miat_nrt}...")
-        rt_stats, nrt_stats = run_single_simulation(
-            rt_inter_arrival=miat_rt,
-            nrt_inter_arrival=miat_nrt,
-            rt_service=mst_rt,
-            nrt_service=mst_nrt,
-            num_batches=num_batches,
-            batch_size=batch_size,
+        start = time.perf_counter()
+        result = run_sweep_point(
+            miat_rt, miat_nrt, mst_rt, mst_nrt, num_batches, batch_size
         )
-
-        results.append(
-            {
-                "miat_nrt": miat_nrt,
-                "lambda_nrt_inv": 1.0 / miat_nrt,
-                "rt_stats": rt_stats,
-                "nrt_stats": nrt_stats,
-            }
+        store_result(
+            store,
+            result,
+            miat_rt,
+            mst_rt,
+            mst_nrt,
+            num_batches,
+            batch_size,
+            time.perf_counter() - start,
+            sweep,
         )
+        if result.get("unstable"):
+            print(
+                f"  Unstable (utilization {result['utilization']:.3f}); "
+                "recorded as unstable"
+            )
+            print()
+            continue
+        rt_stats, nrt_stats = result["rt_stats"], result["nrt_stats"]
 
         print(
             f"  RT Mean: {rt_stats['mean']:.4f} "
@@ -109,10 +381,22 @@ def task_3_1():
         )
         print()
 
-    return results
+    store.flush()
+    return store.load_results(sweep=sweep)
 
 
-def plot_results(results: list, output_file: str = "task3_results.png"):
+def plot_results(results, output_file: str = "task3_results.png", **filters):
+    """
+    Plot RT/nonRT means and 95th percentiles with CIs against 1/λ_nonRT.
+
+    `results` is a list of result dictionaries or a `ResultsStore`, in
+    which case the points matching `filters` are read from the store.
+    """
+    if isinstance(results, ResultsStore):
+        results = results.load_results(**filters)
+    unstable = [r for r in results if r.get("unstable")]
+    results = [r for r in results if not r.get("unstable")]
+
     lambda_nrt_inv = [r["lambda_nrt_inv"] for r in results]
 
     rt_means = [r["rt_stats"]["mean"] for r in results]
@@ -210,12 +494,30 @@ def plot_results(results: list, output_file: str = "task3_results.png"):
     ax4.grid(True, alpha=0.3)
     ax4.legend()
 
+    mark_unstable_points(axes.flat, unstable)
+
     plt.tight_layout()
     plt.savefig(output_file, dpi=300, bbox_inches="tight")
     print(f"Results saved to {output_file}")
     plt.close()
 
 
+def mark_unstable_points(axes, unstable: list) -> None:
+    """Draw a dashed line at the 1/λ_nonRT of every unstable point on each axis."""
+    if not unstable:
+        return
+    for ax in axes:
+        for i, r in enumerate(unstable):
+            ax.axvline(
+                r["lambda_nrt_inv"],
+                color="gray",
+                linestyle="--",
+                alpha=0.7,
+                label="Unstable (aborted)" if i == 0 else None,
+            )
+        ax.legend()
+
+
 def print_results_summary(results: list):
     print("=" * 100)
     print("Results Summary")
@@ -229,6 +531,12 @@ def print_results_summary(results: list):
     print("-" * 100)
 
     for r in results:
+        if r.get("unstable"):
+            print(
+                f"{r['miat_nrt']:<12.1f} {r['lambda_nrt_inv']:<12.4f} "
+                f"unstable (utilization {r['utilization']:.3f}), no statistics"
+            )
+            continue
         print(
             f"{r['miat_nrt']:<12.1f} {r['lambda_nrt_inv']:<12.4f} "
             f"{r['rt_stats']['mean']:<15.4f} {r['rt_stats']['percentile_95']:<15.4f} "
@@ -253,7 +561,8 @@ def main():
     print("Varying MIAT_nonRT from 10 to 40 in increments of 5")
     print()
 
-    assignment_results = []
+    store = ResultsStore(RESULTS_STORE)
+    sweep = time.strftime("task3.2-%Y%m%dT%H%M%S")
     mst_rt = 2.0
     mst_nrt = 4.0
     miat_rt = 7.0
@@ -262,23 +571,29 @@ def main():
 
     for miat_nrt in range(10, 45, 5):
         print(f"Running simulation for MIAT_nonRT = {miat_nrt}...")
-        rt_stats, nrt_stats = run_single_simulation(
-            rt_inter_arrival=miat_rt,
-            nrt_inter_arrival=float(miat_nrt),
-            rt_service=mst_rt,
-            nrt_service=mst_nrt,
-            num_batches=num_batches,
-            batch_size=batch_size,
+        start = time.perf_counter()
+        result = run_sweep_point(
+            miat_rt, float(miat_nrt), mst_rt, mst_nrt, num_batches, batch_size
         )
-
-        assignment_results.append(
-            {
-                "miat_nrt": float(miat_nrt),
-                "lambda_nrt_inv": 1.0 / miat_nrt,
-                "rt_stats": rt_stats,
-                "nrt_stats": nrt_stats,
-            }
+        store_result(
+            store,
+            result,
+            miat_rt,
+            mst_rt,
+            mst_nrt,
+            num_batches,
+            batch_size,
+            time.perf_counter() - start,
+            sweep,
         )
+        if result.get("unstable"):
+            print(
+                f"  Unstable (utilization {result['utilization']:.3f}); "
+                "recorded as unstable"
+            )
+            print()
+            continue
+        rt_stats, nrt_stats = result["rt_stats"], result["nrt_stats"]
 
         print(
             f"  RT Mean: {rt_stats['mean']:.4f} "
@@ -300,6 +615,8 @@ def main():
         )
         print()
 
+    store.flush()
+    assignment_results = store.load_results(sweep=sweep)
     print_results_summary(assignment_results)
     plot_results(assignment_results, "P1T3-Results-assignment.png")
 
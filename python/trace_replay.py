@@ -0,0 +1,320 @@
+"""Replay recorded (time, class, service) traces through `SimulateTask3`."""
+
+from __future__ import annotations
+
+import csv
+import math
+from collections import deque
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from distributions import Distribution, make_streams
+from scheduling import SchedulingPolicy
+from simulate_task3 import EPS, SERVER_IDLE, SERVER_NONRT, SERVER_RT, SimulateTask3
+
+
+# Fixed-width little-endian record used by binary traces (no file header).
+TRACE_DTYPE = np.dtype([("time", "<f8"), ("service", "<f8"), ("cls", "<i4")])
+
+# A chunk is three parallel lists: arrival times, classes, service times.
+TraceChunk = Tuple[List[float], List[int], List[float]]
+
+_CLASS_NAMES = {
+    "1": SERVER_RT,
+    "rt": SERVER_RT,
+    "2": SERVER_NONRT,
+    "nonrt": SERVER_NONRT,
+    "nrt": SERVER_NONRT,
+}
+
+
+def _parse_class(value: str) -> int:
+    try:
+        return _CLASS_NAMES[value.strip().lower()]
+    except KeyError:
+        raise ValueError(f"Unknown message class in trace: {value!r}") from None
+
+
+def _binary_chunk(block: np.ndarray, start: int) -> TraceChunk:
+    """A block of `TRACE_DTYPE` records as a chunk, rejecting unknown classes."""
+    cls = block["cls"]
+    valid = np.isin(cls, (SERVER_RT, SERVER_NONRT))
+    if not valid.all():
+        bad = int(np.argmin(valid))
+        raise ValueError(
+            f"Unknown message class in trace: {int(cls[bad])!r} (record {start + bad})"
+        )
+    return block["time"].tolist(), cls.tolist(), block["service"].tolist()
+
+
+def read_csv_trace(path: str, chunk_size: int = 65_536) -> Iterator[TraceChunk]:
+    """
+    Stream a CSV trace chunk by chunk.
+
+    Rows are `time,class,service`; class is `RT`/`nonRT` (or 1/2). A header
+    row is skipped if its first field is not a number.
+    """
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        times: List[float] = []
+        classes: List[int] = []
+        services: List[float] = []
+        for row in reader:
+            if not row:
+                continue
+            try:
+                t = float(row[0])
+            except ValueError:
+                if reader.line_num == 1:
+                    continue
+                raise
+            times.append(t)
+            classes.append(_parse_class(row[1]))
+            services.append(float(row[2]))
+            if len(times) >= chunk_size:
+                yield times, classes, services
+                times, classes, services = [], [], []
+        if times:
+            yield times, classes, services
+
+
+def read_binary_trace(
+    path: str, chunk_size: int = 1 << 20, use_mmap: bool = True
+) -> Iterator[TraceChunk]:
+    """Stream a binary trace of `TRACE_DTYPE` records, memory-mapped by default."""
+    if use_mmap:
+        records = np.memmap(path, dtype=TRACE_DTYPE, mode="r")
+        for start in range(0, len(records), chunk_size):
+            yield _binary_chunk(records[start : start + chunk_size], start)
+        del records
+        return
+
+    with open(path, "rb") as f:
+        start = 0
+        while True:
+            block = np.fromfile(f, dtype=TRACE_DTYPE, count=chunk_size)
+            if len(block) == 0:
+                break
+            yield _binary_chunk(block, start)
+            start += len(block)
+
+
+def write_binary_trace(chunks: Iterable[TraceChunk], path: str) -> int:
+    """Write trace chunks as binary `TRACE_DTYPE` records; return the record count."""
+    count = 0
+    with open(path, "wb") as f:
+        for times, classes, services in chunks:
+            block = np.empty(len(times), dtype=TRACE_DTYPE)
+            block["time"] = times
+            block["cls"] = classes
+            block["service"] = services
+            block.tofile(f)
+            count += len(block)
+    return count
+
+
+def csv_to_binary(csv_path: str, binary_path: str, chunk_size: int = 65_536) -> int:
+    """Convert a CSV trace to the binary format for faster (mmap) replay."""
+    return write_binary_trace(read_csv_trace(csv_path, chunk_size), binary_path)
+
+
+def generate_trace_chunks(
+    rt_arrival: Distribution,
+    nrt_arrival: Distribution,
+    rt_service: Distribution,
+    nrt_service: Distribution,
+    seed: Optional[int] = None,
+    chunk_size: int = 1 << 16,
+) -> Iterator[TraceChunk]:
+    """
+    Generate an endless synthetic trace from per-class distributions.
+
+    Each class has independent arrival and service streams sampled in
+    blocks; the two arrival streams are merged in time order, and every
+    yielded record is earlier than any record still to come.
+    """
+    rt_iat, nrt_iat, rt_svc, nrt_svc = make_streams(
+        (rt_arrival, nrt_arrival, rt_service, nrt_service), seed, chunk_size
+    )
+    rt_clock = 0.0
+    nrt_clock = 0.0
+    rt_times = np.empty(0)
+    nrt_times = np.empty(0)
+
+    while True:
+        if len(rt_times) < chunk_size:
+            block = rt_clock + np.cumsum(rt_iat.block(chunk_size))
+            rt_clock = float(block[-1])
+            rt_times = np.concatenate((rt_times, block))
+        if len(nrt_times) < chunk_size:
+            block = nrt_clock + np.cumsum(nrt_iat.block(chunk_size))
+            nrt_clock = float(block[-1])
+            nrt_times = np.concatenate((nrt_times, block))
+
+        horizon = min(rt_times[-1], nrt_times[-1])
+        n_rt = int(np.searchsorted(rt_times, horizon, side="right"))
+        n_nrt = int(np.searchsorted(nrt_times, horizon, side="right"))
+
+        times = np.concatenate((rt_times[:n_rt], nrt_times[:n_nrt]))
+        classes = np.concatenate(
+            (np.full(n_rt, SERVER_RT), np.full(n_nrt, SERVER_NONRT))
+        )
+        services = np.concatenate((rt_svc.block(n_rt), nrt_svc.block(n_nrt)))
+        order = np.argsort(times, kind="stable")
+
+        rt_times = rt_times[n_rt:]
+        nrt_times = nrt_times[n_nrt:]
+        yield times[order].tolist(), classes[order].tolist(), services[order].tolist()
+
+
+class TraceReplay(SimulateTask3):
+    """
+    `SimulateTask3` driven by a recorded trace instead of random variates.
+
+    Only the next trace record is held as a pending arrival (its class sets
+    `RTCL` or `nonRTCL`, the other clock is infinite), and each queued
+    message keeps the service time it was recorded with. Memory therefore
+    stays bounded by the queue lengths and one chunk of the trace.
+    """
+
+    def __init__(
+        self,
+        chunks: Iterable[TraceChunk],
+        policy: Union[str, SchedulingPolicy] = "preemptive-resume",
+    ) -> None:
+        self._chunks = iter(chunks)
+        self._times: List[float] = []
+        self._classes: List[int] = []
+        self._services: List[float] = []
+        self._pos = 0
+        self._last_time = -math.inf
+        self._pending_service = 0.0
+        self._rt_services: deque[float] = deque()
+        self._nrt_services: deque[float] = deque()
+        self.records_replayed = 0
+
+        super().__init__(
+            rt_inter_arrival=math.inf,
+            nrt_inter_arrival=math.inf,
+            rt_service=0.0,
+            nrt_service=0.0,
+            use_exponential=False,
+            policy=policy,
+        )
+        self._load_next_record()
+
+    def _load_next_record(self) -> None:
+        self.RTCL = math.inf
+        self.nonRTCL = math.inf
+        while self._pos >= len(self._times):
+            try:
+                self._times, self._classes, self._services = next(self._chunks)
+            except StopIteration:
+                return
+            self._pos = 0
+
+        i = self._pos
+        self._pos += 1
+        t = self._times[i]
+        if t < self._last_time:
+            raise ValueError(
+                f"Trace is not time-ordered: {t} after {self._last_time}"
+            )
+        self._last_time = t
+        self._pending_service = self._services[i]
+        if self._classes[i] == SERVER_RT:
+            self.RTCL = t
+        else:
+            self.nonRTCL = t
+
+    def next_rt_arrival_time(self) -> float:
+        return math.inf
+
+    def next_nrt_arrival_time(self) -> float:
+        return math.inf
+
+    def next_rt_service_time(self) -> float:
+        return self._rt_services.popleft()
+
+    def next_nrt_service_time(self) -> float:
+        return self._nrt_services.popleft()
+
+    def handle_rt_arrival(self) -> None:
+        self._rt_services.append(self._pending_service)
+        super().handle_rt_arrival()
+        self.records_replayed += 1
+        self._load_next_record()
+
+    def handle_nrt_arrival(self) -> None:
+        self._nrt_services.append(self._pending_service)
+        super().handle_nrt_arrival()
+        self.records_replayed += 1
+        self._load_next_record()
+
+    def _process_next_event(self) -> bool:
+        """Handle the next event; return False when nothing is left to do."""
+        next_event_time = min(self.RTCL, self.nonRTCL)
+        if self.s != SERVER_IDLE:
+            next_event_time = min(next_event_time, self.SCL)
+        if next_event_time == math.inf:
+            return False
+
+        # Arrivals before completions on ties, as in run_until_messages.
+        if abs(self.RTCL - next_event_time) < EPS:
+            self.handle_rt_arrival()
+        elif abs(self.nonRTCL - next_event_time) < EPS:
+            self.handle_nrt_arrival()
+        else:
+            self.handle_service_completion()
+        return True
+
+    def run_until_records(self, num_records: int) -> bool:
+        """Replay until `num_records` records have arrived; False if the trace ran out."""
+        while self.records_replayed < num_records:
+            if not self._process_next_event():
+                return False
+        return True
+
+    def run_trace(
+        self,
+        sink: Optional[Callable[[List[float], List[float]], None]] = None,
+        flush_every: int = 1 << 16,
+    ) -> None:
+        """
+        Replay the whole trace and drain the queues.
+
+        With a `sink`, response times are handed over (RT list, nonRT list)
+        every `flush_every` completions and then cleared, so long traces run
+        in constant memory; without one they accumulate on the instance.
+        """
+        rt_times = self.rt_response_times
+        nrt_times = self.nrt_response_times
+
+        while self._process_next_event():
+            if sink is not None and len(rt_times) + len(nrt_times) >= flush_every:
+                sink(list(rt_times), list(nrt_times))
+                rt_times.clear()
+                nrt_times.clear()
+
+        if sink is not None and (rt_times or nrt_times):
+            sink(list(rt_times), list(nrt_times))
+            rt_times.clear()
+            nrt_times.clear()
+
+
+def replay_trace(
+    path: str,
+    binary: Optional[bool] = None,
+    chunk_size: int = 1 << 16,
+    sink: Optional[Callable[[List[float], List[float]], None]] = None,
+) -> TraceReplay:
+    """Replay a CSV or binary trace file (chosen by extension unless `binary` is set)."""
+    if binary is None:
+        binary = not path.lower().endswith(".csv")
+    chunks = (
+        read_binary_trace(path, chunk_size) if binary else read_csv_trace(path, chunk_size)
+    )
+    sim = TraceReplay(chunks)
+    sim.run_trace(sink=sink)
+    return sim
@@ -0,0 +1,287 @@
+"""Warm-started MIAT_nonRT sweeps and MSER-5 warm-up detection."""
+
+from __future__ import annotations
+
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from batch_means import calculate_statistics_with_ci
+from simulate_task3 import SERVER_IDLE, SERVER_NONRT, SimulateTask3, UnstableSystemError
+from task3 import print_results_summary, unstable_result
+
+
+class SystemState(NamedTuple):
+    """Queue contents and server state of a run, independent of its clock."""
+
+    # Time each queued message has spent in the system, oldest first.
+    rt_ages: Tuple[float, ...]
+    nrt_ages: Tuple[float, ...]
+    # Remaining service of the head nonRT message if it has started.
+    nrt_remaining: Optional[float]
+
+
+def capture_state(sim: SimulateTask3) -> SystemState:
+    """
+    The current state of `sim`, with arrival times as ages.
+
+    The remaining service of an RT message in service is not kept: it
+    starts a fresh service time when seeded. That is exact only because
+    the sweeps here use exponential (memoryless) service.
+    """
+    mc = sim.MC
+    if sim.s == SERVER_NONRT:
+        nrt_remaining = sim.SCL - mc
+    else:
+        nrt_remaining = sim.preempted_service_time
+    return SystemState(
+        rt_ages=tuple(mc - arrival for arrival, _ in sim.rt_queue),
+        nrt_ages=tuple(mc - arrival for arrival, _ in sim.nrt_queue),
+        nrt_remaining=nrt_remaining,
+    )
+
+
+def _scale_ages(ages: Tuple[float, ...], factor: float) -> Tuple[float, ...]:
+    """Resample a queue to `factor` times its length, ages stretched to match."""
+    count = int(round(len(ages) * factor))
+    if not ages or count == 0:
+        return ()
+    step = len(ages) / count
+    return tuple(ages[int(j * step)] * factor for j in range(count))
+
+
+def scale_state(state: SystemState, factor: float) -> SystemState:
+    """
+    `state` with both queues `factor` times as long.
+
+    By Little's law the waiting times grow with the queue, so the ages are
+    stretched by the same factor. The started nonRT message keeps its
+    remaining service if its queue is not emptied.
+    """
+    rt_ages = _scale_ages(state.rt_ages, factor)
+    nrt_ages = _scale_ages(state.nrt_ages, factor)
+    return SystemState(rt_ages, nrt_ages, state.nrt_remaining if nrt_ages else None)
+
+
+def load_scale(rho_from: float, rho_to: float) -> float:
+    """
+    Ratio of mean numbers in system, rho / (1 - rho), between two loads.
+
+    An M/M/1 approximation of how much longer the queues get; 1 when either
+    load is not below 1.
+    """
+    if not (0.0 <= rho_from < 1.0 and 0.0 <= rho_to < 1.0) or rho_from == 0.0:
+        return 1.0
+    return (rho_to / (1.0 - rho_to)) / (rho_from / (1.0 - rho_from))
+
+
+def seed_state(sim: SimulateTask3, state: SystemState) -> None:
+    """
+    Load `state` into a freshly created, idle `sim` and start service.
+
+    The seeded messages count as arrivals before time `sim.MC`, so their
+    response times are part of the run just like any other message.
+    """
+    if sim.s != SERVER_IDLE or sim.rt_queue or sim.nrt_queue:
+        raise ValueError("can only seed an empty, idle simulation")
+    mc = sim.MC
+    for age in state.rt_ages:
+        sim.rt_queue.append((mc - age, sim.rt_message_id))
+        sim.rt_message_id += 1
+    for age in state.nrt_ages:
+        sim.nrt_queue.append((mc - age, sim.nrt_message_id))
+        sim.nrt_message_id += 1
+    if state.nrt_ages and state.nrt_remaining is not None:
+        sim.preempted_service_time = state.nrt_remaining
+        sim.nrt_service_requirement = state.nrt_remaining
+    sim.start_next_service()
+
+
+def mser5_truncation(values: Sequence[float], max_fraction: float = 0.5) -> int:
+    """
+    MSER-5 warm-up: how many leading observations to delete.
+
+    The data are averaged in batches of 5 and the truncation d (in batches)
+    minimising the marginal standard error, sum over the kept batches of
+    (z_j - mean of kept)^2 / (k - d)^2, is picked among the first
+    `max_fraction` of the batches. Suffix sums make this O(n).
+
+    Returns:
+        The number of observations to delete (a multiple of 5)
+    """
+    k = len(values) // 5
+    if k < 2:
+        return 0
+    z = np.asarray(values[: 5 * k], dtype=np.float64).reshape(k, 5).mean(axis=1)
+    suffix = np.cumsum(z[::-1])[::-1]
+    suffix_sq = np.cumsum((z * z)[::-1])[::-1]
+    d = np.arange(max(1, int(k * max_fraction)))
+    kept = k - d
+    sse = suffix_sq[d] - suffix[d] ** 2 / kept
+    return 5 * int(np.argmin(sse / kept**2))
+
+
+def _run_point(
+    miat_rt: float,
+    miat_nrt: float,
+    mst_rt: float,
+    mst_nrt: float,
+    total_messages: int,
+    seed: Optional[int],
+    state: Optional[SystemState],
+) -> SimulateTask3:
+    sim = SimulateTask3(
+        rt_inter_arrival=miat_rt,
+        nrt_inter_arrival=miat_nrt,
+        rt_service=mst_rt,
+        nrt_service=mst_nrt,
+        use_exponential=True,
+        seed=seed,
+    )
+    if state is not None:
+        seed_state(sim, state)
+    sim.run_until_messages(total_messages, total_messages)
+    return sim
+
+
+def warm_start_sweep(
+    miat_rt: float,
+    mst_rt: float,
+    mst_nrt: float,
+    miat_nrt_values: Sequence[float],
+    num_batches: int,
+    batch_size: int,
+    seed: Optional[int] = None,
+    compare_cold: bool = False,
+    verbose: bool = True,
+) -> List[dict]:
+    """
+    Task 3 sweep where each point starts from the previous point's end state.
+
+    Points run in the order given, so list them from light to heavy load.
+    Each run after the first is seeded with the end state of the one before,
+    its queues scaled by `load_scale` between the two utilisations. Every
+    result carries the MSER-5 warm-up of its RT and nonRT response times,
+    in messages, under "warmup"; with `compare_cold` the same point is also
+    run from empty and its warm-up reported under "cold_warmup", and
+    `compare_warmups` over the sweep (printed if `verbose`) tells whether
+    warm starting shrank the warm-up. A point aborted as unstable gets a
+    `task3.unstable_result`, and the next one starts from empty.
+
+    Returns:
+        Results in the `task3` layout, sorted by MIAT_nonRT
+    """
+    total_messages = num_batches * batch_size
+    results: List[dict] = []
+    previous: Optional[Tuple[SystemState, float]] = None
+
+    for miat_nrt in miat_nrt_values:
+        rho = mst_rt / miat_rt + mst_nrt / miat_nrt
+        state = None
+        if previous is not None:
+            end_state, previous_rho = previous
+            state = scale_state(end_state, load_scale(previous_rho, rho))
+
+        try:
+            sim = _run_point(
+                miat_rt, miat_nrt, mst_rt, mst_nrt, total_messages, seed, state
+            )
+        except UnstableSystemError as exc:
+            if verbose:
+                print(f"MIAT_nonRT = {miat_nrt}: {exc}")
+            results.append(unstable_result(miat_nrt, exc))
+            previous = None
+            continue
+        result = {
+            "miat_nrt": miat_nrt,
+            "lambda_nrt_inv": 1.0 / miat_nrt,
+            "rt_stats": calculate_statistics_with_ci(
+                sim.rt_response_times, num_batches, batch_size
+            ),
+            "nrt_stats": calculate_statistics_with_ci(
+                sim.nrt_response_times, num_batches, batch_size
+            ),
+            "warmup": {
+                "rt": mser5_truncation(sim.rt_response_times),
+                "nrt": mser5_truncation(sim.nrt_response_times),
+            },
+        }
+        previous = (capture_state(sim), rho)
+
+        if compare_cold and state is not None:
+            try:
+                cold = _run_point(
+                    miat_rt, miat_nrt, mst_rt, mst_nrt, total_messages, seed, None
+                )
+            except UnstableSystemError:
+                cold = None
+            if cold is not None:
+                result["cold_warmup"] = {
+                    "rt": mser5_truncation(cold.rt_response_times),
+                    "nrt": mser5_truncation(cold.nrt_response_times),
+                }
+
+        if verbose:
+            seeded = f"{len(state.rt_ages)} RT + {len(state.nrt_ages)} nonRT" if state else "empty"
+            line = (
+                f"MIAT_nonRT = {miat_nrt}: started {seeded}, "
+                f"nonRT warm-up {result['warmup']['nrt']} messages"
+            )
+            if "cold_warmup" in result:
+                line += f" (cold start: {result['cold_warmup']['nrt']})"
+            print(line)
+        results.append(result)
+
+    results.sort(key=lambda r: r["miat_nrt"])
+    if verbose and compare_cold:
+        print_warmup_comparison(compare_warmups(results))
+    return results
+
+
+def compare_warmups(results: Sequence[dict]) -> dict:
+    """
+    Total MSER-5 warm-up of warm and cold starts over a `warm_start_sweep`.
+
+    Only points with both a "warmup" and a "cold_warmup" count. Per class,
+    the totals in messages, the number of points where the warm start
+    needed less and more warm-up than the cold one, and whether the total
+    shrank.
+    """
+    compared = [r for r in results if "warmup" in r and "cold_warmup" in r]
+    summary: dict = {"points": len(compared)}
+    for cls in ("rt", "nrt"):
+        warm = [r["warmup"][cls] for r in compared]
+        cold = [r["cold_warmup"][cls] for r in compared]
+        summary[cls] = {
+            "warm_total": sum(warm),
+            "cold_total": sum(cold),
+            "shorter": sum(w < c for w, c in zip(warm, cold)),
+            "longer": sum(w > c for w, c in zip(warm, cold)),
+            "shrank": bool(compared) and sum(warm) < sum(cold),
+        }
+    return summary
+
+
+def print_warmup_comparison(summary: dict) -> None:
+    print(f"Warm vs cold start over {summary['points']} points:")
+    for cls, name in (("rt", "RT"), ("nrt", "NonRT")):
+        c = summary[cls]
+        verdict = "shrank" if c["shrank"] else "did not shrink"
+        print(
+            f"  {name} warm-up {c['warm_total']} vs {c['cold_total']} messages "
+            f"({verdict}; shorter at {c['shorter']}, longer at {c['longer']} points)"
+        )
+
+
+if __name__ == "__main__":
+    # Assignment parameters, light to heavy nonRT load.
+    sweep = warm_start_sweep(
+        miat_rt=7.0,
+        mst_rt=2.0,
+        mst_nrt=4.0,
+        miat_nrt_values=range(40, 5, -5),
+        num_batches=51,
+        batch_size=1000,
+        compare_cold=True,
+    )
+    print_results_summary(sweep)
@@ -0,0 +1,431 @@
+"""
+Pull-based work queue for distributing sweep points to worker processes.
+
+A coordinator serves jobs over a `multiprocessing.connection` socket and
+workers, on this or other hosts, pull one job at a time, so a slow
+near-saturation point never holds back the rest. Jobs whose worker fails
+or disconnects are retried, and results stream back as they finish.
+
+    python work_queue.py serve spec.json --output out --port 6000
+    python work_queue.py work --host coordinator-host --port 6000   # per worker
+
+Both sides take the shared secret from `--authkey` or `$SIM_QUEUE_AUTHKEY`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import multiprocessing as mp
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from multiprocessing.connection import Client, Connection, Listener, wait
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+
+DEFAULT_TARGET = "sweep_runner:run_point"
+
+AUTHKEY_ENV = "SIM_QUEUE_AUTHKEY"
+
+
+class JobResult(NamedTuple):
+    job_id: int
+    job: Any
+    result: Any
+    error: Optional[str]
+    attempts: int
+    worker: str
+    elapsed: float
+
+
+def _resolve(target: str) -> Callable[[Any], Any]:
+    module, _, name = target.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def _authkey(value: Optional[str]) -> bytes:
+    value = value or os.environ.get(AUTHKEY_ENV)
+    if not value:
+        raise ValueError(f"no authkey given (use --authkey or ${AUTHKEY_ENV})")
+    return value.encode()
+
+
+class Coordinator:
+    """
+    Serve `jobs` to workers and collect their results.
+
+    Workers send ("ready", name), ("result", job_id, result, elapsed) or
+    ("error", job_id, traceback); the coordinator answers a ready worker
+    with ("job", job_id, job) or, once nothing is left, ("stop",). A job
+    is attempted at most `max_attempts` times; if its worker reports an
+    error or its connection drops, it goes back to the front of the queue.
+    After `abandon`, jobs still pending once no worker is connected fail
+    instead of waiting for one.
+    """
+
+    def __init__(
+        self,
+        jobs: Sequence[Any],
+        authkey: bytes,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        max_attempts: int = 3,
+    ) -> None:
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.jobs = list(jobs)
+        self.max_attempts = max_attempts
+        self._listener = Listener(address, authkey=authkey)
+        self._accepted: queue.Queue[Connection] = queue.Queue()
+        self._closed = False
+        self._abandoned: Optional[str] = None
+        self._accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._accept_thread.start()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._listener.address
+
+    def abandon(self, reason: str) -> None:
+        """Tell `results` that no more workers will connect."""
+        self._abandoned = reason
+
+    def _accept_loop(self) -> None:
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except Exception:  # noqa: BLE001 - failed handshake, e.g. wrong authkey
+                continue
+            if self._closed:
+                conn.close()
+                return
+            self._accepted.put(conn)
+
+    def results(self, on_poll: Optional[Callable[[], None]] = None) -> Iterator[JobResult]:
+        """
+        Yield a `JobResult` per job as it completes or finally fails.
+
+        `on_poll` is called about every 0.1 s, e.g. to replace crashed workers.
+        """
+        pending: deque[int] = deque(range(len(self.jobs)))
+        attempts = [0] * len(self.jobs)
+        outstanding = len(self.jobs)
+        conns: List[Connection] = []
+        names: Dict[Connection, str] = {}
+        assigned: Dict[Connection, int] = {}
+        waiting: deque[Connection] = deque()
+
+        def drop(conn: Connection) -> Optional[JobResult]:
+            conns.remove(conn)
+            if conn in waiting:
+                waiting.remove(conn)
+            conn.close()
+            job_id = assigned.pop(conn, None)
+            if job_id is None:
+                return None
+            return fail(job_id, names.get(conn, "?"), "worker disconnected")
+
+        def fail(job_id: int, worker: str, error: str) -> Optional[JobResult]:
+            if attempts[job_id] < self.max_attempts:
+                pending.appendleft(job_id)
+                return None
+            return JobResult(
+                job_id, self.jobs[job_id], None, error, attempts[job_id], worker, 0.0
+            )
+
+        def dispatch() -> None:
+            while waiting and pending:
+                conn = waiting.popleft()
+                job_id = pending.popleft()
+                attempts[job_id] += 1
+                try:
+                    conn.send(("job", job_id, self.jobs[job_id]))
+                except OSError:
+                    attempts[job_id] -= 1
+                    pending.appendleft(job_id)
+                    conns.remove(conn)
+                    continue
+                assigned[conn] = job_id
+
+        try:
+            while outstanding:
+                if on_poll is not None:
+                    on_poll()
+                while not self._accepted.empty():
+                    conns.append(self._accepted.get())
+                for conn in wait(conns, timeout=0.1) if conns else []:
+                    try:
+                        message = conn.recv()
+                    except (EOFError, OSError):
+                        failed = drop(conn)
+                        if failed is not None:
+                            outstanding -= 1
+                            yield failed
+                        continue
+
+                    kind = message[0]
+                    if kind == "ready":
+                        names[conn] = message[1]
+                        waiting.append(conn)
+                    elif kind in ("result", "error"):
+                        job_id = assigned.pop(conn)
+                        worker = names.get(conn, "?")
+                        if kind == "result":
+                            outstanding -= 1
+                            yield JobResult(
+                                job_id,
+                                self.jobs[job_id],
+                                message[2],
+                                None,
+                                attempts[job_id],
+                                worker,
+                                message[3],
+                            )
+                        else:
+                            failed = fail(job_id, worker, message[2])
+                            if failed is not None:
+                                outstanding -= 1
+                                yield failed
+                        waiting.append(conn)
+                dispatch()
+                if not conns and self._abandoned is not None:
+                    while pending:
+                        job_id = pending.popleft()
+                        outstanding -= 1
+                        yield JobResult(
+                            job_id,
+                            self.jobs[job_id],
+                            None,
+                            self._abandoned,
+                            attempts[job_id],
+                            "-",
+                            0.0,
+                        )
+                if not conns and not outstanding:
+                    break
+                if not conns:
+                    time.sleep(0.05)
+        finally:
+            for conn in conns:
+                try:
+                    conn.send(("stop",))
+                    conn.close()
+                except OSError:
+                    pass
+            self.close()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        # Wake the accept thread, which a close alone does not interrupt.
+        host, port = self._listener.address
+        try:
+            socket.create_connection(
+                ("127.0.0.1" if host == "0.0.0.0" else host, port), timeout=1
+            ).close()
+        except OSError:
+            pass
+        self._accept_thread.join(timeout=1)
+        self._listener.close()
+
+
+def worker(
+    address: Tuple[str, int],
+    authkey: bytes,
+    target: str = DEFAULT_TARGET,
+    name: Optional[str] = None,
+    connect_timeout: float = 30.0,
+) -> int:
+    """
+    Pull jobs from a coordinator and run `target` ("module:function") on
+    each until told to stop; return the number of jobs completed.
+    """
+    func = _resolve(target)
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            conn = Client(address, authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+    done = 0
+    with conn:
+        conn.send(("ready", name))
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message[0] == "stop":
+                break
+            _, job_id, job = message
+            start = time.perf_counter()
+            try:
+                result = func(job)
+            except Exception:  # noqa: BLE001 - reported to the coordinator
+                conn.send(("error", job_id, traceback.format_exc()))
+                continue
+            conn.send(("result", job_id, result, time.perf_counter() - start))
+            done += 1
+    return done
+
+
+def run_local(
+    jobs: Sequence[Any],
+    num_workers: int,
+    target: str = DEFAULT_TARGET,
+    max_attempts: int = 3,
+) -> Iterator[JobResult]:
+    """
+    Coordinator plus `num_workers` local worker processes; yields results.
+
+    Workers that crash are replaced, up to `max_attempts` times per job;
+    if they all die with jobs left, those jobs fail.
+    """
+    authkey = os.urandom(16)
+    coordinator = Coordinator(jobs, authkey, max_attempts=max_attempts)
+    respawns = len(coordinator.jobs) * max_attempts
+
+    def spawn(i: int) -> mp.Process:
+        process = mp.Process(
+            target=worker,
+            args=(coordinator.address, authkey, target, f"local-{i}"),
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def replace_crashed() -> None:
+        nonlocal respawns
+        for i, process in enumerate(processes):
+            if respawns and process.exitcode not in (None, 0):
+                respawns -= 1
+                processes[i] = spawn(i)
+        if all(process.exitcode is not None for process in processes):
+            coordinator.abandon("no local worker left to run the job")
+
+    processes = [spawn(i) for i in range(num_workers)]
+    try:
+        yield from coordinator.results(replace_crashed)
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+
+def serve_sweep(
+    spec: dict,
+    output: str,
+    authkey: bytes,
+    address: Tuple[str, int],
+    max_attempts: int = 3,
+    num_local_workers: int = 0,
+) -> int:
+    """
+    Serve the points of a `sweep_runner` spec and store results as they arrive.
+
+    Results go into `output` (a `ResultsStore`); points already there are
+    not served again. Returns the number of points that finally failed.
+    """
+    from results_store import ResultsStore
+    from sweep_runner import sweep_points
+    from task3 import store_result
+
+    store = ResultsStore(output, chunk_rows=1)
+    done = set(int(p) for p in store.query(["point"]).get("point", []).tolist())
+    points = [p for p in sweep_points(spec) if p["point"] not in done]
+    print(f"Serving {len(points)} points ({len(done)} already stored)", flush=True)
+
+    coordinator = Coordinator(points, authkey, address, max_attempts)
+    print(f"Coordinator listening on {coordinator.address}", flush=True)
+    for i in range(num_local_workers):
+        mp.Process(
+            target=worker,
+            args=(coordinator.address, authkey, DEFAULT_TARGET, f"local-{i}"),
+            daemon=True,
+        ).start()
+
+    failures = 0
+    for r in coordinator.results():
+        point = r.job
+        if r.error is not None:
+            failures += 1
+            print(f"point {point['point']} failed after {r.attempts} attempts:\n{r.error}")
+            continue
+        store_result(
+            store,
+            r.result,
+            point["miat_rt"],
+            point["mst_rt"],
+            point["mst_nrt"],
+            point["num_batches"],
+            point["batch_size"],
+            r.elapsed,
+            spec["name"],
+            seed=point["seed"],
+            point=point["point"],
+            worker=r.worker,
+        )
+        print(
+            f"point {point['point']} (MIAT_nonRT = {point['miat_nrt']}) "
+            f"done by {r.worker} in {r.elapsed:.1f}s",
+            flush=True,
+        )
+    store.flush()
+    return failures
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="serve a sweep spec to workers")
+    serve.add_argument("spec", help="JSON sweep spec (see sweep_runner.py)")
+    serve.add_argument("--output", required=True, help="results store directory")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=6000)
+    serve.add_argument("--authkey")
+    serve.add_argument("--max-attempts", type=int, default=3)
+    serve.add_argument("--local-workers", type=int, default=0)
+
+    work = sub.add_parser("work", help="pull and run jobs from a coordinator")
+    work.add_argument("--host", default="127.0.0.1")
+    work.add_argument("--port", type=int, default=6000)
+    work.add_argument("--authkey")
+    work.add_argument("--target", default=DEFAULT_TARGET)
+
+    args = parser.parse_args(argv)
+    authkey = _authkey(args.authkey)
+
+    if args.command == "serve":
+        from sweep_runner import load_spec
+
+        failures = serve_sweep(
+            load_spec(args.spec),
+            args.output,
+            authkey,
+            (args.host, args.port),
+            args.max_attempts,
+            args.local_workers,
+        )
+        return 1 if failures else 0
+
+    done = worker((args.host, args.port), authkey, args.target)
+    print(f"Worker finished after {done} jobs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())